@@ -3,9 +3,22 @@ from flask_cors import CORS
 from dotenv import load_dotenv
 import os
 
-from models.book import db, Book, Page, TranslationHistory
+from models.book import db, Book, Page, Sentence, TranslationHistory
+from models.job import Job
+from models.image import ImageAnalysis
+from models.migrations import run_migrations
+from models.storage import configure_storage, attach_pragmas
 from routes.ocr import ocr_bp
 from routes.book import book_bp
+from routes.job import job_bp
+from routes.search import search_bp
+from routes.metrics import metrics_bp
+from services.job_queue import job_queue
+import services.ingest
+import services.batch_translate
+from services.translation_cache import translation_cache
+from services.openai_scheduler import scheduler
+from services.metrics import instrument_sqlalchemy
 
 load_dotenv()
 
@@ -13,10 +26,23 @@ app = Flask(__name__)
 CORS(app)
 
 basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{basedir}/wagner.db'
+# 벤치마크 등에서 다른 DB를 쓰려면 DATABASE_URL 지정
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', f'sqlite:///{basedir}/wagner.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# OCR/번역 백그라운드 워커 수 (기본: CPU 코어 수)
+app.config['JOB_WORKERS'] = int(os.getenv('JOB_WORKERS', os.cpu_count() or 2))
+# 일괄 업로드 시 동시에 돌릴 OCR / 번역 호출 수
+app.config['INGEST_OCR_CONCURRENCY'] = int(os.getenv('INGEST_OCR_CONCURRENCY', 4))
+app.config['INGEST_TRANSLATE_CONCURRENCY'] = int(os.getenv('INGEST_TRANSLATE_CONCURRENCY', 4))
+# 이 시간(초)보다 오래 걸린 요청은 구간별 소요 시간을 로그로 남김. PROFILE_SLOW_REQUESTS=1이면 cProfile 결과도
+app.config['SLOW_REQUEST_SECONDS'] = float(os.getenv('SLOW_REQUEST_SECONDS', 2.0))
+app.config['PROFILE_SLOW_REQUESTS'] = os.getenv('PROFILE_SLOW_REQUESTS', '0') == '1'
 
+configure_storage(app)
 db.init_app(app)
+attach_pragmas(app)
+instrument_sqlalchemy()
+job_queue.init_app(app)
 
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 if not OPENAI_API_KEY:
@@ -24,6 +50,9 @@ if not OPENAI_API_KEY:
 
 app.register_blueprint(ocr_bp, url_prefix='/api')
 app.register_blueprint(book_bp, url_prefix='/api')
+app.register_blueprint(job_bp, url_prefix='/api')
+app.register_blueprint(search_bp, url_prefix='/api')
+app.register_blueprint(metrics_bp)
 
 @app.route('/')
 def home():
@@ -38,9 +67,22 @@ def home():
 def health():
     return {"status": "healthy"}
 
+@app.route('/api/cache/stats')
+def cache_stats():
+    return {"success": True, "translation_cache": translation_cache.stats()}
+
+@app.route('/api/openai/stats')
+def openai_stats():
+    return {"success": True, "scheduler": scheduler.stats()}
+
 with app.app_context():
     db.create_all()
     print("Database tables created!")
+    run_migrations()
+
+# 디버그 리로더의 감시 프로세스에서는 워커를 띄우지 않음
+if __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+    job_queue.start()
 
 if __name__ == '__main__':
     print("Starting Wagner Backend Server...")
@@ -0,0 +1,212 @@
+"""로컬 가짜 OpenAI 서버 (Chat Completions만)
+
+실제 SDK가 HTTP로 붙을 수 있도록 /v1/chat/completions를 흉내 낸다. 프롬프트 종류를 보고
+그럴듯한 응답(페이지 분석 JSON, 문장 번역 배열, 병합 결과 등)을 만들고, 지연/429 비율을 조절할 수 있다.
+
+    python -m bench.fake_openai --port 8765 --latency 0.5
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=sk-fake python app.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    'der die das und nicht mit sich auf für ist Musik Wagner Oper Bühne Orchester '
+    'Sänger Zeit Kunst Welt Leben Drama Meister Werk Geist Bayreuth Ton Harmonie '
+    'Melodie Freund Brief Theater Dichter Sprache Gedanke Herz immer wieder schon'
+).split()
+
+
+def german_page(rng, sentences=8):
+    """무작위 독일어 비슷한 문장들 (페이지마다 달라서 번역 캐시에 걸리지 않음)"""
+    result = []
+    for _ in range(sentences):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(6, 18))]
+        words[0] = words[0].capitalize()
+        result.append(' '.join(words) + rng.choice('..?!'))
+    return ' '.join(result)
+
+
+def split_sentences(text):
+    sentences, current = [], ''
+    for ch in text:
+        current += ch
+        if ch in '.?!':
+            sentences.append(current.strip())
+            current = ''
+    if current.strip():
+        sentences.append(current.strip())
+    return sentences
+
+
+def _mapped(text):
+    return [{'de': s, 'ko': f'[ko] {s}', 'en': f'[en] {s}'} for s in split_sentences(text)]
+
+
+def canned_reply(body, rng):
+    """요청 내용으로 어떤 서비스 함수인지 판단해 응답 텍스트 생성"""
+    messages = body.get('messages', [])
+    system = next((m['content'] for m in messages if m['role'] == 'system'), '')
+    user = messages[-1]['content'] if messages else ''
+
+    if isinstance(user, list):
+        prompt = next((p['text'] for p in user if p.get('type') == 'text'), '')
+        text = german_page(rng)
+        if 'JSON' not in prompt:
+            return text
+        has_music = rng.random() < 0.2
+        blocks = [{'type': 'text', 'content': text}]
+        if has_music:
+            blocks.append({'type': 'music_score', 'description': 'Notenbeispiel',
+                           'crop_percent': {'top': 70, 'bottom': 85}})
+        return json.dumps({
+            'has_music_score': has_music,
+            'has_illustration': False,
+            'content_blocks': blocks,
+            'full_text': text
+        }, ensure_ascii=False)
+
+    if 'merged_from_previous' in system:
+        new_text = user.split('새 페이지 전체 텍스트:', 1)[-1].split('"""')[1]
+        return json.dumps({
+            'merged_from_previous': '',
+            'clean_german': new_text,
+            'sentences': _mapped(new_text)
+        }, ensure_ascii=False)
+    if '번역할 부분:' in user:
+        return json.dumps(_mapped(user.split('번역할 부분:\n\n', 1)[-1]), ensure_ascii=False)
+    if '"de"' in system:
+        return json.dumps(_mapped(user.split('\n\n', 1)[-1]), ensure_ascii=False)
+    return f"[translated] {user.split(chr(10) + chr(10), 1)[-1]}"
+
+
+class FakeOpenAIServer:
+    """스레드로 도는 가짜 서버. latency±jitter초 뒤 응답하고, error_rate 비율로 429(Retry-After) 반환"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.2, jitter=0.1, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status, payload, headers=None):
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                if not self.path.endswith('/chat/completions'):
+                    self._send_json(404, {'error': {'message': f'Unknown path {self.path}'}})
+                    return
+                server.handle(self, body)
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _delay(self):
+        with self.rng_lock:
+            delay = max(0.0, self.rng.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+            fail = self.rng.random() < self.error_rate
+            reply_rng = random.Random(self.rng.random())
+        return delay, fail, reply_rng
+
+    def handle(self, handler, body):
+        self.requests += 1
+        delay, fail, rng = self._delay()
+        if fail:
+            handler._send_json(429, {'error': {'message': 'Rate limit reached', 'type': 'requests'}},
+                               {'retry-after-ms': '200'})
+            return
+        time.sleep(delay)
+        content = canned_reply(body, rng)
+        if content.startswith('['):
+            # 문장 프롬프트는 {"sentences": [...]}로 답하라고 요청함 (Structured Outputs/JSON 모드는 루트가 객체여야 함)
+            content = json.dumps({'sentences': json.loads(content)}, ensure_ascii=False)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        usage = {'prompt_tokens': 100, 'completion_tokens': len(content) // 3,
+                 'total_tokens': 100 + len(content) // 3}
+
+        if not body.get('stream'):
+            handler._send_json(200, {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': created,
+                'model': body.get('model'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                             'finish_reason': 'stop'}],
+                'usage': usage
+            })
+            return
+
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'text/event-stream')
+        handler.send_header('Connection', 'close')
+        handler.end_headers()
+        for i in range(0, len(content), 24):
+            chunk = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': created,
+                'model': body.get('model'),
+                'choices': [{'index': 0, 'delta': {'content': content[i:i + 24]}, 'finish_reason': None}]
+            }
+            handler.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+        handler.wfile.write(b"data: [DONE]\n\n")
+        handler.wfile.flush()
+        handler.close_connection = True
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='fake-openai', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake OpenAI Chat Completions server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.5, help='mean response delay in seconds')
+    parser.add_argument('--jitter', type=float, default=0.2)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 429')
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(args.host, args.port, args.latency, args.jitter, args.error_rate)
+    print(f"🤖 Fake OpenAI listening on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
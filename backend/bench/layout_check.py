@@ -0,0 +1,62 @@
+"""레이아웃 감지(layout_detect) 회귀 검사
+
+uploads/에 있는 샘플 페이지에서 악보/그림 영역을 찾아 미리 확인해 둔 위치와 비교한다.
+감지 영역은 기대 구간을 모두 덮고, 위아래로 MAX_PADDING(%)보다 더 넓으면 안 된다.
+
+    python -m bench.layout_check
+"""
+import os
+import sys
+import time
+
+from PIL import Image
+
+from services.layout_detect import detect_regions
+
+UPLOADS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'uploads')
+MAX_PADDING = 5
+
+# (파일, [(종류, 반드시 덮어야 할 위쪽 %, 아래쪽 %)]) — 빈 목록은 악보/그림이 없는 본문 페이지
+CASES = [
+    ('20260213_105017_d9a386e0.png', []),  # p.9
+    ('20260213_105232_398c3704.png', []),  # p.10
+    ('20260213_105344_e2faf2e5.png', []),  # p.11
+    ('20260213_105504_31be7285.png', [('music_score', 73.5, 78)]),  # p.12 한 줄 악보 예시
+    # p.13 본문 사이의 짧은 악보 예시 (오선 길이가 페이지 폭의 15% 정도)
+    ('20260213_113924_0540c091.png', [('music_score', 17.2, 20.2)]),
+]
+
+
+def check(filename, expected):
+    with Image.open(os.path.join(UPLOADS, filename)) as img:
+        img.load()
+        started = time.perf_counter()
+        regions = detect_regions(img)
+        elapsed = (time.perf_counter() - started) * 1000
+    problems = []
+    if len(regions) != len(expected):
+        problems.append(f"expected {len(expected)} region(s), got {len(regions)}")
+    for region, (kind, top, bottom) in zip(regions, expected):
+        if region['type'] != kind:
+            problems.append(f"expected {kind}, got {region['type']}")
+        if not (top - MAX_PADDING <= region['top'] <= top and bottom <= region['bottom'] <= bottom + MAX_PADDING):
+            problems.append(f"{kind} {region['top']}~{region['bottom']} does not fit {top}~{bottom}")
+    return regions, elapsed, problems
+
+
+def main():
+    failed = 0
+    for filename, expected in CASES:
+        regions, elapsed, problems = check(filename, expected)
+        found = ', '.join(f"{r['type']} {r['top']}~{r['bottom']}" for r in regions) or 'none'
+        print(f"{'❌' if problems else '✅'} {filename} ({elapsed:.0f}ms): {found}")
+        for problem in problems:
+            print(f"   {problem}")
+        failed += bool(problems)
+    if failed:
+        print(f"{failed}/{len(CASES)} page(s) failed")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
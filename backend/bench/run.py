@@ -0,0 +1,275 @@
+"""엔드투엔드 벤치마크
+
+합성 데이터를 만든 임시 DB와 가짜 OpenAI 서버로 실제 앱을 띄우고, 동시성을 올려가며
+주요 API의 지연(p50/p95/p99)과 처리량을 잰다. 실제 wagner.db/업로드 폴더는 건드리지 않는다.
+
+    python -m bench.run
+    python -m bench.run --pages 5000 --concurrency 1,8,32 --requests 200 --json result.json
+    python -m bench.run --baseline result.json --threshold 0.2   # p95가 20% 넘게 느려지면 exit 1
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from bench.fake_openai import FakeOpenAIServer
+from bench.seed import seed
+
+SCENARIOS = ['list_pages', 'update_page', 'move_page', 'reorder', 'ocr', 'delete_page']
+
+
+class Client:
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    def request(self, method, path, payload=None, body=None, content_type=None):
+        headers = {}
+        if payload is not None:
+            body = json.dumps(payload).encode('utf-8')
+            content_type = 'application/json'
+        if content_type:
+            headers['Content-Type'] = content_type
+        req = urllib.request.Request(self.base_url + path, data=body, method=method, headers=headers)
+        with urllib.request.urlopen(req, timeout=300) as response:
+            return json.loads(response.read() or b'null')
+
+    def upload(self, path, field, filename, data):
+        boundary = uuid.uuid4().hex
+        body = (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f'Content-Type: image/jpeg\r\n\r\n'
+        ).encode('utf-8') + data + f'\r\n--{boundary}--\r\n'.encode('utf-8')
+        return self.request('POST', path, body=body, content_type=f'multipart/form-data; boundary={boundary}')
+
+
+def synthetic_image(rng):
+    """텍스트 줄처럼 보이는 가짜 페이지 이미지 (매번 달라서 OCR 캐시에 걸리지 않음)"""
+    from PIL import Image, ImageDraw
+    img = Image.new('L', (900, 1300), 245)
+    draw = ImageDraw.Draw(img)
+    for y in range(80, 1220, 38):
+        x = 70
+        while x < 820:
+            width = rng.randint(20, 110)
+            draw.rectangle((x, y, min(x + width, 830), y + 18), fill=rng.randint(10, 60))
+            x += width + rng.randint(8, 16)
+    out = io.BytesIO()
+    img.save(out, 'JPEG', quality=80)
+    return out.getvalue()
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class Workload:
+    """시나리오별 요청 한 번을 실행하는 함수 묶음"""
+
+    def __init__(self, client, book_id, page_ids, rng):
+        self.client = client
+        self.book_id = book_id
+        self.page_ids = page_ids
+        self.rng = rng
+        self.lock = threading.Lock()
+        self.deletable = list(page_ids)
+        rng.shuffle(self.deletable)
+
+    def _random_page(self):
+        with self.lock:
+            return self.rng.choice(self.page_ids)
+
+    def list_pages(self):
+        with self.lock:
+            start = self.rng.randint(1, max(1, len(self.page_ids) - 100))
+        self.client.request('GET', f'/api/books/{self.book_id}/pages?limit=100&from={start}')
+
+    def update_page(self):
+        page_id = self._random_page()
+        self.client.request('PUT', f'/api/pages/{page_id}', {'korean_text': f'[ko] edited {uuid.uuid4().hex[:8]}'})
+
+    def move_page(self):
+        page_id = self._random_page()
+        self.client.request('POST', f'/api/pages/{page_id}/move', {'direction': self.rng.choice(['up', 'down'])})
+
+    def reorder(self):
+        """멀리 떨어진 자리로 옮기기 + 10장 부분 순서 바꾸기"""
+        with self.lock:
+            page_id, anchor_id = self.rng.sample(self.page_ids, 2)
+            shuffled = self.rng.sample(self.page_ids, 10)
+        self.client.request('POST', f'/api/pages/{page_id}/move', {'after_id': anchor_id})
+        self.client.request('POST', f'/api/books/{self.book_id}/reorder', {'page_ids': shuffled})
+
+    def delete_page(self):
+        with self.lock:
+            page_id = self.deletable.pop()
+            self.page_ids.remove(page_id)
+        self.client.request('DELETE', f'/api/pages/{page_id}')
+
+    def ocr(self, image):
+        job = self.client.upload('/api/ocr', 'image', 'page.jpg', image)
+        while True:
+            status = self.client.request('GET', f"/api/jobs/{job['job_id']}")['job']['status']
+            if status in ('succeeded', 'failed', 'cancelled'):
+                if status != 'succeeded':
+                    raise Exception(f"OCR job {status}")
+                return
+            time.sleep(0.02)
+
+
+def measure(fn, args_list, concurrency):
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def one(args):
+        started = time.perf_counter()
+        try:
+            fn(*args)
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+            return
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, args_list))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(args_list),
+        'errors': len(errors),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'throughput_rps': round(len(latencies) / wall, 2) if wall else 0.0,
+        'first_error': errors[0] if errors else None
+    }
+
+
+def start_app(workdir, fake_url):
+    """임시 DB/업로드 폴더와 가짜 OpenAI로 앱을 띄우고 base URL 반환"""
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'UPLOAD_FOLDER': os.path.join(workdir, 'uploads'),
+        'TRANSLATION_CACHE_PATH': os.path.join(workdir, 'translation_cache.db'),
+        'OPENAI_BASE_URL': fake_url,
+        'OPENAI_API_KEY': 'sk-bench-fake',
+        'OPENAI_RPM': '100000',
+        'OPENAI_TPM': '100000000'
+    })
+    from werkzeug.serving import make_server
+    from app import app
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='bench-app', daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+
+def compare(results, baseline, threshold):
+    """기준 결과보다 p95가 threshold 비율 넘게 느려진 항목 목록"""
+    regressions = []
+    for scenario, levels in results.items():
+        for level, stats in levels.items():
+            base = baseline.get(scenario, {}).get(level)
+            if base and base['p95_ms'] and stats['p95_ms'] > base['p95_ms'] * (1 + threshold):
+                regressions.append(f"{scenario} @ c={level}: p95 {base['p95_ms']}ms → {stats['p95_ms']}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end API benchmark against a fake OpenAI backend')
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--history', type=int, default=3)
+    parser.add_argument('--concurrency', default='1,4,16')
+    parser.add_argument('--requests', type=int, default=100, help='requests per scenario and concurrency level')
+    parser.add_argument('--ocr-requests', type=int, default=20)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--latency', type=float, default=0.2, help='fake OpenAI mean latency (s)')
+    parser.add_argument('--jitter', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--baseline', help='compare p95 against a previous --json result')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    parser.add_argument('--keep', action='store_true', help='keep the temporary work directory')
+    args = parser.parse_args()
+
+    levels = [int(c) for c in args.concurrency.split(',')]
+    scenarios = [s for s in args.scenarios.split(',') if s]
+    rng = random.Random(7)
+    workdir = tempfile.mkdtemp(prefix='wagner-bench-')
+    fake = FakeOpenAIServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, seed=7).start()
+
+    try:
+        book_id = seed(os.path.join(workdir, 'bench.db'), books=1, pages=args.pages, history=args.history)[0]
+        base_url, server = start_app(workdir, fake.base_url)
+        client = Client(base_url)
+
+        page_ids = []
+        cursor = 0
+        while cursor is not None:
+            data = client.request('GET', f'/api/books/{book_id}/pages?fields=id&limit=500&after={cursor}')
+            page_ids.extend(p['id'] for p in data['pages'])
+            cursor = data.get('next_cursor')
+        workload = Workload(client, book_id, page_ids, rng)
+
+        results = {}
+        for scenario in scenarios:
+            results[scenario] = {}
+            for level in levels:
+                if scenario == 'ocr':
+                    images = [(synthetic_image(rng),) for _ in range(args.ocr_requests)]
+                    stats = measure(workload.ocr, images, level)
+                else:
+                    count = args.requests
+                    if scenario == 'delete_page':
+                        count = min(count, len(workload.deletable) - 1)
+                    stats = measure(getattr(workload, scenario), [()] * count, level)
+                results[scenario][str(level)] = stats
+                print(f"{scenario:12} c={level:<3} n={stats['requests']:<4} err={stats['errors']:<3} "
+                      f"p50={stats['p50_ms']:>8}ms p95={stats['p95_ms']:>8}ms p99={stats['p99_ms']:>8}ms "
+                      f"{stats['throughput_rps']:>8} req/s")
+                if stats['first_error']:
+                    print(f"   first error: {stats['first_error']}")
+        server.shutdown()
+
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"💾 Results written to {args.json}")
+
+        if args.baseline:
+            with open(args.baseline) as f:
+                regressions = compare(results, json.load(f), args.threshold)
+            for line in regressions:
+                print(f"❌ Regression: {line}")
+            if regressions:
+                sys.exit(1)
+            print("✅ No p95 regressions against baseline")
+    finally:
+        fake.stop()
+        if args.keep:
+            print(f"📁 Work directory kept: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
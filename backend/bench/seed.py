@@ -0,0 +1,126 @@
+"""벤치마크용 합성 데이터 생성기
+
+책 N권 × 페이지 M장, 페이지마다 문장 행과 번역 이력 버전을 만든다.
+
+    python -m bench.seed --books 2 --pages 3000 --history 4
+    python -m bench.seed --db /tmp/bench.db --pages 5000
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime
+
+from flask import Flask
+
+from bench.fake_openai import german_page, split_sentences
+from models.book import db, Book, Page, Sentence, TranslationHistory, POSITION_GAP
+from models.history import SNAPSHOT_INTERVAL, make_delta
+from models.migrations import run_migrations
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DB = os.path.join(BACKEND_DIR, 'wagner.db')
+BATCH = 500
+
+
+def make_app(db_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.abspath(db_path)}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), BATCH):
+        db.session.execute(db.insert(model), rows[start:start + BATCH])
+
+
+def seed_book(title, pages, history, rng):
+    """책 한 권과 페이지/문장/이력 행 생성. 책 id 반환"""
+    book = Book(title=title, author='Synthetic', original_language='german')
+    db.session.add(book)
+    db.session.flush()
+
+    now = datetime.utcnow()
+    texts = []
+    page_rows = []
+    for number in range(1, pages + 1):
+        sentences = split_sentences(german_page(rng, rng.randint(4, 12)))
+        texts.append(sentences)
+        page_rows.append({
+            'book_id': book.id,
+            'position': number * POSITION_GAP,
+            'page_type': 'text',
+            'german_text': ' '.join(sentences),
+            'korean_text': '\n'.join(f'[ko] {s}' for s in sentences),
+            'english_text': '\n'.join(f'[en] {s}' for s in sentences),
+            'content_images': '[]',
+            'korean_version': history or None,
+            'english_version': history or None,
+            'created_at': now
+        })
+    _insert(Page, page_rows)
+
+    page_ids = [row[0] for row in db.session.query(Page.id)
+                .filter_by(book_id=book.id).order_by(Page.position).all()]
+    sentence_rows = []
+    history_rows = []
+    for page_id, sentences in zip(page_ids, texts):
+        for ordinal, sentence in enumerate(sentences):
+            sentence_rows.append({'page_id': page_id, 'ordinal': ordinal, 'de': sentence,
+                                  'ko': f'[ko] {sentence}', 'en': f'[en] {sentence}'})
+        for field, prefix in (('korean_text', '[ko]'), ('english_text', '[en]')):
+            # 버전마다 한 문장씩 다시 번역된 것처럼
+            lines = [f'{prefix} {s}' for s in sentences]
+            previous = None
+            for version in range(1, history + 1):
+                if version > 1:
+                    lines[(version - 2) % len(lines)] = f'{prefix} v{version} {sentences[(version - 2) % len(lines)]}'
+                text = '\n'.join(lines)
+                snapshot = previous is None or version % SNAPSHOT_INTERVAL == 1
+                history_rows.append({
+                    'page_id': page_id,
+                    'field': field,
+                    'translation_text': text if snapshot else '',
+                    'delta': None if snapshot else make_delta(previous, text),
+                    'version_number': version,
+                    'created_at': now
+                })
+                previous = text
+    _insert(Sentence, sentence_rows)
+    _insert(TranslationHistory, history_rows)
+    db.session.commit()
+    return book.id
+
+
+def seed(db_path=DEFAULT_DB, books=1, pages=2000, history=3, seed=42):
+    """합성 책 생성. 만든 책 id 목록 반환"""
+    rng = random.Random(seed)
+    app = make_app(db_path)
+    with app.app_context():
+        db.create_all()
+        run_migrations()
+        book_ids = []
+        for i in range(books):
+            started = time.time()
+            book_id = seed_book(f'Synthetic book {i + 1} ({pages} pages)', pages, history, rng)
+            book_ids.append(book_id)
+            print(f"🌱 Seeded book {book_id}: {pages} pages, {history} history versions "
+                  f"({time.time() - started:.1f}s)")
+    return book_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic books for benchmarking')
+    parser.add_argument('--db', default=DEFAULT_DB, help='SQLite file (default: backend/wagner.db)')
+    parser.add_argument('--books', type=int, default=1)
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--history', type=int, default=3, help='history versions per translated field')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    seed(args.db, args.books, args.pages, args.history, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,9 @@ from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
 
+# 페이지 정렬 키 간격. 두 페이지 사이에 이만큼 끼워 넣을 자리가 있음
+POSITION_GAP = 1024
+
 class Book(db.Model):
     __tablename__ = 'books'
 
@@ -23,72 +26,184 @@ class Book(db.Model):
             'original_language': self.original_language,
             'created_at': self.created_at.isoformat(),
             'published': self.published,
-            'page_count': len(self.pages)
+            'page_count': Page.query.filter_by(book_id=self.id).count()
         }
 
 
 class Page(db.Model):
     __tablename__ = 'pages'
+    __table_args__ = (
+        db.Index('ix_pages_book_page', 'book_id', 'page_number'),
+        db.Index('ix_pages_book_updated', 'book_id', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     book_id = db.Column(db.Integer, db.ForeignKey('books.id'), nullable=False)
-    page_number = db.Column(db.Integer, nullable=False)
+    # 정렬 키. 기존 page_number 열에 POSITION_GAP 간격으로 저장해서 이동/삭제 때 다른 행을 고치지 않음.
+    # 화면에 보이는 페이지 번호는 page_number(순위)로 계산
+    position = db.Column('page_number', db.Integer, nullable=False)
     page_type = db.Column(db.String(20), default='text')
 
     german_text = db.Column(db.Text)
     korean_text = db.Column(db.Text)
     english_text = db.Column(db.Text)
+    # 예전 JSON 저장 방식. 문장은 sentences 테이블로 옮겨졌고 마이그레이션 후 비어 있음
     sentences_json = db.Column(db.Text)
 
     original_image_url = db.Column(db.String(500))
     content_images = db.Column(db.Text)
 
+    # 현재 번역의 이력 버전 번호 (없으면 None). 새 버전은 여기에 1을 더해서 만듦
+    korean_version = db.Column(db.Integer)
+    english_version = db.Column(db.Integer)
+
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # 내보내기 캐시 무효화용. 문장 행이 바뀔 때도 갱신됨 (아래 before_flush 참고)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     translation_history = db.relationship('TranslationHistory', backref='page', lazy=True, cascade='all, delete-orphan')
-
-    def to_dict(self):
-        import json
-        sentences = None
-        if self.sentences_json:
-            try:
-                sentences = json.loads(self.sentences_json)
-            except:
-                sentences = None
+    sentence_rows = db.relationship(
+        'Sentence', backref='page', lazy=True,
+        order_by='Sentence.ordinal', cascade='all, delete-orphan'
+    )
+
+    # to_dict 필드 → 필요한 컬럼 (fields= 프로젝션 시 이 컬럼만 읽음, None은 sentences 관계)
+    FIELD_COLUMNS = {
+        'id': 'id',
+        'book_id': 'book_id',
+        'page_number': 'position',
+        'page_type': 'page_type',
+        'german_text': 'german_text',
+        'korean_text': 'korean_text',
+        'english_text': 'english_text',
+        'sentences': None,
+        'original_image_url': 'original_image_url',
+        'content_images': 'content_images',
+        'created_at': 'created_at'
+    }
+
+    @property
+    def page_number(self):
+        """책 안에서 몇 번째 페이지인지 (1부터). 목록은 한 번에 계산해서 to_dict(number=)로 넘길 것"""
+        return Page.query.filter(Page.book_id == self.book_id, Page.position <= self.position).count()
+
+    # 번역 필드 → 현재 이력 버전 컬럼
+    VERSION_COLUMNS = {
+        'korean_text': 'korean_version',
+        'english_text': 'english_version'
+    }
+
+    def _sentences(self):
+        if not self.sentence_rows:
+            return None
+        return [s.to_dict() for s in self.sentence_rows]
+
+    def set_sentences(self, sentences):
+        """문장 목록 교체. 같은 순번 행은 그대로 고치고 늘어난/줄어든 행만 추가/삭제"""
+        sentences = sentences or []
+        rows = list(self.sentence_rows)
+        for ordinal, data in enumerate(sentences):
+            if ordinal < len(rows):
+                rows[ordinal].update_from(data)
+            else:
+                self.sentence_rows.append(Sentence(
+                    ordinal=ordinal,
+                    de=data.get('de', ''),
+                    ko=data.get('ko', ''),
+                    en=data.get('en', '')
+                ))
+        for row in rows[len(sentences):]:
+            self.sentence_rows.remove(row)
+
+    def to_dict(self, fields=None, number=None):
+        if fields is not None:
+            getters = {
+                'page_number': lambda: self.page_number if number is None else number,
+                'sentences': self._sentences,
+                'created_at': lambda: self.created_at.isoformat()
+            }
+            return {
+                f: getters[f]() if f in getters else getattr(self, f)
+                for f in fields
+            }
 
         return {
             'id': self.id,
             'book_id': self.book_id,
-            'page_number': self.page_number,
+            'page_number': self.page_number if number is None else number,
             'page_type': self.page_type,
             'german_text': self.german_text,
             'korean_text': self.korean_text,
             'english_text': self.english_text,
-            'sentences': sentences,
+            'sentences': self._sentences(),
             'original_image_url': self.original_image_url,
             'content_images': self.content_images,
             'created_at': self.created_at.isoformat()
         }
 
 
+class Sentence(db.Model):
+    __tablename__ = 'sentences'
+    __table_args__ = (
+        db.Index('ix_sentences_page_ordinal', 'page_id', 'ordinal', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    page_id = db.Column(db.Integer, db.ForeignKey('pages.id'), nullable=False)
+    ordinal = db.Column(db.Integer, nullable=False)
+    de = db.Column(db.Text)
+    ko = db.Column(db.Text)
+    en = db.Column(db.Text)
+
+    def update_from(self, data):
+        for lang in ('de', 'ko', 'en'):
+            if lang in data and getattr(self, lang) != data[lang]:
+                setattr(self, lang, data[lang])
+
+    def to_dict(self):
+        return {
+            'de': self.de,
+            'ko': self.ko,
+            'en': self.en
+        }
+
+
+@db.event.listens_for(db.Session, 'before_flush')
+def _touch_pages_of_changed_sentences(session, flush_context, instances):
+    """문장 행만 고쳐도 페이지 updated_at이 바뀌도록"""
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Sentence) and obj.page is not None and obj.page not in session.deleted:
+            obj.page.updated_at = datetime.utcnow()
+
+
 class TranslationHistory(db.Model):
     __tablename__ = 'translation_history'
+    __table_args__ = (
+        db.Index('ix_translation_history_page_field_version', 'page_id', 'field', 'version_number'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     page_id = db.Column(db.Integer, db.ForeignKey('pages.id'), nullable=False)
     field = db.Column(db.String(50), nullable=False)
+    # 스냅샷이면 전체 텍스트, 차이 행이면 빈 문자열 (models/history.py 참고)
     translation_text = db.Column(db.Text, nullable=False)
+    # 직전 버전과의 줄 단위 차이(JSON). None이면 스냅샷
+    delta = db.Column(db.Text)
     version_number = db.Column(db.Integer, default=1)
-    is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    def to_dict(self):
-        return {
+    def to_dict(self, text=None):
+        """text: 복원한 전체 텍스트 (없으면 본문은 빼고 메타데이터만)"""
+        active = getattr(self.page, Page.VERSION_COLUMNS[self.field], None)
+        result = {
             'id': self.id,
             'page_id': self.page_id,
             'field': self.field,
-            'translation_text': self.translation_text,
             'version_number': self.version_number,
-            'is_active': self.is_active,
+            'is_active': self.version_number == active,
+            'is_snapshot': self.delta is None,
             'created_at': self.created_at.isoformat()
-        }
\ No newline at end of file
+        }
+        if text is not None:
+            result['translation_text'] = text
+        return result
\ No newline at end of file
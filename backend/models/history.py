@@ -0,0 +1,95 @@
+import difflib
+import json
+
+from models.book import db, Page, TranslationHistory
+
+# 이 간격마다(1, 11, 21… 버전) 전체 텍스트를 저장. 복원할 때 최대 이만큼의 행만 읽으면 됨
+SNAPSHOT_INTERVAL = 10
+
+
+def make_delta(old_text, new_text):
+    """줄 단위 차이. 양수 n = n줄 그대로, 음수 -n = n줄 버림, 문자열 목록 = 새 줄 삽입"""
+    old_lines = (old_text or '').split('\n')
+    new_lines = (new_text or '').split('\n')
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append(i2 - i1)
+            continue
+        if i2 > i1:
+            ops.append(i1 - i2)
+        if j2 > j1:
+            ops.append(new_lines[j1:j2])
+    return json.dumps(ops, ensure_ascii=False, separators=(',', ':'))
+
+
+def apply_delta(old_text, delta):
+    old_lines = (old_text or '').split('\n')
+    lines = []
+    cursor = 0
+    for op in json.loads(delta):
+        if isinstance(op, list):
+            lines.extend(op)
+        elif op > 0:
+            lines.extend(old_lines[cursor:cursor + op])
+            cursor += op
+        else:
+            cursor -= op
+    return '\n'.join(lines)
+
+
+def _chain(page_id, field, first, last):
+    """first~last 버전을 복원하는 데 필요한 행들 (first 이하의 가장 가까운 스냅샷부터, 버전 순)"""
+    snapshot = db.session.query(db.func.max(TranslationHistory.version_number)).filter(
+        TranslationHistory.page_id == page_id,
+        TranslationHistory.field == field,
+        TranslationHistory.delta.is_(None),
+        TranslationHistory.version_number <= first
+    ).scalar_subquery()
+    return TranslationHistory.query.filter(
+        TranslationHistory.page_id == page_id,
+        TranslationHistory.field == field,
+        TranslationHistory.version_number >= db.func.coalesce(snapshot, 0),
+        TranslationHistory.version_number <= last
+    ).order_by(TranslationHistory.version_number).all()
+
+
+def reconstruct(page_id, field, first, last=None):
+    """{버전: 전체 텍스트} (first~last, 쿼리 한 번)"""
+    last = first if last is None else last
+    texts = {}
+    text = ''
+    for row in _chain(page_id, field, first, last):
+        text = row.translation_text if row.delta is None else apply_delta(text, row.delta)
+        if row.version_number >= first:
+            texts[row.version_number] = text
+    return texts
+
+
+def record_version(page, field, text):
+    """page의 field 번역을 새 버전으로 기록하고 Page의 버전 포인터를 올림. 새 버전 번호 반환 (커밋은 호출하는 쪽에서)
+
+    보통은 직전 버전과의 차이만 저장하고, SNAPSHOT_INTERVAL마다 또는 차이가 원문보다 크면 전체를 저장.
+    """
+    column = Page.VERSION_COLUMNS[field]
+    previous = getattr(page, column) or 0
+    version = previous + 1
+
+    delta = None
+    if previous and version % SNAPSHOT_INTERVAL != 1:
+        # 페이지 텍스트는 PUT으로 이력 없이 고쳐질 수 있으므로 직전 버전을 복원해서 비교
+        base = reconstruct(page.id, field, previous).get(previous)
+        if base is not None:
+            delta = make_delta(base, text)
+            if len(delta) >= len(text or ''):
+                delta = None
+
+    db.session.add(TranslationHistory(
+        page=page, field=field,
+        translation_text=text if delta is None else '',
+        delta=delta,
+        version_number=version
+    ))
+    setattr(page, column, version)
+    return version
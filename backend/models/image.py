@@ -0,0 +1,26 @@
+from datetime import datetime
+import json
+
+from models.book import db
+
+
+class ImageAnalysis(db.Model):
+    """업로드 이미지(SHA-256)별 OCR 분석 결과 캐시 + 지각 해시 색인"""
+    __tablename__ = 'image_analyses'
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    filename = db.Column(db.String(500), nullable=False)
+
+    # 64비트 dHash를 16비트 4개 구간으로 나눠 색인 (근사 중복 후보 검색용)
+    phash = db.Column(db.String(16), nullable=False)
+    phash_band0 = db.Column(db.Integer, index=True)
+    phash_band1 = db.Column(db.Integer, index=True)
+    phash_band2 = db.Column(db.Integer, index=True)
+    phash_band3 = db.Column(db.Integer, index=True)
+
+    analysis_json = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @property
+    def analysis(self):
+        return json.loads(self.analysis_json)
@@ -0,0 +1,151 @@
+import json
+
+from sqlalchemy import text
+
+from models.book import db, Page, Sentence, TranslationHistory, POSITION_GAP
+from models.history import SNAPSHOT_INTERVAL, make_delta
+from models.search import init_search_index
+
+BATCH_SIZE = 200
+
+# (버전, 설명, 함수). 적용된 마지막 버전은 SQLite PRAGMA user_version에 기록
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """스키마/데이터 마이그레이션 등록. 버전은 한 번 정하면 바꾸지 말고 새 번호를 추가할 것"""
+    def decorator(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return decorator
+
+
+@migration(1, 'move pages.sentences_json into the sentences table')
+def migrate_sentences_json():
+    """pages.sentences_json 블롭을 sentences 테이블로 옮기기 (이미 옮긴 페이지는 건너뜀)
+
+    나중 마이그레이션이 pages에 추가하는 컬럼은 아직 없을 수 있으므로 ORM 모델 대신 SQL로 처리
+    """
+    moved = 0
+    while True:
+        pages = db.session.execute(text(
+            "SELECT id, sentences_json FROM pages WHERE sentences_json IS NOT NULL LIMIT :limit"
+        ), {'limit': BATCH_SIZE}).all()
+        if not pages:
+            break
+        for page_id, sentences_json in pages:
+            try:
+                sentences = json.loads(sentences_json)
+            except Exception:
+                sentences = None
+            has_rows = db.session.query(Sentence.id).filter_by(page_id=page_id).first() is not None
+            if isinstance(sentences, list) and not has_rows:
+                rows = [{
+                    'page_id': page_id,
+                    'ordinal': ordinal,
+                    'de': s.get('de', ''),
+                    'ko': s.get('ko', ''),
+                    'en': s.get('en', '')
+                } for ordinal, s in enumerate(s for s in sentences if isinstance(s, dict))]
+                if rows:
+                    db.session.execute(db.insert(Sentence.__table__), rows)
+            db.session.execute(text("UPDATE pages SET sentences_json = NULL WHERE id = :id"), {'id': page_id})
+            moved += 1
+        db.session.commit()
+    if moved:
+        print(f"📦 Migrated sentences of {moved} page(s) to the sentences table")
+
+
+migration(2, 'full-text search index over page text')(init_search_index)
+
+
+@migration(3, 'composite indexes for page order and history lookups')
+def add_lookup_indexes():
+    """create_all은 기존 테이블에 인덱스를 추가하지 않으므로 예전 DB에 직접 생성"""
+    db.session.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_pages_book_page ON pages (book_id, page_number)"
+    ))
+    db.session.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_translation_history_page_field_version "
+        "ON translation_history (page_id, field, version_number)"
+    ))
+    db.session.execute(text("ANALYZE"))
+    db.session.commit()
+
+
+@migration(4, 'sparse page ordering keys')
+def spread_page_positions():
+    """1, 2, 3… 으로 빽빽하던 pages.page_number를 POSITION_GAP 간격의 정렬 키로 (순서는 그대로)"""
+    db.session.execute(text("UPDATE pages SET page_number = page_number * :gap"), {'gap': POSITION_GAP})
+    db.session.commit()
+
+
+def _add_column(table, column, ddl):
+    """새 DB는 create_all이 이미 만든 컬럼이라 없을 때만 추가"""
+    columns = [row[1] for row in db.session.execute(text(f"PRAGMA table_info({table})"))]
+    if column not in columns:
+        db.session.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+@migration(5, 'delta-compressed translation history with version pointers on pages')
+def compact_translation_history():
+    """버전 포인터 채우고, 예전 전체 텍스트 이력을 스냅샷 + 직전 버전과의 차이로 바꾸기"""
+    _add_column('pages', 'korean_version', 'INTEGER')
+    _add_column('pages', 'english_version', 'INTEGER')
+    _add_column('translation_history', 'delta', 'TEXT')
+    for field, column in Page.VERSION_COLUMNS.items():
+        db.session.execute(text(
+            f"UPDATE pages SET {column} = (SELECT MAX(version_number) FROM translation_history h "
+            f"WHERE h.page_id = pages.id AND h.field = :field)"
+        ), {'field': field})
+    db.session.commit()
+
+    page_ids = [row[0] for row in db.session.query(TranslationHistory.page_id).distinct()]
+    compacted = 0
+    for start in range(0, len(page_ids), BATCH_SIZE):
+        rows = TranslationHistory.query.filter(
+            TranslationHistory.page_id.in_(page_ids[start:start + BATCH_SIZE]),
+            TranslationHistory.delta.is_(None)
+        ).order_by(TranslationHistory.page_id, TranslationHistory.field, TranslationHistory.version_number).all()
+        previous = None
+        for row in rows:
+            text_value = row.translation_text
+            same_chain = previous is not None and (previous.page_id, previous.field) == (row.page_id, row.field) \
+                and previous.version_number == row.version_number - 1
+            if same_chain and row.version_number % SNAPSHOT_INTERVAL != 1:
+                delta = make_delta(previous_text, text_value)
+                if len(delta) < len(text_value):
+                    row.delta = delta
+                    row.translation_text = ''
+                    compacted += 1
+            previous, previous_text = row, text_value
+        db.session.commit()
+    if compacted:
+        print(f"🗜️ Compacted {compacted} translation history version(s) into diffs")
+
+
+@migration(6, 'page modification timestamps for export cache invalidation')
+def add_page_updated_at():
+    _add_column('pages', 'updated_at', 'DATETIME')
+    db.session.execute(text("UPDATE pages SET updated_at = created_at WHERE updated_at IS NULL"))
+    db.session.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_pages_book_updated ON pages (book_id, updated_at)"
+    ))
+    db.session.commit()
+
+
+def schema_version():
+    return db.session.execute(text("PRAGMA user_version")).scalar() or 0
+
+
+def run_migrations():
+    """아직 적용되지 않은 마이그레이션을 버전 순서대로 실행"""
+    current = schema_version()
+    for version, description, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version <= current:
+            continue
+        fn()
+        db.session.execute(text(f"PRAGMA user_version = {int(version)}"))
+        db.session.commit()
+        print(f"🧱 Migration {version} applied: {description}")
+    db.session.execute(text("PRAGMA optimize"))
@@ -0,0 +1,96 @@
+from sqlalchemy import text
+
+from models.book import db
+
+# pages 테이블을 외부 콘텐츠로 쓰는 FTS5 색인. 트리거로 pages 변경과 동기화
+LANG_COLUMNS = {
+    'de': 'german_text',
+    'ko': 'korean_text',
+    'en': 'english_text'
+}
+
+FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+        german_text, korean_text, english_text,
+        content='pages', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS pages_fts_ai AFTER INSERT ON pages BEGIN
+        INSERT INTO pages_fts(rowid, german_text, korean_text, english_text)
+        VALUES (new.id, new.german_text, new.korean_text, new.english_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS pages_fts_ad AFTER DELETE ON pages BEGIN
+        INSERT INTO pages_fts(pages_fts, rowid, german_text, korean_text, english_text)
+        VALUES ('delete', old.id, old.german_text, old.korean_text, old.english_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS pages_fts_au AFTER UPDATE OF german_text, korean_text, english_text ON pages BEGIN
+        INSERT INTO pages_fts(pages_fts, rowid, german_text, korean_text, english_text)
+        VALUES ('delete', old.id, old.german_text, old.korean_text, old.english_text);
+        INSERT INTO pages_fts(rowid, german_text, korean_text, english_text)
+        VALUES (new.id, new.german_text, new.korean_text, new.english_text);
+    END
+    """
+]
+
+
+def init_search_index():
+    """FTS5 테이블/트리거 생성. 처음 만들 때는 기존 페이지로 색인을 채움"""
+    existed = db.session.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'pages_fts'"
+    )).first() is not None
+    for ddl in FTS_DDL:
+        db.session.execute(text(ddl))
+    if not existed:
+        db.session.execute(text("INSERT INTO pages_fts(pages_fts) VALUES ('rebuild')"))
+        print("🔎 Search index built")
+    db.session.commit()
+
+
+def build_match_query(q, lang=None):
+    """사용자 입력을 FTS5 MATCH 식으로 변환. 각 단어는 접두어 검색(한국어 조사 대응)"""
+    terms = [t.replace('"', '""') for t in q.split() if t.strip()]
+    if not terms:
+        return None
+    expr = ' '.join(f'"{t}"*' for t in terms)
+    if lang in LANG_COLUMNS:
+        expr = f'{LANG_COLUMNS[lang]} : ({expr})'
+    return expr
+
+
+def search_pages(q, lang=None, book_id=None, limit=20, offset=0):
+    match = build_match_query(q, lang)
+    if match is None:
+        return [], False
+
+    # snippet 열 번호: 언어를 지정하면 그 열, 아니면 -1(가장 잘 맞는 열 자동 선택)
+    column = list(LANG_COLUMNS).index(lang) if lang in LANG_COLUMNS else -1
+    # pages.page_number 열은 간격을 둔 정렬 키라서 화면용 번호는 순위로 계산
+    sql = f"""
+        SELECT p.id AS page_id, p.book_id, b.title AS book_title,
+               (SELECT COUNT(*) FROM pages q
+                WHERE q.book_id = p.book_id AND q.page_number <= p.page_number) AS page_number,
+               snippet(pages_fts, {column}, '<mark>', '</mark>', '…', 16) AS snippet,
+               bm25(pages_fts) AS score
+        FROM pages_fts
+        JOIN pages p ON p.id = pages_fts.rowid
+        JOIN books b ON b.id = p.book_id
+        WHERE pages_fts MATCH :match
+        {'AND p.book_id = :book_id' if book_id is not None else ''}
+        ORDER BY score
+        LIMIT :limit OFFSET :offset
+    """
+    rows = db.session.execute(text(sql), {
+        'match': match,
+        'book_id': book_id,
+        'limit': limit + 1,
+        'offset': offset
+    }).mappings().all()
+    has_more = len(rows) > limit
+    return [dict(r) for r in rows[:limit]], has_more
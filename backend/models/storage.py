@@ -0,0 +1,79 @@
+import os
+
+from sqlalchemy import event
+
+from models.book import db
+
+# SQLite 연결마다 적용할 PRAGMA 묶음. SQLITE_PROFILE로 고르고 SQLITE_* 환경변수로 항목별 덮어쓰기
+STORAGE_PROFILES = {
+    # WAL: 읽기가 쓰기를 기다리지 않음. synchronous=NORMAL은 WAL에서 안전하면서 커밋이 빠름
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'busy_timeout': 5000,
+        'cache_size': -64000,
+        'temp_store': 'MEMORY'
+    },
+    # 예전 기본값 (롤백 저널, 매 커밋 fsync)
+    'compat': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'mmap_size': 0,
+        'busy_timeout': 5000,
+        'cache_size': -2000,
+        'temp_store': 'DEFAULT'
+    }
+}
+
+
+def storage_settings():
+    profile = os.getenv('SQLITE_PROFILE', 'production')
+    if profile not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE: {profile}")
+    settings = dict(STORAGE_PROFILES[profile])
+    for name, default in settings.items():
+        value = os.getenv(f'SQLITE_{name.upper()}')
+        if value is not None:
+            settings[name] = type(default)(value)
+    return profile, settings
+
+
+def configure_storage(app):
+    """db.init_app 전에 호출: 연결 풀 옵션 설정. init_app 후에는 attach_pragmas 호출"""
+    if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        return
+    profile, settings = storage_settings()
+    app.config['SQLITE_PROFILE'] = profile
+    app.config['SQLITE_PRAGMAS'] = settings
+    if ':memory:' in app.config['SQLALCHEMY_DATABASE_URI']:
+        return
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'].update({
+        # 워커 스레드 + 요청 스레드가 동시에 쓰므로 넉넉하게
+        'pool_size': int(os.getenv('SQLITE_POOL_SIZE', 10)),
+        'max_overflow': int(os.getenv('SQLITE_MAX_OVERFLOW', 20)),
+        'pool_timeout': float(os.getenv('SQLITE_POOL_TIMEOUT', 30)),
+        'connect_args': {
+            'timeout': settings['busy_timeout'] / 1000,
+            'check_same_thread': False
+        }
+    })
+
+
+def attach_pragmas(app):
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if not pragmas:
+        return
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    print(f"🗄️ SQLite profile: {app.config['SQLITE_PROFILE']} "
+          f"(journal={pragmas['journal_mode']}, synchronous={pragmas['synchronous']})")
@@ -1,5 +1,9 @@
-from flask import Blueprint, request, jsonify
-from models.book import db, Book, Page, TranslationHistory
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from models.book import db, Book, Page, Sentence, TranslationHistory
+from models.history import reconstruct
+from services.job_events import format_sse
+from services.openai_scheduler import request_priority
+from services.page_store import append_page, apply_translation, place_page, reorder_pages
 import json
 
 book_bp = Blueprint('book', __name__)
@@ -35,111 +39,189 @@ def get_book(book_id):
         'book': book.to_dict()
     })
 
+MAX_PAGE_LIMIT = 500
+
 @book_bp.route('/books/<int:book_id>/pages', methods=['GET'])
 def get_book_pages(book_id):
+    """페이지 목록. 쿼리 파라미터 (모두 선택):
+    - limit, after: 커서 페이지네이션 (응답의 next_cursor를 after로 전달, 값은 정렬 키라 그대로 넘기기만 할 것)
+    - from, to: 페이지 번호 범위 (1부터, 양 끝 포함)
+    - fields: 콤마로 구분한 필드만 반환 (예: id,page_number,page_type)
+    """
+    from sqlalchemy.orm import load_only, selectinload
     book = Book.query.get_or_404(book_id)
-    pages = Page.query.filter_by(book_id=book_id).order_by(Page.page_number).all()
+
+    fields = None
+    if request.args.get('fields'):
+        fields = [f.strip() for f in request.args['fields'].split(',') if f.strip()]
+        unknown = [f for f in fields if f not in Page.FIELD_COLUMNS]
+        if unknown:
+            return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+
+    limit = request.args.get('limit', type=int)
+    after = request.args.get('after', type=int)
+    page_from = request.args.get('from', type=int)
+    page_to = request.args.get('to', type=int)
+
+    def position_at(number):
+        """number번째 페이지의 정렬 키 (없으면 None)"""
+        return db.session.query(Page.position).filter(Page.book_id == book_id) \
+            .order_by(Page.position).offset(max(0, number - 1)).limit(1).scalar()
+
+    query = Page.query.filter(Page.book_id == book_id)
+    if fields is not None:
+        columns = {'id', 'book_id', 'position'} | {Page.FIELD_COLUMNS[f] for f in fields if Page.FIELD_COLUMNS[f]}
+        query = query.options(load_only(*[getattr(Page, c) for c in columns]))
+    if fields is None or 'sentences' in fields:
+        query = query.options(selectinload(Page.sentence_rows))
+    if after is not None:
+        query = query.filter(Page.position > after)
+    if page_from is not None:
+        lower = position_at(page_from)
+        query = query.filter(Page.position >= lower) if lower is not None else query.filter(db.false())
+    if page_to is not None:
+        upper = position_at(page_to)
+        if upper is not None:
+            query = query.filter(Page.position <= upper)
+    query = query.order_by(Page.position)
+
+    next_cursor = None
+    if limit is not None:
+        limit = max(1, min(limit, MAX_PAGE_LIMIT))
+        pages = query.limit(limit + 1).all()
+        if len(pages) > limit:
+            pages = pages[:limit]
+            next_cursor = pages[-1].position
+    else:
+        pages = query.all()
+
+    # 페이지 번호는 첫 페이지 앞에 몇 장 있는지 한 번만 세서 이어 붙임
+    first_number = pages[0].page_number if pages else 1
     return jsonify({
         'success': True,
         'book_id': book_id,
         'title': book.title,
-        'pages': [page.to_dict() for page in pages]
+        'pages': [page.to_dict(fields, number=first_number + i) for i, page in enumerate(pages)],
+        'next_cursor': next_cursor
     })
 
 @book_bp.route('/books/<int:book_id>/pages', methods=['POST'])
 def add_page(book_id):
     book = Book.query.get_or_404(book_id)
     data = request.json
-    last_page = Page.query.filter_by(book_id=book_id).order_by(Page.page_number.desc()).first()
-    next_page_number = (last_page.page_number + 1) if last_page else 1
-
-    sentences_data = data.get('sentences', None)
-    sentences_str = json.dumps(sentences_data, ensure_ascii=False) if sentences_data else None
-
-    page = Page(
-        book_id=book_id,
-        page_number=next_page_number,
-        page_type=data.get('page_type', 'text'),
-        german_text=data.get('german_text', ''),
-        korean_text=data.get('korean_text', ''),
-        english_text=data.get('english_text', ''),
-        sentences_json=sentences_str,
-        original_image_url=data.get('original_image_url', ''),
-        content_images=data.get('content_images', '')
-    )
-    db.session.add(page)
-
-    if data.get('korean_text'):
-        db.session.add(TranslationHistory(
-            page=page, field='korean_text',
-            translation_text=data.get('korean_text'),
-            version_number=1, is_active=True
-        ))
-    if data.get('english_text'):
-        db.session.add(TranslationHistory(
-            page=page, field='english_text',
-            translation_text=data.get('english_text'),
-            version_number=1, is_active=True
-        ))
+    page = append_page(book_id, data)
     db.session.commit()
     return jsonify({
         'success': True,
         'page': page.to_dict()
     }), 201
 
+@book_bp.route('/books/<int:book_id>/ingest', methods=['POST'])
+def ingest_pages(book_id):
+    """여러 이미지(multipart 'images' 또는 zip 'archive')를 한 번에 받아 일괄 처리 작업으로 등록"""
+    from services.ingest import images_from_zip, save_ingest_uploads
+    from services.job_queue import job_queue
+    Book.query.get_or_404(book_id)
+
+    files = [(f.filename, f.read()) for f in request.files.getlist('images')]
+    if 'archive' in request.files:
+        try:
+            files.extend(images_from_zip(request.files['archive'].read()))
+        except Exception as e:
+            return jsonify({'error': f'Invalid archive: {str(e)}'}), 400
+    if not files:
+        return jsonify({'error': 'No images provided'}), 400
+
+    images = save_ingest_uploads(files)
+    job = job_queue.submit('ingest', {'book_id': book_id, 'images': images})
+    print(f"📥 Ingest job queued: {job.id} ({len(images)} pages)")
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'page_count': len(images)
+    }), 202
+
+@book_bp.route('/books/<int:book_id>/batch-retranslate', methods=['POST'])
+def batch_retranslate_book(book_id):
+    """책 전체(또는 page_ids)를 Batch API로 다시 번역하는 작업 등록 (결과는 완료 후 한 번에 반영)"""
+    from services.job_queue import job_queue
+    Book.query.get_or_404(book_id)
+    data = request.json or {}
+    page_ids = data.get('page_ids')
+    if page_ids is not None and not all(isinstance(i, int) for i in page_ids):
+        return jsonify({'error': 'page_ids must be a list of integers'}), 400
+
+    job = job_queue.submit('batch_retranslate', {
+        'book_id': book_id,
+        'page_ids': page_ids,
+        'force': bool(data.get('force', False))
+    })
+    print(f"📦 Batch retranslate job queued: {job.id}")
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status
+    }), 202
+
+@book_bp.route('/books/<int:book_id>/export', methods=['GET'])
+def export_book(book_id):
+    """책 내보내기 (?format=epub|html|jsonl). 만들면서 바로 스트리밍하고, 완성본은 페이지가 바뀔 때까지 캐시"""
+    from flask import send_file
+    from services.export import FORMATS, cached_artifact, stream_export
+    book = Book.query.get_or_404(book_id)
+    fmt = request.args.get('format', 'epub')
+    if fmt not in FORMATS:
+        return jsonify({'error': f"Unknown format: {fmt}"}), 400
+
+    mimetype, extension = FORMATS[fmt]
+    download_name = f"book-{book_id}.{extension}"
+    cached, path = cached_artifact(book, fmt)
+    if cached:
+        response = send_file(cached, mimetype=mimetype, as_attachment=True,
+                             download_name=download_name, conditional=True)
+        response.headers['X-Export-Cache'] = 'hit'
+        return response
+
+    print(f"📚 Exporting book {book_id} as {fmt}")
+    return Response(
+        stream_with_context(stream_export(book, fmt, path)),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename="{download_name}"',
+            'X-Accel-Buffering': 'no',
+            'X-Export-Cache': 'miss'
+        }
+    )
+
 @book_bp.route('/pages/<int:page_id>', methods=['DELETE'])
 def delete_page(page_id):
+    # 정렬 키에 간격이 있으므로 뒤 페이지들의 번호를 고칠 필요 없음
     page = Page.query.get_or_404(page_id)
-    book_id = page.book_id
-
     db.session.delete(page)
-
-    # 페이지 번호 재정렬
-    remaining = Page.query.filter_by(book_id=book_id).order_by(Page.page_number).all()
-    for idx, p in enumerate(remaining):
-        p.page_number = idx + 1
-
     db.session.commit()
-    return jsonify({'success': True})
+    return jsonify({'success': True, 'deleted_id': page_id})
 
 @book_bp.route('/pages/<int:page_id>', methods=['PUT'])
 def update_page(page_id):
     page = Page.query.get_or_404(page_id)
     data = request.json
 
-    if 'korean_text' in data:
-        page.korean_text = data['korean_text']
-        # sentences_json에서 한국어도 업데이트
-        if page.sentences_json:
-            sentences = json.loads(page.sentences_json)
-            new_lines = data['korean_text'].split('\n')
-            for i, s in enumerate(sentences):
-                if i < len(new_lines):
-                    s['ko'] = new_lines[i]
-            page.sentences_json = json.dumps(sentences, ensure_ascii=False)
-
-    if 'english_text' in data:
-        page.english_text = data['english_text']
-        if page.sentences_json:
-            sentences = json.loads(page.sentences_json)
-            new_lines = data['english_text'].split('\n')
-            for i, s in enumerate(sentences):
-                if i < len(new_lines):
-                    s['en'] = new_lines[i]
-            page.sentences_json = json.dumps(sentences, ensure_ascii=False)
-
+    # 번역 텍스트의 줄 단위 수정은 같은 순번의 문장 행에 반영.
+    # 독일어 원문은 줄이 문장과 맞지 않으므로 문장 행의 de는 그대로 두고, 재번역 때 비교해서 바뀐 문장만 번역
     if 'german_text' in data:
         page.german_text = data['german_text']
-        if page.sentences_json:
-            sentences = json.loads(page.sentences_json)
-            new_lines = data['german_text'].split('\n')
-            for i, s in enumerate(sentences):
+    line_fields = [('korean_text', 'ko'), ('english_text', 'en')]
+    for field, lang in line_fields:
+        if field in data:
+            setattr(page, field, data[field])
+            new_lines = data[field].split('\n')
+            for i, row in enumerate(page.sentence_rows):
                 if i < len(new_lines):
-                    s['de'] = new_lines[i]
-            page.sentences_json = json.dumps(sentences, ensure_ascii=False)
+                    row.update_from({lang: new_lines[i]})
 
     if 'sentences' in data:
-        page.sentences_json = json.dumps(data['sentences'], ensure_ascii=False)
+        page.set_sentences(data['sentences'])
 
     db.session.commit()
     return jsonify({
@@ -147,93 +229,234 @@ def update_page(page_id):
         'page': page.to_dict()
     })
 
+def _replace_line(text, index, old_value, new_value):
+    lines = (text or '').split('\n')
+    if index < len(lines) and lines[index] == old_value:
+        lines[index] = new_value
+    return '\n'.join(lines)
+
+@book_bp.route('/pages/<int:page_id>/sentences/<int:ordinal>', methods=['PATCH'])
+def update_sentence(page_id, ordinal):
+    """문장 하나만 수정 (de/ko/en 중 보낸 것만). 페이지의 줄 단위 텍스트도 해당 줄만 교체"""
+    sentence = Sentence.query.filter_by(page_id=page_id, ordinal=ordinal).first_or_404()
+    data = request.json or {}
+    changes = {lang: data[lang] for lang in ('de', 'ko', 'en') if lang in data}
+    if not changes:
+        return jsonify({'error': 'Nothing to update'}), 400
+
+    page = sentence.page
+    if 'ko' in changes:
+        page.korean_text = _replace_line(page.korean_text, ordinal, sentence.ko, changes['ko'])
+    if 'en' in changes:
+        page.english_text = _replace_line(page.english_text, ordinal, sentence.en, changes['en'])
+    if 'de' in changes and sentence.de and page.german_text and sentence.de in page.german_text:
+        page.german_text = page.german_text.replace(sentence.de, changes['de'], 1)
+
+    sentence.update_from(changes)
+    db.session.commit()
+    return jsonify({
+        'success': True,
+        'ordinal': ordinal,
+        'sentence': sentence.to_dict()
+    })
+
+
 @book_bp.route('/pages/<int:page_id>/move', methods=['POST'])
 def move_page(page_id):
+    """페이지 이동. direction('up'/'down')으로 한 칸, 또는 after_id/before_id로 그 페이지 바로 뒤/앞으로.
+    바뀐 페이지만 새 page_number와 함께 반환"""
     page = Page.query.get_or_404(page_id)
-    data = request.json
-    direction = data.get('direction')  # 'up' or 'down'
-
-    if direction == 'up' and page.page_number > 1:
-        swap = Page.query.filter_by(
-            book_id=page.book_id,
-            page_number=page.page_number - 1
-        ).first()
-        if swap:
-            swap.page_number, page.page_number = page.page_number, swap.page_number
-            db.session.commit()
+    data = request.json or {}
+    direction = data.get('direction')
+
+    anchor = None
+    after = True
+    if data.get('after_id') is not None or data.get('before_id') is not None:
+        after = data.get('after_id') is not None
+        anchor = db.session.get(Page, data['after_id'] if after else data['before_id'])
+        if anchor is None or anchor.book_id != page.book_id or anchor.id == page.id:
+            return jsonify({'error': 'Anchor page must be another page of the same book'}), 400
+    elif direction in ('up', 'down'):
+        # 한 칸 위 = 앞 페이지의 앞, 한 칸 아래 = 뒤 페이지의 뒤
+        after = direction == 'down'
+        query = Page.query.filter(Page.book_id == page.book_id)
+        if after:
+            anchor = query.filter(Page.position > page.position).order_by(Page.position).first()
+        else:
+            anchor = query.filter(Page.position < page.position).order_by(Page.position.desc()).first()
+    else:
+        return jsonify({'error': 'Provide direction (up/down), after_id or before_id'}), 400
 
-    elif direction == 'down':
-        swap = Page.query.filter_by(
-            book_id=page.book_id,
-            page_number=page.page_number + 1
-        ).first()
-        if swap:
-            swap.page_number, page.page_number = page.page_number, swap.page_number
-            db.session.commit()
+    if anchor is not None:
+        place_page(page, anchor, after=after)
+        db.session.commit()
 
-    pages = Page.query.filter_by(book_id=page.book_id).order_by(Page.page_number).all()
     return jsonify({
         'success': True,
-        'pages': [p.to_dict() for p in pages]
+        'pages': [page.to_dict(['id', 'page_number'])]
+    })
+
+@book_bp.route('/books/<int:book_id>/reorder', methods=['POST'])
+def reorder_book_pages(book_id):
+    """page_ids 순서대로 재배치 (전체 순서 또는 일부 페이지만). 일부만 보내면 그 페이지들이
+    차지하던 자리 안에서만 순서가 바뀜. 자리가 바뀐 페이지만 새 page_number와 함께 반환"""
+    Book.query.get_or_404(book_id)
+    page_ids = (request.json or {}).get('page_ids')
+    if not isinstance(page_ids, list) or not page_ids or not all(isinstance(i, int) for i in page_ids):
+        return jsonify({'error': 'page_ids must be a non-empty list of integers'}), 400
+
+    try:
+        moved = reorder_pages(book_id, page_ids)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    db.session.commit()
+
+    pages = Page.query.filter(Page.id.in_(list(moved))).order_by(Page.position).all() if moved else []
+    return jsonify({
+        'success': True,
+        'pages': [p.to_dict(['id', 'page_number']) for p in pages]
     })
 
 @book_bp.route('/pages/<int:page_id>/retranslate', methods=['POST'])
 def retranslate_page(page_id):
-    from services.openai_service import translate_with_sentence_mapping
+    """재번역. 저장된 문장과 비교해서 바뀐/새 문장만 앞뒤 문맥과 함께 다시 번역하고 끼워 넣음.
+    바뀐 게 없거나 너무 많이 바뀌었으면(또는 full=true) 페이지 전체를 다시 번역"""
+    from services.openai_service import (
+        translate_with_sentence_mapping,
+        stream_translate_with_sentence_mapping
+    )
+    from services.chunked_translate import needs_chunking, stream_translate_chunked, translate_chunked
+    from services.retranslate import plan_incremental, translate_segments
     page = Page.query.get_or_404(page_id)
     data = request.json
     field = data.get('field')
     if field not in ['korean', 'english', 'all']:
         return jsonify({'error': 'Invalid field'}), 400
-    try:
-        sentences = translate_with_sentence_mapping(page.german_text)
-
-        new_korean = '\n'.join([s['ko'] for s in sentences])
-        new_english = '\n'.join([s['en'] for s in sentences])
-
-        page.korean_text = new_korean
-        page.english_text = new_english
-        page.sentences_json = json.dumps(sentences, ensure_ascii=False)
-
-        last_ko = TranslationHistory.query.filter_by(
-            page_id=page_id, field='korean_text'
-        ).order_by(TranslationHistory.version_number.desc()).first()
-        next_ko_ver = (last_ko.version_number + 1) if last_ko else 1
-        TranslationHistory.query.filter_by(
-            page_id=page_id, field='korean_text'
-        ).update({'is_active': False})
-        db.session.add(TranslationHistory(
-            page_id=page_id, field='korean_text',
-            translation_text=new_korean,
-            version_number=next_ko_ver, is_active=True
-        ))
-
-        last_en = TranslationHistory.query.filter_by(
-            page_id=page_id, field='english_text'
-        ).order_by(TranslationHistory.version_number.desc()).first()
-        next_en_ver = (last_en.version_number + 1) if last_en else 1
-        TranslationHistory.query.filter_by(
-            page_id=page_id, field='english_text'
-        ).update({'is_active': False})
-        db.session.add(TranslationHistory(
-            page_id=page_id, field='english_text',
-            translation_text=new_english,
-            version_number=next_en_ver, is_active=True
-        ))
+    # force=true면 캐시를 건너뛰고 새 번역 요청
+    force = bool(data.get('force', False))
+    segments = None if data.get('full') else plan_incremental(page)
+    mode = 'incremental' if segments else 'full'
+
+    if data.get('stream'):
+        # 문장이 번역되는 대로 SSE로 보내고, 끝나면 한 번에 커밋
+        german_text = page.german_text
+
+        def translated_events():
+            if segments:
+                sentences, changed = translate_segments(segments, bypass_cache=force)
+                for ordinal in changed:
+                    yield 'sentence', {**sentences[ordinal], 'ordinal': ordinal}
+                yield 'done', (sentences, changed)
+                return
+            if needs_chunking(german_text):
+                # 긴 페이지는 청크로 나눠 동시에 번역
+                events = stream_translate_chunked(german_text, bypass_cache=force)
+            else:
+                events = stream_translate_with_sentence_mapping(german_text, bypass_cache=force)
+            for event, payload in events:
+                if event == 'done' and isinstance(payload, dict):
+                    payload = payload['sentences']
+                yield event, payload if event == 'sentence' else (payload, list(range(len(payload))))
+
+        def generate():
+            try:
+                with request_priority('retranslate'):
+                    for event, payload in translated_events():
+                        if event == 'sentence':
+                            yield format_sse('sentence', payload)
+                        elif event == 'done':
+                            sentences, changed = payload
+                            # 스트리밍 중에는 다른 세션일 수 있으니 페이지를 다시 읽어서 반영
+                            page = db.session.get(Page, page_id)
+                            new_version, _ = apply_translation(page, sentences)
+                            db.session.commit()
+                            yield format_sse('done', {
+                                'success': True,
+                                'page': page.to_dict(),
+                                'new_version': new_version,
+                                'mode': mode,
+                                'retranslated': changed
+                            })
+            except Exception as e:
+                db.session.rollback()
+                yield format_sse('error', {'error': str(e)})
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
 
+    try:
+        with request_priority('retranslate'):
+            if segments:
+                sentences, changed = translate_segments(segments, bypass_cache=force)
+            elif needs_chunking(page.german_text):
+                sentences = translate_chunked(page.german_text, bypass_cache=force)['sentences']
+                changed = list(range(len(sentences)))
+            else:
+                sentences = translate_with_sentence_mapping(page.german_text, bypass_cache=force)
+                changed = list(range(len(sentences)))
+        next_ko_ver, _ = apply_translation(page, sentences)
         db.session.commit()
         return jsonify({
             'success': True,
             'page': page.to_dict(),
-            'new_version': next_ko_ver
+            'new_version': next_ko_ver,
+            'mode': mode,
+            'retranslated': changed
         })
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
+MAX_HISTORY_LIMIT = 100
+
+@book_bp.route('/pages/<int:page_id>/history', methods=['GET'])
+def get_page_history(page_id):
+    """번역 이력 (최신 버전부터). 쿼리 파라미터 (모두 선택):
+    - field: korean(기본) / english
+    - limit, before: 버전 번호 기준 커서 페이지네이션 (응답의 next_cursor를 before로 전달)
+    - text: 1이면 각 버전의 전체 텍스트를 복원해서 포함
+    """
+    page = Page.query.get_or_404(page_id)
+    field = request.args.get('field', 'korean')
+    if field not in ['korean', 'english']:
+        return jsonify({'error': 'Invalid field'}), 400
+    field = f'{field}_text'
+    limit = max(1, min(request.args.get('limit', 20, type=int), MAX_HISTORY_LIMIT))
+    before = request.args.get('before', type=int)
+
+    query = TranslationHistory.query.filter_by(page_id=page_id, field=field)
+    if before is not None:
+        query = query.filter(TranslationHistory.version_number < before)
+    rows = query.order_by(TranslationHistory.version_number.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1].version_number
+
+    texts = {}
+    if rows and request.args.get('text') in ('1', 'true'):
+        texts = reconstruct(page_id, field, rows[-1].version_number, rows[0].version_number)
+
+    return jsonify({
+        'success': True,
+        'page_id': page_id,
+        'field': field,
+        'active_version': getattr(page, Page.VERSION_COLUMNS[field]),
+        'history': [row.to_dict(texts.get(row.version_number)) for row in rows],
+        'next_cursor': next_cursor
+    })
+
+
 @book_bp.route('/pages/<int:page_id>/recrop', methods=['POST'])
 def recrop_page(page_id):
+    """블록 크롭 범위 조정. 최근 원본은 디코딩된 채로 메모리에 있고, 같은 범위의 크롭은 파일을 그대로 씀"""
+    import os
+    from services.crop_engine import crop_regions, image_key_for_file
+    from services.ocr_pipeline import UPLOAD_FOLDER as upload_folder
     page = Page.query.get_or_404(page_id)
     data = request.json
     block_index = data.get('block_index', 0)
@@ -249,37 +472,28 @@ def recrop_page(page_id):
             block['crop_percent'] = {'top': crop_top, 'bottom': crop_bottom}
 
             # 원본 이미지에서 re-crop
-            import os
-            from PIL import Image
-            import io
-            import uuid
-            from datetime import datetime
-
-            upload_folder = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
-            original_path = os.path.join(upload_folder, page.original_image_url)
-
-            if os.path.exists(original_path):
-                img = Image.open(original_path)
-                width, height = img.size
-                top_px = max(0, int(height * crop_top / 100))
-                bottom_px = min(height, int(height * crop_bottom / 100))
-                left_px = int(width * 0.05)
-                right_px = int(width * 0.95)
-                cropped = img.crop((left_px, top_px, right_px, bottom_px))
-
-                crop_filename = f"crop_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.png"
-                crop_path = os.path.join(upload_folder, crop_filename)
-                cropped.save(crop_path, 'PNG')
-
-                # 이전 크롭 파일 삭제 (optional)
+            original = page.original_image_url
+            original_path = os.path.join(upload_folder, original) if original else None
+
+            if original_path and os.path.exists(original_path):
+                def load_original():
+                    with open(original_path, 'rb') as f:
+                        return f.read()
+
                 old_file = block.get('image_file', '')
-                if old_file and old_file.startswith('crop_'):
+                block['image_file'] = crop_regions(
+                    image_key_for_file(original), load_original, [(crop_top, crop_bottom)]
+                )[0]
+
+                # 이전 크롭 파일은 다른 페이지가 쓰지 않을 때만 삭제
+                if old_file and old_file.startswith('crop_') and old_file != block['image_file']:
+                    shared = Page.query.filter(
+                        Page.id != page.id, Page.content_images.contains(old_file)
+                    ).first() is not None
                     old_path = os.path.join(upload_folder, old_file)
-                    if os.path.exists(old_path):
+                    if not shared and os.path.exists(old_path):
                         os.remove(old_path)
 
-                block['image_file'] = crop_filename
-
             page.content_images = json.dumps(blocks, ensure_ascii=False)
             db.session.commit()
 
@@ -0,0 +1,71 @@
+import queue
+
+from flask import Blueprint, Response, jsonify, stream_with_context
+from models.book import db
+from models.job import Job
+from services.job_events import job_events, format_sse
+from services.job_queue import job_queue, TERMINAL_STATUSES
+
+job_bp = Blueprint('job', __name__)
+
+KEEPALIVE_SECONDS = 15
+
+
+@job_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = Job.query.get_or_404(job_id)
+    return jsonify({
+        'success': True,
+        'job': job.to_dict()
+    })
+
+
+@job_bp.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    job = Job.query.get_or_404(job_id)
+    job_queue.cancel(job)
+    return jsonify({
+        'success': True,
+        'job': job.to_dict()
+    })
+
+
+@job_bp.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events_stream(job_id):
+    """작업 진행을 Server-Sent Events로 전달: stages(단계 변경), sentence(번역된 문장), done(최종 결과)"""
+    snapshot = Job.query.get_or_404(job_id).to_dict()
+
+    def generate():
+        history, q = job_events.subscribe(job_id)
+        try:
+            yield format_sse('stages', snapshot['stages'])
+            if snapshot['status'] in TERMINAL_STATUSES:
+                yield format_sse('done', snapshot)
+                return
+            for event, data in history:
+                yield format_sse(event, data)
+                if event == 'done':
+                    return
+            while True:
+                try:
+                    event, data = q.get(timeout=KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    # 다른 프로세스의 워커가 처리했을 수도 있으니 DB도 확인
+                    db.session.expire_all()
+                    job = db.session.get(Job, job_id)
+                    if job is not None and job.status in TERMINAL_STATUSES:
+                        yield format_sse('done', job.to_dict())
+                        return
+                    yield ': keepalive\n\n'
+                    continue
+                yield format_sse(event, data)
+                if event == 'done':
+                    return
+        finally:
+            job_events.unsubscribe(job_id, q)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
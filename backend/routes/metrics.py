@@ -0,0 +1,126 @@
+import cProfile
+import io
+import pstats
+
+from flask import Blueprint, Response, current_app, g, jsonify, request
+from services.metrics import (
+    registry,
+    http_request_seconds,
+    begin_trace,
+    end_trace,
+    log_trace
+)
+from services.crop_engine import decoded_images
+from services.openai_scheduler import scheduler, PRIORITIES
+from services.translation_cache import translation_cache
+
+metrics_bp = Blueprint('metrics', __name__)
+
+PROFILE_TOP_FUNCTIONS = 25
+
+
+@registry.collector
+def _translation_cache_metrics():
+    stats = translation_cache.stats()
+    by_function = stats['by_function']
+    return [
+        ('wagner_translation_cache_hits_total', 'counter', 'Translation cache hits per function',
+         [({'function': fn}, counts['hits']) for fn, counts in by_function.items()]),
+        ('wagner_translation_cache_misses_total', 'counter', 'Translation cache misses per function',
+         [({'function': fn}, counts['misses']) for fn, counts in by_function.items()]),
+        ('wagner_translation_cache_hit_ratio', 'gauge', 'Translation cache hit ratio since start',
+         [({}, stats['hit_rate'])]),
+        ('wagner_translation_cache_entries', 'gauge', 'Entries in the translation cache',
+         [({}, stats['entries'])]),
+    ]
+
+
+@registry.collector
+def _crop_cache_metrics():
+    stats = decoded_images.stats()
+    return [
+        ('wagner_crop_decoded_cache_hits_total', 'counter', 'Crops served from an already decoded original',
+         [({}, stats['hits'])]),
+        ('wagner_crop_decoded_cache_misses_total', 'counter', 'Originals decoded for cropping',
+         [({}, stats['misses'])]),
+        ('wagner_crop_decoded_cache_images', 'gauge', 'Decoded originals held in memory',
+         [({}, stats['images'])]),
+    ]
+
+
+@registry.collector
+def _scheduler_metrics():
+    stats = scheduler.stats()
+    return [
+        ('wagner_openai_requests_sent_total', 'counter', 'OpenAI requests admitted by the scheduler',
+         [({}, stats['sent'])]),
+        ('wagner_openai_retries_total', 'counter', 'OpenAI retries after retryable errors',
+         [({}, stats['retries'])]),
+        ('wagner_openai_rate_limited_total', 'counter', 'OpenAI 429 responses',
+         [({}, stats['rate_limited'])]),
+        ('wagner_openai_deadline_exceeded_total', 'counter', 'OpenAI calls abandoned at their deadline',
+         [({}, stats['deadline_exceeded'])]),
+        ('wagner_openai_waiting_requests', 'gauge', 'OpenAI calls waiting for quota by priority',
+         [({'priority': name}, stats['waiting'][name]) for name in PRIORITIES]),
+    ]
+
+
+@metrics_bp.before_app_request
+def _start_request_trace():
+    g.metrics_trace, g.metrics_trace_token = begin_trace(f'{request.method} {request.path}')
+    g.profiler = None
+    if current_app.config.get('PROFILE_SLOW_REQUESTS'):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            g.profiler = profiler
+        except ValueError:
+            # 다른 스레드에서 이미 프로파일러가 돌고 있으면 이번 요청은 건너뜀
+            pass
+
+
+@metrics_bp.after_app_request
+def _finish_request_trace(response):
+    current = g.pop('metrics_trace', None)
+    if current is None:
+        return response
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+    end_trace(g.pop('metrics_trace_token'))
+
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    http_request_seconds.observe(current.elapsed, method=request.method, route=route, status=response.status_code)
+
+    if current.elapsed >= current_app.config.get('SLOW_REQUEST_SECONDS', 2.0):
+        log_trace(current, prefix='🐢 Slow request')
+        if profiler is not None:
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+            print(out.getvalue())
+    return response
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus 텍스트 형식"""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+@metrics_bp.route('/metrics/profiling', methods=['GET', 'POST'])
+def profiling():
+    """느린 요청 프로파일링 켜기/끄기. POST {"enabled": true, "slow_seconds": 1.5}"""
+    if request.method == 'POST':
+        data = request.json or {}
+        if 'enabled' in data:
+            current_app.config['PROFILE_SLOW_REQUESTS'] = bool(data['enabled'])
+        if 'slow_seconds' in data:
+            try:
+                current_app.config['SLOW_REQUEST_SECONDS'] = float(data['slow_seconds'])
+            except (TypeError, ValueError):
+                return jsonify({'error': 'slow_seconds must be a number'}), 400
+    return jsonify({
+        'success': True,
+        'enabled': current_app.config.get('PROFILE_SLOW_REQUESTS', False),
+        'slow_seconds': current_app.config.get('SLOW_REQUEST_SECONDS', 2.0)
+    })
@@ -0,0 +1,35 @@
+from flask import Blueprint, request, jsonify
+from sqlalchemy.exc import OperationalError
+from models.search import LANG_COLUMNS, search_pages
+
+search_bp = Blueprint('search', __name__)
+
+MAX_SEARCH_LIMIT = 100
+
+
+@search_bp.route('/search', methods=['GET'])
+def search():
+    """전체 책 검색. q(필수), lang=de|ko|en, book_id, limit, offset"""
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({'error': 'Missing query'}), 400
+    lang = request.args.get('lang') or None
+    if lang is not None and lang not in LANG_COLUMNS:
+        return jsonify({'error': 'Invalid lang'}), 400
+
+    book_id = request.args.get('book_id', type=int)
+    limit = max(1, min(request.args.get('limit', 20, type=int), MAX_SEARCH_LIMIT))
+    offset = max(0, request.args.get('offset', 0, type=int))
+
+    try:
+        results, has_more = search_pages(q, lang, book_id, limit, offset)
+    except OperationalError as e:
+        return jsonify({'error': f'Invalid search query: {str(e.orig)}'}), 400
+
+    return jsonify({
+        'success': True,
+        'query': q,
+        'results': results,
+        'offset': offset,
+        'next_offset': offset + limit if has_more else None
+    })
@@ -0,0 +1,294 @@
+import io
+import json
+import os
+import re
+import time
+import uuid
+
+from models.book import db, Page
+from services.job_queue import job_handler, JobCancelled
+from services.openai_service import (
+    client,
+    MODEL,
+    PROMPT_VERSION,
+    SENTENCES_FORMAT,
+    SENTENCES_SCHEMA,
+    _sentence_mapping_messages
+)
+from services.page_store import apply_translation
+from services.structured import parse_structured
+from services.translation_cache import translation_cache, TranslationCache
+
+BATCH_STAGES = ['submit', 'wait', 'apply']
+# openai: 실제 Batch API / local: 네트워크 없이 파일로 흉내 내는 테스트용 백엔드
+BATCH_BACKEND = os.getenv('OPENAI_BATCH_BACKEND', 'openai')
+BATCH_LOCAL_DIR = os.getenv(
+    'OPENAI_BATCH_LOCAL_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'batches')
+)
+BATCH_POLL_SECONDS = float(os.getenv('OPENAI_BATCH_POLL_SECONDS', 30))
+FAILED_STATUSES = ('failed', 'expired', 'cancelled', 'cancelling')
+CACHE_FUNCTION = 'translate_with_sentence_mapping'
+
+
+class OpenAIBatchBackend:
+    """OpenAI Batch API (/v1/chat/completions, 24시간 창)"""
+
+    poll_seconds = BATCH_POLL_SECONDS
+
+    def submit(self, lines):
+        payload = ''.join(json.dumps(line, ensure_ascii=False) + '\n' for line in lines)
+        input_file = client.files.create(
+            file=('batch.jsonl', io.BytesIO(payload.encode('utf-8'))),
+            purpose='batch'
+        )
+        batch = client.batches.create(
+            input_file_id=input_file.id,
+            endpoint='/v1/chat/completions',
+            completion_window='24h'
+        )
+        return batch.id
+
+    def retrieve(self, batch_id):
+        batch = client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        return {
+            'id': batch.id,
+            'status': batch.status,
+            'output_file_id': batch.output_file_id,
+            'error_file_id': batch.error_file_id,
+            'completed': counts.completed + counts.failed if counts else 0,
+            'total': counts.total if counts else 0
+        }
+
+    def download(self, file_id):
+        return client.files.content(file_id).text
+
+    def cancel(self, batch_id):
+        client.batches.cancel(batch_id)
+
+
+def echo_translation(body):
+    """로컬 백엔드 기본 응답: 독일어를 문장으로 나누고 번역 자리에 원문을 표시해서 돌려줌"""
+    german_text = body['messages'][-1]['content'].split('\n\n', 1)[-1]
+    sentences = [s for s in re.split(r'(?<=[.!?])\s+', german_text.strip()) if s]
+    return json.dumps(
+        [{'de': s, 'ko': f'[ko] {s}', 'en': f'[en] {s}'} for s in sentences],
+        ensure_ascii=False
+    )
+
+
+class LocalBatchBackend:
+    """Batch API를 디스크 파일로 흉내 내는 백엔드 (테스트/오프라인용)
+
+    <directory>/<batch_id>/ 아래에 input.jsonl, batch.json을 쓰고, delay초가 지난 뒤
+    retrieve하면 respond(body)로 응답을 만들어 output.jsonl에 Batch API와 같은 형식으로 기록한다.
+    """
+
+    poll_seconds = 0.2
+
+    def __init__(self, directory=BATCH_LOCAL_DIR, respond=echo_translation, delay=0.0):
+        self.directory = directory
+        self.respond = respond
+        self.delay = delay
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, batch_id, name):
+        return os.path.join(self.directory, batch_id, name)
+
+    def _write_state(self, batch_id, state):
+        with open(self._path(batch_id, 'batch.json'), 'w') as f:
+            json.dump(state, f)
+
+    def _read_state(self, batch_id):
+        with open(self._path(batch_id, 'batch.json')) as f:
+            return json.load(f)
+
+    def submit(self, lines):
+        batch_id = f"batch_local_{uuid.uuid4().hex[:16]}"
+        os.makedirs(os.path.join(self.directory, batch_id))
+        with open(self._path(batch_id, 'input.jsonl'), 'w', encoding='utf-8') as f:
+            for line in lines:
+                f.write(json.dumps(line, ensure_ascii=False) + '\n')
+        self._write_state(batch_id, {
+            'status': 'in_progress',
+            'created_at': time.time(),
+            'total': len(lines)
+        })
+        return batch_id
+
+    def _process(self, batch_id):
+        with open(self._path(batch_id, 'input.jsonl'), encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        with open(self._path(batch_id, 'output.jsonl'), 'w', encoding='utf-8') as out:
+            for line in lines:
+                content = self.respond(line['body'])
+                out.write(json.dumps({
+                    'id': f"batch_req_{uuid.uuid4().hex[:12]}",
+                    'custom_id': line['custom_id'],
+                    'response': {
+                        'status_code': 200,
+                        'body': {'choices': [{'message': {'role': 'assistant', 'content': content}}]}
+                    },
+                    'error': None
+                }, ensure_ascii=False) + '\n')
+
+    def retrieve(self, batch_id):
+        state = self._read_state(batch_id)
+        if state['status'] == 'in_progress' and time.time() - state['created_at'] >= self.delay:
+            self._process(batch_id)
+            state['status'] = 'completed'
+            self._write_state(batch_id, state)
+        completed = state['status'] == 'completed'
+        return {
+            'id': batch_id,
+            'status': state['status'],
+            'output_file_id': f"{batch_id}/output.jsonl" if completed else None,
+            'error_file_id': None,
+            'completed': state['total'] if completed else 0,
+            'total': state['total']
+        }
+
+    def download(self, file_id):
+        with open(os.path.join(self.directory, file_id), encoding='utf-8') as f:
+            return f.read()
+
+    def cancel(self, batch_id):
+        state = self._read_state(batch_id)
+        state['status'] = 'cancelled'
+        self._write_state(batch_id, state)
+
+
+def get_backend():
+    if BATCH_BACKEND == 'local':
+        return LocalBatchBackend()
+    return OpenAIBatchBackend()
+
+
+def _cache_key(german_text):
+    return TranslationCache.make_key(CACHE_FUNCTION, MODEL, PROMPT_VERSION, german_text)
+
+
+def build_batch_lines(pages):
+    return [{
+        'custom_id': f"page-{page.id}",
+        'method': 'POST',
+        'url': '/v1/chat/completions',
+        'body': {
+            'model': MODEL,
+            'messages': _sentence_mapping_messages(page.german_text),
+            'max_tokens': 4000,
+            **({'response_format': SENTENCES_FORMAT} if SENTENCES_FORMAT else {})
+        }
+    } for page in pages]
+
+
+def parse_batch_output(text):
+    """출력 JSONL → {page_id: 문장 목록}. 실패/파싱 불가 줄은 건너뜀"""
+    results = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        response = item.get('response') or {}
+        if item.get('error') or response.get('status_code') != 200:
+            print(f"   ⚠️ Batch request failed: {item.get('custom_id')} {item.get('error')}")
+            continue
+        try:
+            content = response['body']['choices'][0]['message']['content']
+            sentences, truncated, _ = parse_structured(content, SENTENCES_SCHEMA)
+            if truncated:
+                # 배치에서는 잘린 뒷부분을 따로 요청하지 않고 그 페이지를 실패로 둠
+                raise ValueError("reply was truncated")
+            results[int(item['custom_id'].split('-', 1)[1])] = sentences['sentences']
+        except (KeyError, IndexError, ValueError) as e:
+            print(f"   ⚠️ Unusable batch reply for {item.get('custom_id')}: {str(e)}")
+    return results
+
+
+def _wait_for_batch(ctx, backend, batch_id):
+    while True:
+        batch = backend.retrieve(batch_id)
+        ctx.progress('wait', batch['completed'], batch['total'])
+        if batch['status'] == 'completed':
+            return batch
+        if batch['status'] in FAILED_STATUSES:
+            raise Exception(f"Batch {batch_id} ended with status {batch['status']}")
+        try:
+            ctx.check_cancelled()
+        except JobCancelled:
+            backend.cancel(batch_id)
+            raise
+        time.sleep(backend.poll_seconds)
+
+
+@job_handler('batch_retranslate', BATCH_STAGES, priority='bulk')
+def run_batch_retranslate_job(ctx, params, backend=None):
+    """책 전체(또는 page_ids)를 Batch API로 다시 번역하고 한 트랜잭션으로 반영
+
+    캐시에 있는 페이지는 배치에 넣지 않는다 (force면 전부 넣음). 재시작되면 기록해 둔 batch_id로 이어감.
+    """
+    backend = backend or get_backend()
+    force = params.get('force', False)
+    query = Page.query.filter_by(book_id=params['book_id'])
+    if params.get('page_ids'):
+        query = query.filter(Page.id.in_(params['page_ids']))
+    pages = [p for p in query.order_by(Page.position).all() if (p.german_text or '').strip()]
+
+    results = {}
+    to_submit = []
+    for page in pages:
+        hit = None if force else translation_cache.get(_cache_key(page.german_text), CACHE_FUNCTION)
+        if hit is not None:
+            results[page.id] = hit
+        else:
+            to_submit.append(page)
+    from_cache = len(results)
+
+    submit = next(s for s in ctx.job.stages if s['name'] == 'submit')
+    batch_id = submit.get('batch_id')
+    if batch_id is None and to_submit:
+        with ctx.stage('submit'):
+            batch_id = backend.submit(build_batch_lines(to_submit))
+            ctx.note('submit', batch_id=batch_id, requests=len(to_submit), from_cache=from_cache)
+        print(f"📦 Batch submitted: {batch_id} ({len(to_submit)} pages, {from_cache} from cache)")
+    elif batch_id is None:
+        ctx.skip('submit')
+
+    if batch_id is None:
+        ctx.skip('wait')
+    else:
+        with ctx.stage('wait'):
+            batch = _wait_for_batch(ctx, backend, batch_id)
+        output = backend.download(batch['output_file_id']) if batch['output_file_id'] else ''
+        submitted = {page.id: page for page in to_submit}
+        for page_id, sentences in parse_batch_output(output).items():
+            if page_id in submitted:
+                results[page_id] = sentences
+                translation_cache.set(_cache_key(submitted[page_id].german_text), CACHE_FUNCTION, sentences)
+
+    updated = []
+    ctx.begin('apply')
+    try:
+        for page in pages:
+            if page.id in results:
+                apply_translation(page, results[page.id])
+                updated.append(page.id)
+        # 모든 페이지 반영과 진행 기록을 한 커밋으로
+        ctx.progress('apply', len(updated), len(pages))
+    except Exception:
+        db.session.rollback()
+        ctx.end('apply', 'failed')
+        raise
+    ctx.end('apply')
+
+    failed = [page.id for page in pages if page.id not in results]
+    print(f"✅ Batch retranslate applied: {len(updated)} pages, {len(failed)} failed")
+    return {
+        'success': True,
+        'book_id': params['book_id'],
+        'batch_id': batch_id,
+        'updated_page_ids': updated,
+        'failed_page_ids': failed,
+        'from_cache': from_cache
+    }
@@ -0,0 +1,137 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from services.metrics import span
+from services.openai_scheduler import current_context, apply_context
+from services.openai_service import translate_sentences_in_context, merge_and_translate_pages
+from services.page_join import sentence_spans
+
+# 한 청크의 독일어 글자 수 상한. 세 언어 JSON 응답이 max_tokens(4000) 안에 여유 있게 들어가는 크기
+CHUNK_CHARS = int(os.getenv('TRANSLATE_CHUNK_CHARS', 1500))
+# 한 페이지에서 동시에 번역할 청크 수 (전체 속도는 scheduler의 쿼터가 맞춤)
+CHUNK_CONCURRENCY = int(os.getenv('TRANSLATE_CHUNK_CONCURRENCY', 4))
+# 응답이 잘리거나 JSON이 깨진 청크만 이만큼 다시 시도하고, 그래도 안 되면 반으로 나눠서 시도
+CHUNK_ATTEMPTS = int(os.getenv('TRANSLATE_CHUNK_ATTEMPTS', 2))
+# 앞뒤 청크에서 문맥으로 넘길 문장 수
+OVERLAP_SENTENCES = 2
+
+
+def needs_chunking(german_text):
+    return len(german_text or '') > CHUNK_CHARS
+
+
+def split_chunks(german_text, max_chars=CHUNK_CHARS):
+    """문장 경계에서 max_chars 이하로 묶은 [[문장, ...], ...]. 한 문장이 더 길면 그 문장만 한 청크"""
+    chunks = []
+    current = []
+    size = 0
+    for start, end in sentence_spans(german_text):
+        sentence = german_text[start:end].strip()
+        if not sentence:
+            continue
+        if current and size + len(sentence) + 1 > max_chars:
+            chunks.append(current)
+            current, size = [], 0
+        current.append(sentence)
+        size += len(sentence) + 1
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _normalize(sentences):
+    if not isinstance(sentences, list) or not all(isinstance(s, dict) for s in sentences):
+        raise Exception("Chunk translation returned an unexpected shape")
+    return [{lang: s.get(lang, '') for lang in ('de', 'ko', 'en')} for s in sentences]
+
+
+def _translate_chunk(before, chunk, after, bypass_cache=False):
+    """청크 하나 번역. 실패하면 이 청크만 다시 시도하고, 계속 실패하면 반으로 나눠 번역"""
+    text = ' '.join(chunk)
+    error = None
+    for attempt in range(CHUNK_ATTEMPTS):
+        try:
+            return _normalize(translate_sentences_in_context(
+                ' '.join(before), text, ' '.join(after), bypass_cache=bypass_cache or attempt > 0
+            ))
+        except Exception as e:
+            error = e
+            print(f"⚠️ Chunk translation failed ({attempt + 1}/{CHUNK_ATTEMPTS}, {len(text)} chars): {str(e)}")
+    if len(chunk) < 2:
+        raise error
+    middle = len(chunk) // 2
+    left, right = chunk[:middle], chunk[middle:]
+    print(f"✂️ Splitting failed chunk into {len(left)} + {len(right)} sentences")
+    return (
+        _translate_chunk(before, left, right[:OVERLAP_SENTENCES], bypass_cache) +
+        _translate_chunk(left[-OVERLAP_SENTENCES:], right, after, bypass_cache)
+    )
+
+
+def _merge_first_chunk(previous_ending, chunk, bypass_cache=False):
+    """이전 페이지와 이어지는 첫 청크는 병합 프롬프트로. (문장 목록, clean_german, merged_from_previous)"""
+    text = ' '.join(chunk)
+    error = None
+    for attempt in range(CHUNK_ATTEMPTS):
+        try:
+            result = merge_and_translate_pages(previous_ending, text, bypass_cache=bypass_cache or attempt > 0)
+            if not isinstance(result, dict):
+                raise Exception("Merge returned an unexpected shape")
+            return (
+                _normalize(result.get('sentences', [])),
+                result.get('clean_german', text),
+                result.get('merged_from_previous', '')
+            )
+        except Exception as e:
+            error = e
+            print(f"⚠️ Merge chunk failed ({attempt + 1}/{CHUNK_ATTEMPTS}): {str(e)}")
+    raise error
+
+
+def stream_translate_chunked(german_text, previous_ending='', bypass_cache=False):
+    """긴 페이지를 문장 경계 청크로 나눠 동시에 번역하고 순서대로 이어 붙이기.
+    앞 청크부터 끝나는 대로 ('sentence', {de, ko, en})를 내보내고, 마지막에 merge_and_translate_pages와 같은
+    ('done', {sentences, clean_german, merged_from_previous})를 내보냄.
+    previous_ending을 주면 첫 청크는 이전 페이지와 병합해서 번역"""
+    chunks = split_chunks(german_text)
+    context = current_context()
+
+    def task(index):
+        apply_context(context)
+        chunk = chunks[index]
+        with span('translate.chunk', index=index, chars=sum(len(s) for s in chunk)):
+            if index == 0 and previous_ending:
+                return _merge_first_chunk(previous_ending, chunk, bypass_cache)
+            before = chunks[index - 1][-OVERLAP_SENTENCES:] if index > 0 else []
+            after = chunks[index + 1][:OVERLAP_SENTENCES] if index + 1 < len(chunks) else []
+            return _translate_chunk(before, chunk, after, bypass_cache), None, ''
+
+    print(f"🧩 Translating {len(chunks)} chunks ({len(german_text)} chars)")
+    sentences = []
+    clean_german = german_text
+    merged_from = ''
+    if chunks:
+        with ThreadPoolExecutor(max_workers=max(1, min(CHUNK_CONCURRENCY, len(chunks)))) as pool:
+            futures = [pool.submit(task, index) for index in range(len(chunks))]
+            for future in futures:
+                chunk_sentences, clean, merged = future.result()
+                if clean is not None:
+                    # 병합된 첫 청크만 바뀌고 나머지는 원문 그대로
+                    rest = german_text.find(chunks[1][0]) if len(chunks) > 1 else -1
+                    clean_german = clean + ('\n' + german_text[rest:] if rest >= 0 else '')
+                    merged_from = merged
+                for sentence in chunk_sentences:
+                    sentences.append(sentence)
+                    yield ('sentence', sentence)
+
+    yield ('done', {
+        'sentences': sentences,
+        'clean_german': clean_german,
+        'merged_from_previous': merged_from
+    })
+
+
+def translate_chunked(german_text, previous_ending='', bypass_cache=False):
+    for event, data in stream_translate_chunked(german_text, previous_ending, bypass_cache):
+        if event == 'done':
+            return data
@@ -0,0 +1,115 @@
+import hashlib
+import io
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+from PIL import Image, ImageOps, features
+
+from services.metrics import span
+from services.ocr_pipeline import UPLOAD_FOLDER
+from services.image_derivatives import is_content_addressed
+
+# 최근에 디코딩한 원본을 메모리에 둘 개수 / 전체 픽셀 수 상한 (재크롭 슬라이더를 움직일 때 다시 디코딩하지 않도록)
+DECODED_CACHE_IMAGES = int(os.getenv('CROP_CACHE_IMAGES', 3))
+DECODED_CACHE_PIXELS = int(os.getenv('CROP_CACHE_PIXELS', 60_000_000))
+# 좌우는 약간 여백 줄이기
+SIDE_MARGIN = 0.05
+
+CROP_FORMATS = {
+    'webp': ('WEBP', {'quality': 85, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 88, 'optimize': True})
+}
+CROP_FORMAT = os.getenv('CROP_FORMAT', 'webp' if features.check('webp') else 'jpeg')
+
+
+class DecodedImageCache:
+    """디코딩(+EXIF 회전)까지 끝낸 원본 이미지 LRU"""
+
+    def __init__(self, max_images=DECODED_CACHE_IMAGES, max_pixels=DECODED_CACHE_PIXELS):
+        self.max_images = max_images
+        self.max_pixels = max_pixels
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, load):
+        """key에 해당하는 이미지. 없으면 load()로 원본 바이트를 받아 디코딩해서 넣음"""
+        with self._lock:
+            img = self._images.get(key)
+            if img is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return img
+            self.misses += 1
+        with span('crop.decode'):
+            img = ImageOps.exif_transpose(Image.open(io.BytesIO(load())))
+            img.load()
+        with self._lock:
+            self._images[key] = img
+            self._images.move_to_end(key)
+            self._evict()
+        return img
+
+    def _evict(self):
+        pixels = sum(img.width * img.height for img in self._images.values())
+        while len(self._images) > 1 and (len(self._images) > self.max_images or pixels > self.max_pixels):
+            _, img = self._images.popitem(last=False)
+            pixels -= img.width * img.height
+
+    def stats(self):
+        with self._lock:
+            return {'images': len(self._images), 'hits': self.hits, 'misses': self.misses}
+
+
+decoded_images = DecodedImageCache()
+
+
+def crop_box(size, top_percent, bottom_percent):
+    """세로 퍼센트 범위 → 픽셀 상자 (좌, 상, 우, 하)"""
+    width, height = size
+    top = max(0, min(height - 1, int(height * top_percent / 100)))
+    bottom = max(top + 1, min(height, int(height * bottom_percent / 100)))
+    return int(width * SIDE_MARGIN), top, int(width * (1 - SIDE_MARGIN)), bottom
+
+
+def crop_filename(image_key, top_percent, bottom_percent, fmt=CROP_FORMAT):
+    """같은 원본 + 같은 범위면 같은 파일 이름 (이미 있으면 디코딩 없이 그대로 씀)"""
+    return f"crop_{image_key[:24]}_{float(top_percent):g}_{float(bottom_percent):g}.{fmt}"
+
+
+def image_key_for_file(filename):
+    """업로드 파일의 캐시 키. SHA-256 이름이면 그대로, 예전 이름이면 경로+수정 시각으로"""
+    if is_content_addressed(filename):
+        return filename.split('.', 1)[0]
+    stat = os.stat(os.path.join(UPLOAD_FOLDER, filename))
+    return hashlib.sha256(f"{filename}:{stat.st_mtime_ns}:{stat.st_size}".encode('utf-8')).hexdigest()
+
+
+def _save(cropped, path, fmt):
+    pil_format, options = CROP_FORMATS[fmt]
+    if cropped.mode not in ('RGB', 'L'):
+        cropped = cropped.convert('RGB')
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    cropped.save(tmp_path, pil_format, **options)
+    os.replace(tmp_path, path)
+
+
+def crop_regions(image_key, load, regions, fmt=CROP_FORMAT):
+    """regions [(top%, bottom%)]를 잘라 uploads/에 저장하고 파일 이름 목록 반환.
+    이미 있는 크롭은 그대로 쓰고, 새로 잘라야 할 때만 원본을 (요청당 한 번, LRU에 있으면 0번) 디코딩"""
+    filenames = []
+    for top, bottom in regions:
+        filename = crop_filename(image_key, top, bottom, fmt)
+        path = os.path.join(UPLOAD_FOLDER, filename)
+        if os.path.exists(path):
+            print(f"   ♻️ Crop reused: {filename}")
+        else:
+            with span('ocr.crop'):
+                img = decoded_images.get(image_key, load)
+                _save(img.crop(crop_box(img.size, top, bottom)), path, fmt)
+            print(f"   ✂️ Cropped image saved: {filename} (top:{top}% bottom:{bottom}%)")
+        filenames.append(filename)
+    return filenames
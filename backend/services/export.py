@@ -0,0 +1,314 @@
+import base64
+import hashlib
+import html
+import json
+import mimetypes
+import os
+import uuid
+import zipfile
+from datetime import datetime
+
+from sqlalchemy.orm import load_only, selectinload
+
+from models.book import db, Page
+from services.ocr_pipeline import UPLOAD_FOLDER
+
+EXPORT_DIR = os.getenv(
+    'EXPORT_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'exports')
+)
+# DB에서 한 번에 읽는 페이지 수 (메모리에는 이만큼만 올라감)
+CHUNK_PAGES = int(os.getenv('EXPORT_CHUNK_PAGES', 50))
+# 스트림으로 내보내는 조각 크기
+STREAM_CHUNK_BYTES = 64 * 1024
+
+FORMATS = {
+    'epub': ('application/epub+zip', 'epub'),
+    'html': ('text/html', 'html'),
+    'jsonl': ('application/x-ndjson', 'jsonl')
+}
+IMAGE_BLOCK_TYPES = ('music_score', 'illustration')
+mimetypes.add_type('image/webp', '.webp')
+
+HTML_STYLE = """
+body { font-family: Georgia, serif; max-width: 46em; margin: 2em auto; line-height: 1.6; }
+.page { border-top: 1px solid #ccc; padding-top: 1em; }
+.page-number { color: #888; font-size: 0.8em; text-align: right; }
+.sentence { margin: 0 0 1em; }
+.de { margin: 0; }
+.ko { margin: 0; color: #333; }
+.en { margin: 0; color: #666; font-style: italic; }
+figure { margin: 1em 0; text-align: center; }
+figure img { max-width: 100%; }
+"""
+
+
+def book_fingerprint(book):
+    """페이지가 추가/삭제/수정/이동되면 바뀌는 값 (인덱스만 읽음)"""
+    count, updated = db.session.query(db.func.count(Page.id), db.func.max(Page.updated_at)) \
+        .filter(Page.book_id == book.id).one()
+    raw = f"{book.title}|{book.author}|{count}|{updated}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def artifact_path(book, fmt, fingerprint):
+    return os.path.join(EXPORT_DIR, f"book{book.id}-{fingerprint}.{FORMATS[fmt][1]}")
+
+
+def cached_artifact(book, fmt):
+    """(현재 내용과 맞는 캐시 파일 경로 또는 None, 새로 만들 때 쓸 경로)"""
+    path = artifact_path(book, fmt, book_fingerprint(book))
+    return (path if os.path.isfile(path) else None), path
+
+
+def _remove_stale(book, fmt, keep):
+    prefix = f"book{book.id}-"
+    suffix = f".{FORMATS[fmt][1]}"
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        if name.startswith(prefix) and name.endswith(suffix) and path != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def iter_pages(book_id, columns=None):
+    """정렬 순서대로 CHUNK_PAGES장씩 읽어서 (페이지 번호, Page) 하나씩. 다 쓴 묶음은 세션에서 뺌"""
+    after = None
+    number = 0
+    while True:
+        query = Page.query.filter(Page.book_id == book_id)
+        if columns is not None:
+            query = query.options(load_only(*columns))
+        else:
+            query = query.options(selectinload(Page.sentence_rows))
+        if after is not None:
+            query = query.filter(Page.position > after)
+        pages = query.order_by(Page.position).limit(CHUNK_PAGES).all()
+        if not pages:
+            return
+        for page in pages:
+            number += 1
+            yield number, page
+        after = pages[-1].position
+        for page in pages:
+            db.session.expunge(page)
+
+
+def page_sentences(page):
+    """저장된 문장 행. 문장 매핑이 없는 페이지는 페이지 전체를 한 덩어리로"""
+    if page.sentence_rows:
+        return [row.to_dict() for row in page.sentence_rows]
+    if not (page.german_text or page.korean_text or page.english_text):
+        return []
+    return [{'de': page.german_text or '', 'ko': page.korean_text or '', 'en': page.english_text or ''}]
+
+
+def page_images(page):
+    """악보/삽화 블록 중 uploads/에 파일이 있는 것: [(블록, 파일 경로)]"""
+    try:
+        blocks = json.loads(page.content_images) if page.content_images else []
+    except ValueError:
+        return []
+    images = []
+    for block in blocks if isinstance(blocks, list) else []:
+        name = block.get('image_file') if isinstance(block, dict) else None
+        if block.get('type') in IMAGE_BLOCK_TYPES and name:
+            path = os.path.join(UPLOAD_FOLDER, os.path.basename(name))
+            if os.path.isfile(path):
+                images.append((block, path))
+    return images
+
+
+def _media_type(path):
+    return mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+
+def _sentences_html(sentences):
+    parts = []
+    for s in sentences:
+        parts.append('<div class="sentence">')
+        for lang in ('de', 'ko', 'en'):
+            if s.get(lang):
+                parts.append(f'<p class="{lang}" lang="{lang}">{html.escape(s[lang])}</p>')
+        parts.append('</div>')
+    return ''.join(parts)
+
+
+def _figure_html(block, src):
+    description = html.escape(block.get('description') or '')
+    return (f'<figure class="{block["type"]}"><img src="{src}" alt="{description}"/>'
+            f'<figcaption>{description}</figcaption></figure>')
+
+
+def _html_chunks(book):
+    """한 파일짜리 HTML. 이미지는 data URI로 넣음 (한 번에 이미지 한 장만 메모리에)"""
+    title = html.escape(book.title or '')
+    yield (f'<!DOCTYPE html>\n<html lang="ko"><head><meta charset="utf-8"/><title>{title}</title>'
+           f'<style>{HTML_STYLE}</style></head><body><h1>{title}</h1>'
+           f'<p class="author">{html.escape(book.author or "")}</p>\n').encode('utf-8')
+    for number, page in iter_pages(book.id):
+        parts = [f'<section class="page" id="page-{number}">', _sentences_html(page_sentences(page))]
+        for block, path in page_images(page):
+            with open(path, 'rb') as f:
+                data = base64.b64encode(f.read()).decode('ascii')
+            parts.append(_figure_html(block, f'data:{_media_type(path)};base64,{data}'))
+        parts.append(f'<p class="page-number">{number}</p></section>\n')
+        yield ''.join(parts).encode('utf-8')
+    yield b'</body></html>\n'
+
+
+def _jsonl_chunks(book):
+    """첫 줄은 책 정보, 이후 한 줄에 페이지 하나. 이미지는 uploads/ 파일 이름으로만 참조"""
+    yield (json.dumps({
+        'type': 'book',
+        'id': book.id,
+        'title': book.title,
+        'author': book.author,
+        'original_language': book.original_language
+    }, ensure_ascii=False) + '\n').encode('utf-8')
+    for number, page in iter_pages(book.id):
+        yield (json.dumps({
+            'type': 'page',
+            'id': page.id,
+            'page_number': number,
+            'page_type': page.page_type,
+            'sentences': page_sentences(page),
+            'images': [{
+                'type': block['type'],
+                'description': block.get('description', ''),
+                'file': os.path.basename(path)
+            } for block, path in page_images(page)]
+        }, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+EPUB_CONTAINER = """<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/></rootfiles>
+</container>
+"""
+
+
+def _epub_page_xhtml(book, number, page, images):
+    figures = ''.join(_figure_html(block, f'images/{name}') for block, name in images)
+    return (f'<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE html>\n'
+            f'<html xmlns="http://www.w3.org/1999/xhtml" lang="ko" xml:lang="ko"><head>'
+            f'<title>{html.escape(book.title or "")} — {number}</title>'
+            f'<link rel="stylesheet" href="style.css"/></head><body>'
+            f'<section class="page">{_sentences_html(page_sentences(page))}{figures}'
+            f'<p class="page-number">{number}</p></section></body></html>').encode('utf-8')
+
+
+def _epub_image_name(page, index, path):
+    return f"p{page.id}-{index}{os.path.splitext(path)[1].lower()}"
+
+
+def _write_epub(book, zf, flush):
+    """EPUB 3 항목을 하나씩 써 넣고, 항목마다 flush()로 완성된 바이트를 내보냄"""
+    zf.writestr(zipfile.ZipInfo('mimetype'), 'application/epub+zip', compress_type=zipfile.ZIP_STORED)
+    zf.writestr('META-INF/container.xml', EPUB_CONTAINER)
+    zf.writestr('OEBPS/style.css', HTML_STYLE)
+    yield from flush()
+
+    for number, page in iter_pages(book.id):
+        images = []
+        for index, (block, path) in enumerate(page_images(page)):
+            name = _epub_image_name(page, index, path)
+            # 이미 압축된 이미지라 그대로 저장
+            zf.write(path, f'OEBPS/images/{name}', compress_type=zipfile.ZIP_STORED)
+            images.append((block, name))
+        zf.writestr(f'OEBPS/page-{number:05d}.xhtml', _epub_page_xhtml(book, number, page, images))
+        yield from flush()
+
+    # 목차/매니페스트는 두 번째로 훑으면서 바로 써서 페이지 목록을 메모리에 모으지 않음
+    image_columns = [Page.id, Page.position, Page.content_images]
+    modified = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+    with zf.open('OEBPS/content.opf', 'w') as opf:
+        opf.write((
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id">'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            f'<dc:identifier id="book-id">urn:wagner:book:{book.id}</dc:identifier>'
+            f'<dc:title>{html.escape(book.title or "")}</dc:title>'
+            f'<dc:creator>{html.escape(book.author or "")}</dc:creator>'
+            '<dc:language>ko</dc:language>'
+            f'<meta property="dcterms:modified">{modified}</meta></metadata><manifest>'
+            '<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>'
+            '<item id="css" href="style.css" media-type="text/css"/>'
+        ).encode('utf-8'))
+        for number, page in iter_pages(book.id, image_columns):
+            opf.write(f'<item id="page-{number}" href="page-{number:05d}.xhtml" '
+                      f'media-type="application/xhtml+xml"/>'.encode('utf-8'))
+            for index, (block, path) in enumerate(page_images(page)):
+                name = _epub_image_name(page, index, path)
+                opf.write(f'<item id="img-{name}" href="images/{name}" '
+                          f'media-type="{_media_type(path)}"/>'.encode('utf-8'))
+        opf.write(b'</manifest><spine>')
+        for number, _ in iter_pages(book.id, [Page.id, Page.position]):
+            opf.write(f'<itemref idref="page-{number}"/>'.encode('utf-8'))
+        opf.write(b'</spine></package>')
+    yield from flush()
+
+    with zf.open('OEBPS/nav.xhtml', 'w') as nav:
+        nav.write((
+            '<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE html>\n'
+            '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops">'
+            f'<head><title>{html.escape(book.title or "")}</title></head><body>'
+            '<nav epub:type="toc"><ol>'
+        ).encode('utf-8'))
+        for number, _ in iter_pages(book.id, [Page.id, Page.position]):
+            nav.write(f'<li><a href="page-{number:05d}.xhtml">{number}</a></li>'.encode('utf-8'))
+        nav.write(b'</ol></nav></body></html>')
+    yield from flush()
+
+
+def _epub_chunks(book, out):
+    """zip은 항목을 닫을 때 앞쪽 헤더를 고쳐 쓰므로, 닫힌 항목까지만 파일에서 읽어 내보냄"""
+    sent = 0
+
+    def flush():
+        nonlocal sent
+        out.flush()
+        end = out.tell()
+        while sent < end:
+            out.seek(sent)
+            data = out.read(min(STREAM_CHUNK_BYTES, end - sent))
+            sent += len(data)
+            yield data
+        out.seek(end)
+
+    with zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        yield from _write_epub(book, zf, flush)
+    yield from flush()
+
+
+def _tee(chunks, out):
+    for data in chunks:
+        out.write(data)
+        yield data
+
+
+def stream_export(book, fmt, path):
+    """내보내기 파일을 만들면서 바로 조각으로 내보냄. 끝까지 만들어지면 path로 옮겨 캐시로 씀
+
+    중간에 연결이 끊기면 만들던 임시 파일은 지움.
+    """
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    temp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    completed = False
+    try:
+        with open(temp_path, 'w+b') as out:
+            if fmt == 'epub':
+                chunks = _epub_chunks(book, out)
+            else:
+                chunks = _tee(_html_chunks(book) if fmt == 'html' else _jsonl_chunks(book), out)
+            for data in chunks:
+                yield data
+        os.replace(temp_path, path)
+        completed = True
+        _remove_stale(book, fmt, keep=path)
+        print(f"📚 Export cached: {os.path.basename(path)}")
+    finally:
+        if not completed and os.path.exists(temp_path):
+            os.remove(temp_path)
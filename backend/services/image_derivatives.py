@@ -0,0 +1,102 @@
+import hashlib
+import os
+import re
+import threading
+import uuid
+
+from PIL import Image, ImageOps, features
+
+from services.ocr_pipeline import UPLOAD_FOLDER
+
+DERIVED_FOLDER = os.path.join(UPLOAD_FOLDER, '.derived')
+os.makedirs(DERIVED_FOLDER, exist_ok=True)
+
+# 캐시가 무한히 늘지 않도록 요청 폭은 이 값들 중 하나로 올림
+ALLOWED_WIDTHS = [160, 320, 480, 640, 800, 1024, 1280, 1600, 2048]
+FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'avif': ('AVIF', 'image/avif', {'quality': 60}),
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+CONTENT_ADDRESSED = re.compile(r'^[0-9a-f]{64}\.')
+
+_locks = {}
+_locks_guard = threading.Lock()
+_etags = {}
+
+
+def is_content_addressed(filename):
+    return bool(CONTENT_ADDRESSED.match(filename))
+
+
+def supported_formats():
+    return [fmt for fmt, (pil_format, _, _) in FORMATS.items()
+            if fmt == 'jpeg' or features.check(pil_format.lower())]
+
+
+def snap_width(width):
+    for allowed in ALLOWED_WIDTHS:
+        if width <= allowed:
+            return allowed
+    return ALLOWED_WIDTHS[-1]
+
+
+def negotiate_format(accept_header):
+    """format=auto일 때 Accept 헤더를 보고 가장 작은 포맷 고르기"""
+    accept = accept_header or ''
+    available = supported_formats()
+    for fmt in ('avif', 'webp'):
+        if fmt in available and f'image/{fmt}' in accept:
+            return fmt
+    return 'jpeg'
+
+
+def _lock_for(path):
+    with _locks_guard:
+        return _locks.setdefault(path, threading.Lock())
+
+
+def get_derivative(filename, width=None, fmt=None):
+    """크기/포맷 변환본 경로와 MIME 타입 반환. 처음 요청 시 만들어 디스크에 캐시"""
+    source = os.path.join(UPLOAD_FOLDER, filename)
+    stem = filename.rsplit('.', 1)[0]
+    width = snap_width(width) if width else None
+    fmt = fmt or 'jpeg'
+    pil_format, mimetype, save_options = FORMATS[fmt]
+
+    derived_name = f"{stem}.w{width or 'orig'}.{fmt}"
+    derived_path = os.path.join(DERIVED_FOLDER, derived_name)
+    if os.path.exists(derived_path) and os.path.getmtime(derived_path) >= os.path.getmtime(source):
+        return derived_path, mimetype
+
+    with _lock_for(derived_path):
+        if os.path.exists(derived_path) and os.path.getmtime(derived_path) >= os.path.getmtime(source):
+            return derived_path, mimetype
+        with Image.open(source) as img:
+            img = ImageOps.exif_transpose(img)
+            if width and img.width > width:
+                img = img.resize((width, round(img.height * width / img.width)), Image.LANCZOS)
+            if pil_format == 'JPEG' and img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            tmp_path = f"{derived_path}.{uuid.uuid4().hex[:8]}.tmp"
+            img.save(tmp_path, pil_format, **save_options)
+        os.replace(tmp_path, derived_path)
+        print(f"🖼️ Derivative created: {derived_name}")
+    return derived_path, mimetype
+
+
+def strong_etag(path):
+    """파일 내용 SHA-256 기반 ETag (mtime/크기가 같으면 메모리에 캐시된 값 사용)"""
+    stat = os.stat(path)
+    cache_key = (path, stat.st_mtime_ns, stat.st_size)
+    etag = _etags.get(cache_key)
+    if etag is None:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        etag = digest.hexdigest()
+        if len(_etags) > 10000:
+            _etags.clear()
+        _etags[cache_key] = etag
+    return etag
@@ -0,0 +1,74 @@
+import hashlib
+import io
+import json
+import os
+
+from PIL import Image
+
+from models.book import db
+from models.image import ImageAnalysis
+
+# 근사 중복으로 볼 최대 해밍 거리. 3 이하면 4개 구간 중 하나는 반드시 일치해 누락이 없음
+PHASH_MAX_DISTANCE = int(os.getenv('PHASH_MAX_DISTANCE', 3))
+PHASH_BANDS = 4
+
+
+def content_hash(image_data):
+    return hashlib.sha256(image_data).hexdigest()
+
+
+def perceptual_hash(image_data):
+    """64비트 difference hash (16자리 hex)"""
+    img = Image.open(io.BytesIO(image_data)).convert('L').resize((9, 8), Image.LANCZOS)
+    pixels = list(img.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            bits = (bits << 1) | (1 if left > right else 0)
+    return f'{bits:016x}'
+
+
+def _bands(phash):
+    value = int(phash, 16)
+    return [(value >> (16 * i)) & 0xFFFF for i in range(PHASH_BANDS)]
+
+
+def _distance(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+
+def find_cached_analysis(sha256, phash):
+    """같은 이미지 또는 거의 같은 사진의 기존 분석 결과 찾기"""
+    exact = db.session.get(ImageAnalysis, sha256)
+    if exact is not None:
+        return exact
+
+    bands = _bands(phash)
+    candidates = ImageAnalysis.query.filter(db.or_(
+        ImageAnalysis.phash_band0 == bands[0],
+        ImageAnalysis.phash_band1 == bands[1],
+        ImageAnalysis.phash_band2 == bands[2],
+        ImageAnalysis.phash_band3 == bands[3]
+    )).all()
+
+    best = None
+    best_distance = PHASH_MAX_DISTANCE + 1
+    for candidate in candidates:
+        distance = _distance(phash, candidate.phash)
+        if distance < best_distance:
+            best, best_distance = candidate, distance
+    return best
+
+
+def store_analysis(sha256, phash, filename, analysis):
+    bands = _bands(phash)
+    record = db.session.get(ImageAnalysis, sha256) or ImageAnalysis(sha256=sha256)
+    record.filename = filename
+    record.phash = phash
+    record.phash_band0, record.phash_band1, record.phash_band2, record.phash_band3 = bands
+    record.analysis_json = json.dumps(analysis, ensure_ascii=False)
+    db.session.add(record)
+    db.session.commit()
+    return record
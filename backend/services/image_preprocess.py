@@ -0,0 +1,48 @@
+import io
+import os
+
+from PIL import Image, ImageOps
+
+# Vision 요청 전에 이미지를 줄이고 정리하는 설정
+OCR_MAX_EDGE = int(os.getenv('OCR_MAX_EDGE', 2048))
+OCR_JPEG_QUALITY = int(os.getenv('OCR_JPEG_QUALITY', 85))
+OCR_GRAYSCALE = os.getenv('OCR_GRAYSCALE', '1') == '1'
+
+
+def prepare_for_vision(image_data):
+    """EXIF 회전 보정 → 긴 변 OCR_MAX_EDGE로 축소 → 흑백/대비 정규화 → JPEG 재인코딩
+
+    scale은 (보낸 이미지 크기 / 회전 보정된 원본 크기). 픽셀 좌표를 원본으로 되돌릴 때 나누면 됨.
+    """
+    with Image.open(io.BytesIO(image_data)) as img:
+        img = ImageOps.exif_transpose(img)
+        original_size = img.size
+
+        scale = 1.0
+        long_edge = max(img.size)
+        if long_edge > OCR_MAX_EDGE:
+            scale = OCR_MAX_EDGE / long_edge
+            img = img.resize(
+                (max(1, round(img.width * scale)), max(1, round(img.height * scale))),
+                Image.LANCZOS
+            )
+
+        if OCR_GRAYSCALE:
+            # 인쇄된 글자는 흑백 + 대비 늘리기로 충분 (색 정보는 토큰만 늘림)
+            img = ImageOps.autocontrast(img.convert('L'), cutoff=1)
+        elif img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+
+        out = io.BytesIO()
+        img.save(out, 'JPEG', quality=OCR_JPEG_QUALITY, optimize=True)
+        size = img.size
+
+    return {
+        'data': out.getvalue(),
+        'mime_type': 'image/jpeg',
+        'scale': scale,
+        'width': size[0],
+        'height': size[1],
+        'original_width': original_size[0],
+        'original_height': original_size[1]
+    }
@@ -0,0 +1,159 @@
+import asyncio
+import io
+import json
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from models.book import db
+from services import openai_async
+from services.job_queue import job_handler, JobCancelled
+from services.openai_scheduler import request_priority
+from services.ocr_pipeline import (
+    UPLOAD_FOLDER,
+    save_upload,
+    analyze_upload_async,
+    translate_page,
+    page_type_for
+)
+from services.page_store import append_page, last_page
+
+INGEST_STAGES = ['ocr', 'translate', 'commit']
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.tif', '.tiff', '.heic')
+
+
+def _natural_key(name):
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', name)]
+
+
+def images_from_zip(zip_bytes):
+    """zip 안의 이미지를 파일 이름 순(숫자는 자연 정렬)으로 (이름, 바이트) 목록으로 반환"""
+    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as archive:
+        names = [
+            info.filename for info in archive.infolist()
+            if not info.is_dir()
+            and not info.filename.startswith('__MACOSX/')
+            and not os.path.basename(info.filename).startswith('.')
+            and info.filename.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+        names.sort(key=_natural_key)
+        return [(os.path.basename(name), archive.read(name)) for name in names]
+
+
+def _read_upload(saved_image):
+    with open(os.path.join(UPLOAD_FOLDER, saved_image), 'rb') as f:
+        return f.read()
+
+
+def save_ingest_uploads(files):
+    """(원본 이름, 바이트) 목록을 저장하고 작업 파라미터용 목록 반환"""
+    images = []
+    for original_filename, image_data in files:
+        filename, sha256 = save_upload(image_data, original_filename)
+        images.append({'filename': original_filename, 'saved_image': filename, 'sha256': sha256})
+    return images
+
+
+@job_handler('ingest', INGEST_STAGES, priority='bulk')
+def run_ingest_job(ctx, params):
+    """여러 페이지를 파이프라인으로 처리: OCR 병렬 → 직전 페이지 OCR이 끝나는 대로 병합/번역 → 순서대로 저장
+
+    병합에는 직전 페이지의 끝부분만 필요하므로 직전 페이지의 번역 결과(clean_german)를 기다리지 않고
+    OCR 원문(full_text)의 끝부분을 넘긴다.
+    """
+    app = current_app._get_current_object()
+    book_id = params['book_id']
+    total = len(params['images'])
+    # 재시작으로 다시 실행되면 이미 저장한 페이지는 건너뛰기
+    committed = next((s.get('done', 0) for s in ctx.job.stages if s['name'] == 'commit'), 0)
+    images = params['images'][committed:]
+    stop = threading.Event()
+
+    previous_page = last_page(book_id)
+    book_previous_german = previous_page.german_text if previous_page and previous_page.german_text else ''
+
+    async def ocr_task(image):
+        if stop.is_set():
+            raise JobCancelled()
+        # 루프 쪽 작업마다 앱 컨텍스트와 우선순위를 따로 지정 (to_thread로 넘긴 DB 작업에도 이어짐)
+        with app.app_context(), request_priority('bulk'):
+            image_data = await asyncio.to_thread(_read_upload, image['saved_image'])
+            return await analyze_upload_async(image_data, image['saved_image'], image['sha256'])
+
+    # OCR은 공유 이벤트 루프에서 한 연결 풀로 동시에 (스레드를 페이지마다 붙잡지 않음)
+    ocr_limit = openai_async.bounded(app.config.get('INGEST_OCR_CONCURRENCY', 4))
+    ocr_futures = [openai_async.submit(ocr_limit(ocr_task(image))) for image in images]
+    translate_pool = ThreadPoolExecutor(max_workers=app.config.get('INGEST_TRANSLATE_CONCURRENCY', 4))
+
+    def translate_task(index):
+        page_analysis = ocr_futures[index].result()
+        if index == 0:
+            previous_german = book_previous_german
+        else:
+            previous_german = ocr_futures[index - 1].result().get('full_text', '')
+        if stop.is_set():
+            raise JobCancelled()
+        with request_priority('bulk'):
+            return translate_page(page_analysis.get('full_text', ''), previous_german)
+
+    translate_futures = [translate_pool.submit(translate_task, i) for i in range(len(images))]
+
+    page_ids = []
+    try:
+        ctx.begin('ocr')
+        ctx.begin('translate')
+        ctx.begin('commit')
+        for index, image in enumerate(images):
+            translated = translate_futures[index].result()
+            page_analysis = ocr_futures[index].result()
+            ctx.check_cancelled()
+
+            has_music = page_analysis.get('has_music_score', False)
+            has_illustration = page_analysis.get('has_illustration', False)
+            page = append_page(book_id, {
+                'german_text': translated['clean_german'],
+                'korean_text': translated['korean'],
+                'english_text': translated['english'],
+                'sentences': translated['sentences'],
+                'page_type': page_type_for(has_music, has_illustration),
+                'original_image_url': image['saved_image'],
+                'content_images': json.dumps(page_analysis.get('content_blocks', []), ensure_ascii=False)
+            })
+            done = committed + index + 1
+            # 페이지와 진행 카운터를 같은 트랜잭션으로 커밋 (재시작 시 중복 방지)
+            ctx.progress('commit', done, total)
+            page_ids.append(page.id)
+            print(f"📄 Ingested page {done}/{total} (id={page.id})")
+
+            ocr_done = committed + sum(1 for f in ocr_futures if f.done())
+            ctx.progress('ocr', ocr_done, total)
+            ctx.progress('translate', done, total)
+        for name in INGEST_STAGES:
+            ctx.end(name)
+    except JobCancelled:
+        stop.set()
+        db.session.rollback()
+        for name in INGEST_STAGES:
+            ctx.end(name, 'cancelled')
+        raise
+    except Exception as e:
+        stop.set()
+        db.session.rollback()
+        for name in INGEST_STAGES:
+            ctx.end(name, 'failed')
+        raise Exception(f"Ingest stopped after {committed + len(page_ids)} committed page(s): {str(e)}")
+    finally:
+        for future in ocr_futures:
+            future.cancel()
+        translate_pool.shutdown(wait=False, cancel_futures=True)
+
+    return {
+        'success': True,
+        'book_id': book_id,
+        'page_ids': page_ids,
+        'page_count': committed + len(page_ids)
+    }
@@ -0,0 +1,60 @@
+import json
+import queue
+import threading
+import time
+
+# 끝난 작업의 이벤트 기록을 메모리에 남겨두는 시간(초)
+RETAIN_SECONDS = 300
+
+
+class JobEventBus:
+    """같은 프로세스 안에서 작업 이벤트(단계 변경, 번역된 문장)를 SSE 구독자에게 전달
+
+    늦게 구독한 클라이언트도 놓친 이벤트를 받을 수 있도록 작업별 기록을 보관한다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._history = {}
+        self._subscribers = {}
+        self._finished = {}
+
+    def publish(self, job_id, event, data):
+        with self._lock:
+            self._history.setdefault(job_id, []).append((event, data))
+            subscribers = list(self._subscribers.get(job_id, []))
+            if event == 'done':
+                self._finished[job_id] = time.time()
+            self._prune()
+        for q in subscribers:
+            q.put((event, data))
+
+    def subscribe(self, job_id):
+        """(지금까지의 이벤트 목록, 새 이벤트를 받을 큐) 반환"""
+        q = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(job_id, []).append(q)
+            history = list(self._history.get(job_id, []))
+        return history, q
+
+    def unsubscribe(self, job_id, q):
+        with self._lock:
+            subscribers = self._subscribers.get(job_id, [])
+            if q in subscribers:
+                subscribers.remove(q)
+            if not subscribers:
+                self._subscribers.pop(job_id, None)
+
+    def _prune(self):
+        cutoff = time.time() - RETAIN_SECONDS
+        for job_id, finished_at in list(self._finished.items()):
+            if finished_at < cutoff:
+                self._finished.pop(job_id, None)
+                self._history.pop(job_id, None)
+
+
+job_events = JobEventBus()
+
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
@@ -0,0 +1,208 @@
+import json
+import queue
+import threading
+import traceback
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from models.book import db
+from models.job import Job
+from services.job_events import job_events
+from services.metrics import trace, job_seconds, log_trace
+from services.openai_scheduler import request_priority
+
+# kind -> (handler, stage names, OpenAI 호출 우선순위)
+_handlers = {}
+
+TERMINAL_STATUSES = ('succeeded', 'failed', 'cancelled')
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def job_handler(kind, stages, priority='interactive'):
+    """백그라운드 작업 핸들러 등록 데코레이터. handler(ctx, params) -> result dict
+
+    priority는 핸들러 안에서 나가는 OpenAI 호출의 우선순위 (services.openai_scheduler.PRIORITIES)
+    """
+    def decorator(fn):
+        _handlers[kind] = (fn, list(stages), priority)
+        return fn
+    return decorator
+
+
+class JobContext:
+    """핸들러가 단계 진행 상황을 기록하고 취소 여부를 확인하는 창구"""
+
+    def __init__(self, job):
+        self.job = job
+        self.job_id = job.id
+
+    def _save_stages(self, stages):
+        self.job.stages_json = json.dumps(stages, ensure_ascii=False)
+        db.session.commit()
+        job_events.publish(self.job_id, 'stages', stages)
+
+    def emit(self, event, data):
+        """SSE 구독자에게 중간 결과 전달 (DB에는 저장하지 않음)"""
+        job_events.publish(self.job_id, event, data)
+
+    def _update_stage(self, name, **fields):
+        stages = self.job.stages
+        for stage in stages:
+            if stage['name'] == name:
+                stage.update(fields)
+                break
+        else:
+            stages.append({'name': name, **fields})
+        self._save_stages(stages)
+
+    def check_cancelled(self):
+        cancelled = db.session.query(Job.cancel_requested).filter_by(id=self.job_id).scalar()
+        if cancelled:
+            raise JobCancelled()
+
+    def begin(self, name):
+        self.check_cancelled()
+        self._update_stage(name, status='running', started_at=datetime.utcnow().isoformat())
+
+    def end(self, name, status='done'):
+        self._update_stage(name, status=status, finished_at=datetime.utcnow().isoformat())
+
+    @contextmanager
+    def stage(self, name):
+        self.begin(name)
+        try:
+            yield
+        except JobCancelled:
+            self.end(name, 'cancelled')
+            raise
+        except Exception:
+            self.end(name, 'failed')
+            raise
+        self.end(name)
+
+    def skip(self, name):
+        self._update_stage(name, status='skipped')
+
+    def progress(self, name, done, total):
+        self._update_stage(name, done=done, total=total)
+
+    def note(self, name, **fields):
+        """재시작 시 이어가는 데 필요한 값(외부 작업 ID 등)을 단계에 기록"""
+        self._update_stage(name, **fields)
+
+
+class JobQueue:
+    """SQLite에 저장되는 작업 큐 + 스레드 워커 풀"""
+
+    def __init__(self):
+        self.app = None
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['job_queue'] = self
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            workers = max(1, int(self.app.config.get('JOB_WORKERS', 2)))
+            self._recover()
+            for i in range(workers):
+                t = threading.Thread(target=self._worker_loop, name=f'job-worker-{i}', daemon=True)
+                t.start()
+                self._threads.append(t)
+            print(f"👷 Job workers started: {workers}")
+
+    def _recover(self):
+        """재시작 전에 끝나지 않은 작업을 다시 큐에 넣기"""
+        with self.app.app_context():
+            Job.query.filter_by(status='running').update({'status': 'queued'})
+            db.session.commit()
+            pending = Job.query.filter_by(status='queued').order_by(Job.created_at).all()
+            for job in pending:
+                self._queue.put(job.id)
+            if pending:
+                print(f"♻️ Recovered {len(pending)} unfinished job(s)")
+
+    def submit(self, kind, params):
+        if kind not in _handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        _, stage_names, _ = _handlers[kind]
+        job = Job(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            status='queued',
+            params_json=json.dumps(params, ensure_ascii=False),
+            stages_json=json.dumps([{'name': s, 'status': 'pending'} for s in stage_names])
+        )
+        db.session.add(job)
+        db.session.commit()
+        self._queue.put(job.id)
+        return job
+
+    def cancel(self, job):
+        if job.status in TERMINAL_STATUSES:
+            return job
+        job.cancel_requested = True
+        if job.status == 'queued':
+            job.status = 'cancelled'
+            job.finished_at = datetime.utcnow()
+        db.session.commit()
+        if job.status == 'cancelled':
+            job_events.publish(job.id, 'done', job.to_dict())
+        return job
+
+    def _worker_loop(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                with self.app.app_context():
+                    self._run(job_id)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job_id):
+        job = db.session.get(Job, job_id)
+        if job is None or job.status != 'queued':
+            return
+        handler, _, priority = _handlers[job.kind]
+
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        db.session.commit()
+
+        ctx = JobContext(job)
+        job_trace = None
+        try:
+            with request_priority(priority), trace(f'job:{job.kind}:{job_id[:8]}') as job_trace:
+                result = handler(ctx, job.params)
+            ctx.check_cancelled()
+            job.result_json = json.dumps(result, ensure_ascii=False)
+            job.status = 'succeeded'
+        except JobCancelled:
+            db.session.rollback()
+            job.status = 'cancelled'
+            print(f"🛑 Job cancelled: {job_id}")
+        except Exception as e:
+            db.session.rollback()
+            job.status = 'failed'
+            job.error = str(e)
+            print(f"❌ Job failed: {job_id} ({str(e)})")
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        job_seconds.observe((job.finished_at - job.started_at).total_seconds(), kind=job.kind, status=job.status)
+        if job_trace is not None:
+            log_trace(job_trace)
+        job_events.publish(job_id, 'done', job.to_dict())
+
+
+job_queue = JobQueue()
@@ -0,0 +1,127 @@
+import json
+import re
+
+
+class ArrayObjectStream:
+    """스트리밍으로 들어오는 JSON 텍스트에서 배열 안의 객체가 닫히는 즉시 꺼내주는 파서
+
+    `[{"de": ...}, ...]` 처럼 최상위 배열이든 `{"sentences": [{...}]}` 처럼 안쪽 배열이든,
+    배열의 원소인 객체가 완성될 때마다 feed()가 돌려준다. 코드펜스(```json) 같은 바깥 텍스트는 무시.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._object_start = None
+
+    def feed(self, chunk):
+        self.text += chunk
+        completed = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                if ch == '{' and self._stack and self._stack[-1] == '[' and self._object_start is None:
+                    self._object_start = (i, len(self._stack))
+                self._stack.append(ch)
+            elif ch in '}]':
+                if self._stack:
+                    self._stack.pop()
+                if ch == '}' and self._object_start is not None and len(self._stack) == self._object_start[1]:
+                    try:
+                        completed.append(json.loads(text[self._object_start[0]:i + 1]))
+                    except json.JSONDecodeError:
+                        pass
+                    self._object_start = None
+        self._pos = len(text)
+        return completed
+
+
+_FENCE = re.compile(r'```[a-zA-Z]*\s*\n?(.*?)(?:```|$)', re.DOTALL)
+_TRAILING_COMMA = re.compile(r',(\s*[}\]])')
+
+
+def _strip_wrapping(text):
+    """코드펜스(```json ... ```, 닫는 펜스가 잘렸어도)와 JSON 앞뒤의 설명 문장 떼기"""
+    text = (text or '').strip()
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1).strip()
+    starts = [i for i in (text.find('{'), text.find('[')) if i >= 0]
+    return text[min(starts):] if starts else text
+
+
+def _close_truncated(text):
+    """잘린 JSON을 마지막으로 완성된 원소까지 자르고 열린 괄호를 닫기. 못 살리면 None"""
+    stack = []
+    in_string = False
+    escape = False
+    cut = None
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+        elif ch in '}]':
+            if not stack:
+                break
+            stack.pop()
+            if not stack:
+                # 최상위 값이 끝남. 뒤에 붙은 건 버림
+                return text[:i + 1]
+            cut = (i + 1, list(stack))
+        elif ch == ',' and stack:
+            # 쉼표 앞까지는 완성된 원소 (객체라면 "키": 값 한 쌍)
+            cut = (i, list(stack))
+    if cut is None:
+        return None
+    end, open_brackets = cut
+    return text[:end] + ''.join(reversed(open_brackets))
+
+
+def repair_json(text):
+    """모델 응답에서 JSON 값 꺼내기. (값, 잘린 응답을 복구했는지) 반환. 살릴 수 없으면 ValueError
+
+    펜스/앞뒤 설명은 떼고, 끝의 쉼표는 지우고, max_tokens에 걸려 잘린 응답은 마지막으로 완성된
+    원소까지만 살린다 (잘린 문장 배열이면 끝난 문장들은 그대로 남음).
+    """
+    raw = (text or '').strip()
+    try:
+        return json.loads(raw), False
+    except json.JSONDecodeError:
+        pass
+    body = _strip_wrapping(raw)
+    for candidate in (body, _TRAILING_COMMA.sub(r'\1', body)):
+        try:
+            return json.loads(candidate), False
+        except json.JSONDecodeError:
+            pass
+    closed = _close_truncated(_TRAILING_COMMA.sub(r'\1', body))
+    if closed is not None:
+        try:
+            return json.loads(_TRAILING_COMMA.sub(r'\1', closed)), True
+        except json.JSONDecodeError:
+            pass
+    raise ValueError(f"Reply is not JSON: {raw[:80]!r}")
@@ -0,0 +1,248 @@
+import re
+
+from PIL import Image, ImageChops
+
+from services.metrics import span
+
+# 분석은 이 높이로 줄인 흑백 이미지에서 (오선 간격이 몇 픽셀은 되도록)
+WORK_HEIGHT = 1600
+# 좌우 가장자리(책 그림자, 페이지 테두리)는 빼고 봄
+SIDE_MARGIN = 0.05
+# 이어진 가로 잉크 구간이 페이지 폭의 이 비율 이상인 가는 가로줄 = 오선 후보
+# (행 전체 잉크 비율로 보면 본문 사이의 짧은 악보 예시를 놓침)
+MIN_LINE_LENGTH = 0.08
+# 가로 구간은 페이지 폭을 이만큼의 칸으로 나눠서 보고, 칸이 이 비율 이상 차 있으면 잉크로 봄
+LINE_BINS = 400
+LINE_BIN_FILL = 0.7
+# 다섯 줄이 가로로 이 비율 이상 겹쳐야 한 오선
+MIN_STAFF_OVERLAP = 0.6
+# 잉크가 이 비율 미만인 행 = 빈 행
+BLANK_FILL = 0.004
+# 오선 간격 허용 범위 (페이지 높이 대비)와 다섯 줄 간격의 최대/최소 비
+MIN_STAFF_SPACING = 0.002
+MAX_STAFF_SPACING = 0.02
+MAX_SPACING_RATIO = 1.35
+# 오선 위아래 음표/덧줄/가사까지 넓힐 최대 범위 (오선 간격 배수)
+STAFF_REACH = 5
+# 오선 사이가 이 이상(오선 간격 배수) 벌어지면 다른 악보 블록
+SYSTEM_GAP = 8
+# 이보다 짧은 빈 구간(페이지 높이 대비)은 줄 사이가 아니라 그림 안의 틈으로 봄
+MIN_BLANK_GAP = 0.003
+# 줄 사이 빈 구간 없이 이어지는 잉크 구간이 이보다 크면 그림 (페이지 높이 대비, 그리고 글자 줄 높이 배수)
+MIN_ILLUSTRATION = 0.06
+MIN_ILLUSTRATION_LINES = 3
+MAX_ILLUSTRATION = 0.9
+# LLM 힌트와 맞출 때 힌트 위치를 이만큼(%) 넓혀서 겹치는지 봄 (LLM 좌표는 10% 안팎으로 어긋남)
+HINT_SLACK = 15
+
+
+def _otsu(histogram):
+    total = sum(histogram)
+    weighted = sum(i * count for i, count in enumerate(histogram))
+    background = background_weight = 0
+    best, threshold = -1.0, 128
+    for i, count in enumerate(histogram):
+        background_weight += count
+        if background_weight == 0:
+            continue
+        foreground_weight = total - background_weight
+        if foreground_weight == 0:
+            break
+        background += i * count
+        mean_b = background / background_weight
+        mean_f = (weighted - background) / foreground_weight
+        variance = background_weight * foreground_weight * (mean_b - mean_f) ** 2
+        if variance > best:
+            best, threshold = variance, i
+    return threshold
+
+
+def binarize(img):
+    """분석용 잉크 이미지 (잉크 255, 배경 0). 높이를 WORK_HEIGHT 근처로 줄이고 좌우 가장자리는 뺌"""
+    factor = max(1, img.height // WORK_HEIGHT)
+    work = img.reduce(factor) if factor > 1 else img
+    gray = work.convert('L')
+    left = int(gray.width * SIDE_MARGIN)
+    gray = gray.crop((left, 0, gray.width - left, gray.height))
+    threshold = _otsu(gray.histogram())
+    return gray.point(lambda value: 255 if value <= threshold else 0)
+
+
+def row_profile(ink, left=0, right=None):
+    """행마다 잉크 비율 (0~1) 목록. left~right 열만 볼 수 있음 (가로 1픽셀로 평균 내는 식으로 계산)"""
+    right = ink.width if right is None else right
+    column = ink.crop((left, 0, right, ink.height)).resize((1, ink.height), Image.BOX)
+    return [value / 255 for value in column.getdata()]
+
+
+def line_extents(ink):
+    """행마다 충분히 긴 (MIN_LINE_LENGTH 이상) 가로 잉크 구간들이 걸친 (시작 열, 끝 열). 없으면 (0, 0)
+
+    음표나 기울기 때문에 한 줄이 여러 토막으로 끊겨 보여도 양 끝은 같게 잡힘.
+    """
+    bins = max(1, min(LINE_BINS, ink.width))
+    bin_width = ink.width / bins
+    cells = ink.resize((bins, ink.height), Image.BOX)
+    cells = cells.point(lambda value: 255 if value >= LINE_BIN_FILL * 255 else 0)
+    # 살짝 기운 가는 줄은 한 행에 일부만 걸리므로 위아래 행과 합쳐서 봄
+    cells = ImageChops.lighter(cells, ImageChops.lighter(
+        ImageChops.offset(cells, 0, 1), ImageChops.offset(cells, 0, -1)
+    )).tobytes()
+    # 오선 후보가 될 수 없는 짧은 구간은 정규식에서 바로 건너뜀
+    full_cells = re.compile(rb'\xff{%d,}' % max(1, int(bins * MIN_LINE_LENGTH)))
+    extents = []
+    for row in range(ink.height):
+        spans = [match.span() for match in full_cells.finditer(cells, row * bins, (row + 1) * bins)]
+        if spans:
+            extents.append((
+                int((spans[0][0] - row * bins) * bin_width),
+                int((spans[-1][1] - row * bins) * bin_width)
+            ))
+        else:
+            extents.append((0, 0))
+    return extents
+
+
+def _line_candidates(extents, width, height):
+    """가는 가로줄(오선 후보)의 (가운데 행, 왼쪽 열, 오른쪽 열)"""
+    max_thickness = max(3, int(height * 0.004))
+    min_length = width * MIN_LINE_LENGTH
+    lines = []
+    start = None
+    for row, (left, right) in enumerate(extents + [(0, 0)]):
+        if right - left >= min_length:
+            if start is None:
+                start, extent = row, [left, right]
+            else:
+                extent = [min(extent[0], left), max(extent[1], right)]
+        elif start is not None:
+            if row - start <= max_thickness:
+                lines.append(((start + row - 1) / 2, extent[0], extent[1]))
+            start = None
+    return lines
+
+
+def _overlap_ratio(lines):
+    left = max(line[1] for line in lines)
+    right = min(line[2] for line in lines)
+    shortest = min(line[2] - line[1] for line in lines)
+    return (right - left) / shortest if shortest > 0 else 0
+
+
+def find_staves(extents, width, height):
+    """간격이 고르고 가로로 겹치는 다섯 줄 = 오선. [(첫 줄, 마지막 줄, 간격, 왼쪽 열, 오른쪽 열)]"""
+    lines = _line_candidates(extents, width, height)
+    staves = []
+    i = 0
+    while i + 4 < len(lines):
+        group = lines[i:i + 5]
+        gaps = [group[k + 1][0] - group[k][0] for k in range(4)]
+        if (min(gaps) >= height * MIN_STAFF_SPACING and max(gaps) <= height * MAX_STAFF_SPACING
+                and max(gaps) <= min(gaps) * MAX_SPACING_RATIO
+                and _overlap_ratio(group) >= MIN_STAFF_OVERLAP):
+            staves.append((
+                group[0][0], group[4][0], sum(gaps) / 4,
+                min(line[1] for line in group), max(line[2] for line in group)
+            ))
+            i += 5
+        else:
+            i += 1
+    return staves
+
+
+def _is_blank(profile, start, end):
+    return all(fill < BLANK_FILL for fill in profile[max(0, start):max(0, end)])
+
+
+def _grow(profile, top, bottom, reach, gap):
+    """빈 행이 gap줄 이어지는 곳이 나올 때까지 (최대 reach행) 위아래로 넓히기"""
+    limit = max(0, top - reach)
+    while top > limit and not _is_blank(profile, top - gap, top):
+        top -= 1
+    limit = min(len(profile), bottom + reach)
+    while bottom < limit and not _is_blank(profile, bottom, bottom + gap):
+        bottom += 1
+    return top, bottom
+
+
+def _ink_runs(profile, min_gap):
+    """빈 행이 min_gap줄 이상 이어지는 곳으로 나눈 잉크 구간 [(시작, 끝)] (그림의 가는 빗금 사이는 안 끊김)"""
+    runs = []
+    start = end = None
+    for row, fill in enumerate(profile):
+        if fill < BLANK_FILL:
+            continue
+        if start is not None and row - end > min_gap:
+            runs.append((start, end))
+            start = None
+        if start is None:
+            start = row
+        end = row + 1
+    if start is not None:
+        runs.append((start, end))
+    return runs
+
+
+def detect_regions(img):
+    """페이지 이미지에서 악보/그림 영역 찾기. [{'type', 'top', 'bottom', 'confidence'}] (top/bottom은 %)"""
+    with span('ocr.layout'):
+        ink = binarize(img)
+        height = ink.height
+        profile = row_profile(ink)
+        regions = []
+
+        music = []
+        for first, last, spacing, left, right in find_staves(line_extents(ink), ink.width, height):
+            if music and first - music[-1][1] <= SYSTEM_GAP * spacing:
+                previous = music[-1]
+                music[-1] = (previous[0], last, spacing, previous[3] + 1,
+                             min(previous[4], left), max(previous[5], right))
+            else:
+                music.append((first, last, spacing, 1, left, right))
+        for first, last, spacing, staves, left, right in music:
+            reach = int(spacing * STAFF_REACH)
+            # 위아래로 넓힐 때는 오선이 있는 열만 봄 (옆 단의 글자나 페이지 얼룩에 끌려가지 않게)
+            band = row_profile(ink, left, right)
+            top, bottom = _grow(band, int(first), int(last) + 1, reach, max(2, int(spacing / 2)))
+            pad = int(spacing)
+            regions.append({
+                'type': 'music_score',
+                'top': max(0, top - pad),
+                'bottom': min(height, bottom + pad),
+                'confidence': 0.95 if staves > 1 else 0.85
+            })
+
+        runs = _ink_runs(profile, max(3, int(height * MIN_BLANK_GAP)))
+        text_lines = sorted(end - start for start, end in runs) or [0]
+        line_height = text_lines[len(text_lines) // 2]
+        min_height = max(height * MIN_ILLUSTRATION, line_height * MIN_ILLUSTRATION_LINES)
+        for start, end in runs:
+            if not min_height <= end - start <= height * MAX_ILLUSTRATION:
+                continue
+            if any(start < region['bottom'] and end > region['top'] for region in regions):
+                continue
+            regions.append({'type': 'illustration', 'top': start, 'bottom': end, 'confidence': 0.8})
+
+    for region in regions:
+        region['top'] = round(region['top'] * 100 / height, 2)
+        region['bottom'] = round(region['bottom'] * 100 / height, 2)
+    return sorted(regions, key=lambda region: region['top'])
+
+
+def _overlap(region, top, bottom):
+    return min(region['bottom'], bottom) - max(region['top'], top)
+
+
+def match_region(regions, block_type, hint):
+    """LLM이 준 블록(종류, crop_percent 힌트)에 맞는 같은 종류의 감지 영역. 쓴 영역은 목록에서 빠짐. 없으면 None"""
+    top, bottom = hint.get('top', 0), hint.get('bottom', 100)
+    candidates = [r for r in regions if r['type'] == block_type]
+    best = max(
+        candidates,
+        key=lambda region: _overlap(region, top - HINT_SLACK, bottom + HINT_SLACK),
+        default=None
+    )
+    if best is None or _overlap(best, top - HINT_SLACK, bottom + HINT_SLACK) <= 0:
+        return None
+    regions.remove(best)
+    return best
@@ -0,0 +1,243 @@
+import bisect
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# 초 단위 히스토그램 구간 (SQLite 쿼리 ~ OpenAI 호출까지 한 번에 담도록 넓게)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + list(extra or [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.labelnames, key)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, key, [("le", le)])} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, key)} {total}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, key)} {cumulative}')
+        return lines
+
+
+class Registry:
+    """Prometheus 텍스트 형식으로 내보내는 간단한 메트릭 저장소"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        """렌더링할 때마다 호출해서 (이름, 타입, 설명, [(라벨 dict, 값)])을 받는 함수 등록"""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for fn in self._collectors:
+            for name, kind, documentation, samples in fn():
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in samples:
+                    lines.append(f'{name}{_labels(labels.keys(), labels.values())} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+http_request_seconds = registry.histogram(
+    'wagner_http_request_duration_seconds', 'HTTP request latency by route', ('method', 'route', 'status'))
+stage_seconds = registry.histogram(
+    'wagner_stage_duration_seconds', 'Pipeline stage latency', ('stage',))
+openai_request_seconds = registry.histogram(
+    'wagner_openai_request_duration_seconds', 'OpenAI call latency per service function', ('function', 'outcome'))
+openai_tokens = registry.counter(
+    'wagner_openai_tokens_total', 'OpenAI tokens used per service function', ('function', 'kind'))
+db_query_seconds = registry.histogram(
+    'wagner_db_query_duration_seconds', 'SQLite query latency by statement type', ('operation',))
+job_seconds = registry.histogram(
+    'wagner_job_duration_seconds', 'Background job run time', ('kind', 'status'))
+page_joins = registry.counter(
+    'wagner_page_joins_total', 'Page boundary joins by method (local rules or LLM merge)', ('method', 'reason'))
+
+
+class Trace:
+    """한 요청/작업 동안의 구간 기록"""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans = []
+        self.db_queries = 0
+        self.db_seconds = 0.0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def summary(self):
+        return {
+            'trace': self.name,
+            'total_ms': round(self.elapsed * 1000, 1),
+            'db_queries': self.db_queries,
+            'db_ms': round(self.db_seconds * 1000, 1),
+            'spans': self.spans
+        }
+
+
+_trace = contextvars.ContextVar('metrics_trace', default=None)
+
+
+@contextmanager
+def trace(name):
+    """구간 기록 시작. 블록 안의 span()/DB 쿼리가 이 Trace에 쌓임"""
+    current = Trace(name)
+    token = _trace.set(current)
+    try:
+        yield current
+    finally:
+        _trace.reset(token)
+
+
+def begin_trace(name):
+    """with 블록으로 감쌀 수 없는 곳(before/after_request)용. (Trace, 복원 토큰) 반환"""
+    current = Trace(name)
+    return current, _trace.set(current)
+
+
+def end_trace(token):
+    _trace.reset(token)
+
+
+def current_trace():
+    return _trace.get()
+
+
+@contextmanager
+def span(name, **attrs):
+    """파이프라인 단계 하나의 소요 시간을 히스토그램과 현재 Trace에 기록"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - started
+        stage_seconds.observe(duration, stage=name)
+        current = _trace.get()
+        if current is not None:
+            current.spans.append({'name': name, 'ms': round(duration * 1000, 1), **attrs})
+
+
+def record_db_query(statement, duration):
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'UNKNOWN'
+    db_query_seconds.observe(duration, operation=operation)
+    current = _trace.get()
+    if current is not None:
+        current.db_queries += 1
+        current.db_seconds += duration
+
+
+def record_openai_usage(function, usage):
+    if usage is None:
+        return
+    openai_tokens.inc(getattr(usage, 'prompt_tokens', 0) or 0, function=function, kind='prompt')
+    openai_tokens.inc(getattr(usage, 'completion_tokens', 0) or 0, function=function, kind='completion')
+
+
+def log_trace(current, prefix='⏱️'):
+    print(f"{prefix} {json.dumps(current.summary(), ensure_ascii=False)}")
+
+
+_sqlalchemy_instrumented = False
+
+
+def instrument_sqlalchemy():
+    """모든 SQLAlchemy 엔진의 쿼리 시간을 기록 (한 번만 등록)"""
+    global _sqlalchemy_instrumented
+    if _sqlalchemy_instrumented:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_started'].pop()
+        record_db_query(statement, time.perf_counter() - started)
+
+    _sqlalchemy_instrumented = True
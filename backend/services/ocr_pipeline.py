@@ -0,0 +1,316 @@
+import asyncio
+import base64
+import copy
+import io
+import os
+import uuid
+
+from PIL import Image
+
+from services import openai_async
+from services.chunked_translate import needs_chunking, stream_translate_chunked
+from services.image_index import (
+    content_hash,
+    perceptual_hash,
+    find_cached_analysis,
+    store_analysis
+)
+from services.image_preprocess import prepare_for_vision
+from services.job_queue import job_handler
+from services.metrics import span, page_joins
+from services.openai_service import (
+    extract_text_from_image,
+    translate_with_sentence_mapping,
+    merge_and_translate_pages,
+    stream_translate_with_sentence_mapping,
+    stream_merge_and_translate_pages
+)
+from services.page_join import join_pages, JOIN_CONFIDENCE
+
+UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads'))
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+OCR_STAGES = ['ocr', 'crop', 'translate']
+
+# 저장 확장자는 실제 이미지 포맷으로 정함 (같은 바이트를 .jpg/.jpeg/.png로 올려도 파일은 하나)
+FORMAT_EXTENSIONS = {
+    'JPEG': 'jpg', 'MPO': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif',
+    'BMP': 'bmp', 'TIFF': 'tif', 'HEIF': 'heic'
+}
+# Pillow가 못 읽는 파일일 때만 클라이언트 확장자를 씀 (별칭은 하나로)
+EXTENSION_ALIASES = {'jpeg': 'jpg', 'jpe': 'jpg', 'tiff': 'tif', 'heif': 'heic'}
+
+
+def upload_extension(image_data, original_filename):
+    try:
+        with Image.open(io.BytesIO(image_data)) as img:
+            image_format = img.format
+    except Exception:
+        image_format = None
+    if image_format:
+        return FORMAT_EXTENSIONS.get(image_format, image_format.lower())
+    ext = original_filename.rsplit('.', 1)[-1].lower() if '.' in original_filename else 'jpg'
+    return EXTENSION_ALIASES.get(ext, ext)
+
+
+def save_upload(image_data, original_filename):
+    """업로드 원본을 SHA-256 이름으로 저장 (같은 내용이면 기존 파일 재사용). (파일명, 해시) 반환"""
+    sha256 = content_hash(image_data)
+    filename = f"{sha256}.{upload_extension(image_data, original_filename)}"
+    filepath = os.path.join(UPLOAD_FOLDER, filename)
+    if os.path.exists(filepath):
+        print(f"♻️ Image already stored: {filename}")
+        return filename, sha256
+    with span('upload.write', bytes=len(image_data)):
+        tmp_path = f"{filepath}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(image_data)
+        os.replace(tmp_path, filepath)
+    print(f"💾 Image saved: {filename}")
+    return filename, sha256
+
+
+def page_type_for(has_music, has_illustration):
+    if has_music:
+        return 'music'
+    if has_illustration:
+        return 'illustration'
+    return 'text'
+
+
+def _prepare(image_data):
+    with span('ocr.preprocess'):
+        prepared = prepare_for_vision(image_data)
+    print(f"📸 Processing image... ({len(image_data) // 1024}KB → {len(prepared['data']) // 1024}KB, scale={prepared['scale']:.2f})")
+    print("🔍 Analyzing page content...")
+    return prepared, base64.b64encode(prepared['data']).decode('utf-8')
+
+
+def analyze_page(image_data):
+    """Vision OCR로 페이지 구조와 텍스트 분석 (축소/정규화한 이미지를 보냄)"""
+    prepared, base64_image = _prepare(image_data)
+    return _finish_analysis(extract_text_from_image(base64_image, prepared['mime_type']), prepared)
+
+
+async def analyze_page_async(image_data):
+    """analyze_page의 비동기 버전. 전처리는 스레드에서, Vision 호출은 공유 이벤트 루프의 연결 풀로"""
+    prepared, base64_image = await asyncio.to_thread(_prepare, image_data)
+    page_analysis = await openai_async.extract_text_from_image(base64_image, prepared['mime_type'])
+    return _finish_analysis(page_analysis, prepared)
+
+
+def _finish_analysis(page_analysis, prepared):
+    # crop_percent는 비율이라 그대로 쓰고, 픽셀 좌표가 필요하면 scale로 원본에 맞춤
+    page_analysis['image_scale'] = prepared['scale']
+    page_analysis['image_size'] = {
+        'width': prepared['original_width'],
+        'height': prepared['original_height']
+    }
+
+    if page_analysis.get('has_music_score', False):
+        print("🎵 Music score detected!")
+    if page_analysis.get('has_illustration', False):
+        print("🖼️ Illustration detected!")
+    return page_analysis
+
+
+def crop_content_blocks(image_data, content_blocks, filename):
+    """악보/그림 블록을 원본에서 크롭해 image_file 채우기 (원본은 필요할 때 한 번만 디코딩)
+
+    크롭 범위는 페이지 레이아웃 분석(layout_detect)이 찾은 영역을 쓰고, LLM의 crop_percent는
+    어느 영역인지 고르는 힌트로만 씀. 맞는 영역이 없을 때만 LLM 좌표를 보정해서 씀.
+    """
+    from services.crop_engine import crop_regions, decoded_images, image_key_for_file
+    from services.layout_detect import detect_regions, match_region
+    image_key = image_key_for_file(filename)
+    regions = None
+    cropped = []
+    for block in content_blocks:
+        if block['type'] in ['music_score', 'illustration']:
+            crop_info = block.get('llm_crop_percent') or block.get('crop_percent', None)
+            if crop_info:
+                if regions is None:
+                    regions = detect_regions(decoded_images.get(image_key, lambda: image_data))
+                region = match_region(regions, block['type'], crop_info)
+                if region is not None:
+                    top, bottom = region['top'], region['bottom']
+                    print(f"   📐 Layout {region['type']} box: top={top}, bottom={bottom} (AI hint {crop_info.get('top')}~{crop_info.get('bottom')})")
+                    block['llm_crop_percent'] = crop_info
+                    block['crop_percent'] = {'top': top, 'bottom': bottom}
+                else:
+                    top = crop_info.get('top', 0)
+                    bottom = crop_info.get('bottom', 100)
+                    print(f"   📐 AI crop_percent: top={top}, bottom={bottom}")
+                    # AI가 위치를 약간 아래로 잡는 경향 보정
+                    top = max(0, top - 12)
+                    bottom = max(top + 5, bottom - 12)
+                    print(f"   📐 Adjusted: top={top}, bottom={bottom}")
+                cropped.append((block, (top, bottom)))
+            else:
+                block['image_file'] = filename
+    if cropped:
+        files = crop_regions(image_key, lambda: image_data, [box for _, box in cropped])
+        for (block, _), crop_file in zip(cropped, files):
+            block['image_file'] = crop_file
+    return content_blocks
+
+
+def _consume_stream(events, on_sentence=None):
+    result = None
+    for event, data in events:
+        if event == 'sentence':
+            if on_sentence:
+                on_sentence(data)
+        elif event == 'done':
+            result = data
+    return result
+
+
+def translate_page(german_text, previous_german='', on_sentence=None):
+    """이전 페이지와 이어 붙여 문장 단위 번역. on_sentence를 주면 스트리밍으로 문장마다 호출
+
+    끊긴 단어/문장 잇기는 먼저 로컬 규칙(page_join)으로 하고, 확신이 낮을 때만 LLM 병합 프롬프트를 씀.
+    """
+    joined = join_pages(previous_german, german_text)
+    use_llm_merge = bool(previous_german) and joined['confidence'] < JOIN_CONFIDENCE
+    if previous_german:
+        page_joins.inc(method='llm' if use_llm_merge else 'local', reason=joined['reason'])
+
+    if use_llm_merge:
+        prev_ending = previous_german[-300:] if len(previous_german) > 300 else previous_german
+        print(f"🔗 Previous page ending: ...{prev_ending[-60:]}")
+        print(f"🔄 Merge and translate... (local join unsure: {joined['reason']} {joined['confidence']:.2f})")
+
+        with span('translate.merge', chars=len(german_text)):
+            if needs_chunking(german_text):
+                result = _consume_stream(stream_translate_chunked(german_text, prev_ending), on_sentence)
+            elif on_sentence:
+                result = _consume_stream(stream_merge_and_translate_pages(prev_ending, german_text), on_sentence)
+            else:
+                result = merge_and_translate_pages(prev_ending, german_text)
+
+        sentences = result.get('sentences', [])
+        clean_german = result.get('clean_german', german_text)
+        merged_from = result.get('merged_from_previous', '')
+    else:
+        clean_german = joined['clean_german']
+        merged_from = joined['merged_from_previous']
+        if previous_german:
+            print(f"🔗 Joined locally ({joined['reason']} {joined['confidence']:.2f})")
+        print("🔄 Translating with sentence mapping...")
+        with span('translate.sentences', chars=len(clean_german)):
+            if needs_chunking(clean_german):
+                sentences = _consume_stream(stream_translate_chunked(clean_german), on_sentence)['sentences']
+            elif on_sentence:
+                sentences = _consume_stream(stream_translate_with_sentence_mapping(clean_german), on_sentence)
+            else:
+                sentences = translate_with_sentence_mapping(clean_german)
+
+    if merged_from:
+        print(f"   ✨ Merged from previous: {merged_from}")
+
+    return {
+        'sentences': sentences,
+        'korean': '\n'.join([s['ko'] for s in sentences]),
+        'english': '\n'.join([s['en'] for s in sentences]),
+        'clean_german': clean_german,
+        'merged_from_previous': merged_from
+    }
+
+
+def find_reusable_analysis(image_data, sha256, force_ocr=False):
+    """같은/비슷한 이미지의 기존 분석 찾기. (match, phash) 반환"""
+    with span('ocr.cache_lookup'):
+        phash = perceptual_hash(image_data)
+        match = None if force_ocr else find_cached_analysis(sha256, phash)
+    if match is not None:
+        print(f"♻️ Reusing OCR analysis of {match.filename}")
+    return match, phash
+
+
+def crops_reusable(match, sha256, content_blocks):
+    """완전히 같은 이미지이고 크롭 파일이 남아 있으면 (재크롭으로 지워지지 않았으면) 재사용"""
+    if match is None or match.sha256 != sha256:
+        return False
+    return all(
+        os.path.exists(os.path.join(UPLOAD_FOLDER, block['image_file']))
+        for block in content_blocks if block.get('image_file')
+    )
+
+
+def crop_and_store(image_data, filename, sha256, phash, page_analysis):
+    for block in page_analysis.get('content_blocks', []):
+        block.pop('image_file', None)
+    crop_content_blocks(image_data, page_analysis.get('content_blocks', []), filename)
+    store_analysis(sha256, phash, filename, copy.deepcopy(page_analysis))
+
+
+async def analyze_upload_async(image_data, filename, sha256, force_ocr=False):
+    """캐시 조회 → OCR → 크롭까지 한 번에 (단계 기록이 필요 없는 일괄 처리용)
+
+    여러 페이지의 Vision 호출이 공유 이벤트 루프에서 동시에 나가도록 비동기로 두고, DB 조회와 크롭은 스레드에서.
+    """
+    match, phash = await asyncio.to_thread(find_reusable_analysis, image_data, sha256, force_ocr)
+    page_analysis = match.analysis if match is not None else await analyze_page_async(image_data)
+    if not crops_reusable(match, sha256, page_analysis.get('content_blocks', [])):
+        await asyncio.to_thread(crop_and_store, image_data, filename, sha256, phash, page_analysis)
+    return page_analysis
+
+
+def build_ocr_result(page_analysis, translated, original_filename, saved_image):
+    has_music = page_analysis.get('has_music_score', False)
+    has_illustration = page_analysis.get('has_illustration', False)
+    return {
+        'success': True,
+        'original': translated['clean_german'],
+        'korean': translated['korean'],
+        'english': translated['english'],
+        'sentences': translated['sentences'],
+        'content_blocks': page_analysis.get('content_blocks', []),
+        'page_type': page_type_for(has_music, has_illustration),
+        'has_music_score': has_music,
+        'has_illustration': has_illustration,
+        'filename': original_filename,
+        'saved_image': saved_image,
+        'merged_from_previous': translated['merged_from_previous']
+    }
+
+
+@job_handler('ocr', OCR_STAGES)
+def run_ocr_job(ctx, params):
+    """업로드된 한 페이지에 대해 OCR → 크롭 → 번역 파이프라인 실행"""
+    filename = params['saved_image']
+    with open(os.path.join(UPLOAD_FOLDER, filename), 'rb') as f:
+        image_data = f.read()
+
+    sha256 = params.get('sha256') or content_hash(image_data)
+    match, phash = find_reusable_analysis(image_data, sha256, params.get('force_ocr', False))
+
+    if match is not None:
+        page_analysis = match.analysis
+        ctx.skip('ocr')
+    else:
+        with ctx.stage('ocr'):
+            page_analysis = analyze_page(image_data)
+
+    content_blocks = page_analysis.get('content_blocks', [])
+    german_text = page_analysis.get('full_text', '')
+
+    if crops_reusable(match, sha256, content_blocks):
+        ctx.skip('crop')
+    else:
+        with ctx.stage('crop'):
+            crop_and_store(image_data, filename, sha256, phash, page_analysis)
+
+    print(f"   Text (first 80): {german_text[:80]}...")
+    print(f"   Content blocks: {len(content_blocks)}")
+
+    with ctx.stage('translate'):
+        translated = translate_page(
+            german_text, params.get('previous_german', ''),
+            on_sentence=lambda sentence: ctx.emit('sentence', sentence)
+        )
+
+    print("✅ All processing complete!")
+
+    return build_ocr_result(page_analysis, translated, params.get('filename', ''), filename)
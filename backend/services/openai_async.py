@@ -0,0 +1,119 @@
+import asyncio
+import importlib.util
+import os
+import threading
+import weakref
+
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from services.openai_scheduler import scheduler, current_context, apply_context
+from services.openai_service import (
+    api_key,
+    MODEL,
+    PAGE_ANALYSIS_FORMAT,
+    _vision_messages,
+    _page_analysis_reply
+)
+
+# 프로세스 전체가 공유하는 연결 풀 크기. 동시에 떠 있는 요청 수는 bounded()의 limit으로 조절
+MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', 64))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('OPENAI_MAX_KEEPALIVE_CONNECTIONS', 32))
+KEEPALIVE_EXPIRY = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', 60))
+REQUEST_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', 120))
+DEFAULT_CONCURRENCY = int(os.getenv('OPENAI_CONCURRENCY', 16))
+# h2 패키지가 있으면 HTTP/2로 한 연결에 여러 요청을 다중화
+HTTP2 = importlib.util.find_spec('h2') is not None
+
+# httpx 풀은 이벤트 루프에 묶이므로 루프마다 클라이언트 하나
+_clients = weakref.WeakKeyDictionary()
+_loop = None
+_loop_guard = threading.Lock()
+
+
+def get_client():
+    """현재 이벤트 루프용 공유 AsyncOpenAI 클라이언트 (처음 호출 시 생성)"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        http_client = DefaultAsyncHttpxClient(
+            http2=HTTP2,
+            limits=_httpx_limits(),
+            timeout=REQUEST_TIMEOUT
+        )
+        client = AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+        _clients[loop] = client
+        print(f"🔌 Async OpenAI client ready (http2={HTTP2}, max_connections={MAX_CONNECTIONS})")
+    return client
+
+
+def _httpx_limits():
+    # openai 의존성이라 항상 설치되어 있음 (최근 버전은 httpx2)
+    try:
+        import httpx
+    except ImportError:
+        import httpx2 as httpx
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY
+    )
+
+
+def bounded(limit=DEFAULT_CONCURRENCY):
+    """감싼 코루틴들이 최대 limit개씩만 실행되게 하는 함수 (세마포어는 처음 실행될 때 그 루프에서 만듦)"""
+    semaphore = None
+
+    async def wrap(coro):
+        nonlocal semaphore
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(limit)
+        async with semaphore:
+            return await coro
+
+    return wrap
+
+
+def _background_loop():
+    global _loop
+    with _loop_guard:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='openai-async', daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+def submit(coro):
+    """동기 코드(Flask 요청, 작업 스레드)에서 코루틴을 공유 루프에 넘기고 concurrent.futures.Future 반환
+
+    모든 호출이 백그라운드 이벤트 루프 하나를 공유하므로 스레드가 여러 개여도 연결 풀은 하나다.
+    호출한 쪽의 우선순위/마감은 루프 쪽 작업으로 넘겨준다. Future를 cancel하면 루프 쪽 작업도 취소된다.
+    """
+    context = current_context()
+
+    async def with_context():
+        apply_context(context)
+        return await coro
+
+    return asyncio.run_coroutine_threadsafe(with_context(), _background_loop())
+
+
+async def _complete(messages, max_tokens, function, fmt=None):
+    request = {'response_format': fmt} if fmt else {}
+    response = await scheduler.call_async(
+        get_client().chat.completions.create,
+        function=function,
+        model=MODEL,
+        messages=messages,
+        max_tokens=max_tokens,
+        **request
+    )
+    return response.choices[0].message.content
+
+
+async def extract_text_from_image(base64_image, mime_type='image/jpeg'):
+    try:
+        result = await _complete(_vision_messages(base64_image, mime_type), 3000, 'extract_text_from_image', PAGE_ANALYSIS_FORMAT)
+    except Exception as e:
+        raise Exception(f"OCR failed: {str(e)}")
+    return _page_analysis_reply(result)
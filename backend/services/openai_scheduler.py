@@ -0,0 +1,314 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import openai
+
+from services.metrics import span, openai_request_seconds, record_openai_usage
+
+# 계정 쿼터 (분당 요청 수 / 분당 토큰 수)
+REQUESTS_PER_MINUTE = int(os.getenv('OPENAI_RPM', 500))
+TOKENS_PER_MINUTE = int(os.getenv('OPENAI_TPM', 30000))
+# 한 번에 몰아 쓸 수 있는 양 (초 단위 쿼터). 작을수록 429 없이 고르게 나감
+BURST_SECONDS = float(os.getenv('OPENAI_BURST_SECONDS', 10))
+MAX_ATTEMPTS = int(os.getenv('OPENAI_MAX_ATTEMPTS', 6))
+BACKOFF_BASE = float(os.getenv('OPENAI_BACKOFF_BASE', 1.0))
+BACKOFF_MAX = float(os.getenv('OPENAI_BACKOFF_MAX', 60))
+DEFAULT_DEADLINE = float(os.getenv('OPENAI_DEADLINE_SECONDS', 300))
+# 이미지 한 장을 토큰으로 환산한 대략적인 값 (고해상도 타일 기준)
+IMAGE_TOKENS = 1100
+
+# 숫자가 작을수록 먼저 나감
+PRIORITIES = {'interactive': 0, 'retranslate': 1, 'bulk': 2}
+
+_priority = contextvars.ContextVar('openai_priority', default='interactive')
+_deadline = contextvars.ContextVar('openai_deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+@contextmanager
+def request_priority(name):
+    """이 블록 안에서 나가는 OpenAI 호출의 우선순위 지정"""
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown priority: {name}")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+@contextmanager
+def request_deadline(seconds):
+    """이 블록 안의 호출들은 지금부터 seconds 안에 끝나야 함 (바깥 마감이 더 이르면 그쪽을 따름)"""
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def current_context():
+    """다른 스레드/이벤트 루프로 넘길 (우선순위, 마감) 값"""
+    return _priority.get(), _deadline.get()
+
+
+def apply_context(values):
+    priority, deadline = values
+    _priority.set(priority)
+    _deadline.set(deadline)
+
+
+class TokenBucket:
+    def __init__(self, per_minute, burst_seconds):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """amount를 꺼내려면 몇 초 기다려야 하는지 (버킷보다 큰 요청은 가득 찰 때까지)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+
+def estimate_tokens(messages, max_tokens):
+    """프롬프트 글자 수 기준 대략적인 토큰 수 + 응답 최대 토큰 (OpenAI도 max_tokens를 쿼터에 넣어 계산)"""
+    chars = 0
+    images = 0
+    for message in messages:
+        content = message.get('content')
+        if isinstance(content, str):
+            chars += len(content)
+            continue
+        for part in content or []:
+            if part.get('type') == 'image_url':
+                images += 1
+            else:
+                chars += len(json.dumps(part, ensure_ascii=False))
+    return chars // 3 + images * IMAGE_TOKENS + (max_tokens or 0)
+
+
+def _is_retryable(error):
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409) or error.status_code >= 500
+    return False
+
+
+def _retry_after(error):
+    """응답 헤더의 Retry-After(초) / retry-after-ms 값"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except ValueError:
+        return None
+    return None
+
+
+class RequestScheduler:
+    """모든 OpenAI 호출이 지나가는 관문
+
+    요청/토큰 버킷이 허락할 때 우선순위 순서대로 내보내고, 재시도 가능한 오류는
+    지수 백오프(+지터, Retry-After 우선)로 다시 시도한다. 마감을 넘길 것 같으면 DeadlineExceeded.
+    동기 스레드와 asyncio 코루틴 양쪽에서 같은 대기열을 쓴다.
+    """
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                 burst_seconds=BURST_SECONDS):
+        self.requests = TokenBucket(requests_per_minute, burst_seconds)
+        self.tokens = TokenBucket(tokens_per_minute, burst_seconds)
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._stats = {'sent': 0, 'retries': 0, 'rate_limited': 0, 'deadline_exceeded': 0}
+
+    def _count(self, name):
+        with self._cond:
+            self._stats[name] += 1
+
+    def _enqueue(self, priority):
+        ticket = (PRIORITIES[priority], next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+        return ticket
+
+    def _dequeue(self, ticket):
+        with self._cond:
+            if ticket in self._waiting:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+            self._cond.notify_all()
+
+    def _try_admit(self, ticket, tokens):
+        """차례가 되었고 쿼터가 있으면 꺼내고 0, 아니면 기다릴 초 반환"""
+        with self._cond:
+            now = time.monotonic()
+            if self._waiting[0] != ticket:
+                return None
+            wait = max(
+                self._paused_until - now,
+                self.requests.wait_time(1, now),
+                self.tokens.wait_time(tokens, now)
+            )
+            if wait > 0:
+                return wait
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            heapq.heappop(self._waiting)
+            self._stats['sent'] += 1
+            self._cond.notify_all()
+            return 0.0
+
+    def _check_deadline(self, deadline, wait=0.0):
+        if deadline is not None and time.monotonic() + wait > deadline:
+            self._count('deadline_exceeded')
+            raise DeadlineExceeded("OpenAI request deadline exceeded")
+
+    def _admit(self, tokens, priority, deadline):
+        ticket = self._enqueue(priority)
+        try:
+            while True:
+                wait = self._try_admit(ticket, tokens)
+                if wait == 0:
+                    return
+                self._check_deadline(deadline, wait or 0.0)
+                with self._cond:
+                    # 앞 순서가 나가면 깨워주므로 차례가 아닐 때는 짧게만 잠
+                    self._cond.wait(min(wait, 1.0) if wait else 0.5)
+        except BaseException:
+            self._dequeue(ticket)
+            raise
+
+    async def _admit_async(self, tokens, priority, deadline):
+        ticket = self._enqueue(priority)
+        try:
+            while True:
+                wait = self._try_admit(ticket, tokens)
+                if wait == 0:
+                    return
+                self._check_deadline(deadline, wait or 0.0)
+                await asyncio.sleep(min(wait, 1.0) if wait else 0.02)
+        except BaseException:
+            self._dequeue(ticket)
+            raise
+
+    def _backoff(self, error, attempt):
+        """다음 시도까지 기다릴 초. 429면 모든 호출을 같이 멈춤"""
+        delay = _retry_after(error)
+        if delay is None:
+            delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+        if isinstance(error, openai.RateLimitError):
+            with self._cond:
+                self._stats['rate_limited'] += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        self._count('retries')
+        return delay
+
+    def _request_kwargs(self, request, deadline):
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            self._check_deadline(deadline)
+            return {**request, 'timeout': remaining}
+        return request
+
+    def _prepare(self, request):
+        priority, deadline = current_context()
+        if deadline is None:
+            deadline = time.monotonic() + DEFAULT_DEADLINE
+        tokens = estimate_tokens(request.get('messages', []), request.get('max_tokens'))
+        return priority, deadline, tokens
+
+    def call(self, create, function='openai', **request):
+        """create(**request)를 쿼터/우선순위/재시도 규칙에 따라 실행 (동기). function은 메트릭 라벨"""
+        priority, deadline, tokens = self._prepare(request)
+        with span(f'openai.{function}', priority=priority):
+            for attempt in range(MAX_ATTEMPTS):
+                self._admit(tokens, priority, deadline)
+                started = time.perf_counter()
+                try:
+                    response = create(**self._request_kwargs(request, deadline))
+                except Exception as e:
+                    openai_request_seconds.observe(time.perf_counter() - started, function=function, outcome='error')
+                    if not _is_retryable(e) or attempt == MAX_ATTEMPTS - 1:
+                        raise
+                    delay = self._backoff(e, attempt)
+                    self._check_deadline(deadline, delay)
+                    print(f"⏳ OpenAI {type(e).__name__}, retrying in {delay:.1f}s ({attempt + 1}/{MAX_ATTEMPTS - 1})")
+                    time.sleep(delay)
+                    continue
+                openai_request_seconds.observe(time.perf_counter() - started, function=function, outcome='ok')
+                record_openai_usage(function, getattr(response, 'usage', None))
+                return response
+
+    async def call_async(self, create, function='openai', **request):
+        """call()의 비동기 버전"""
+        priority, deadline, tokens = self._prepare(request)
+        with span(f'openai.{function}', priority=priority):
+            for attempt in range(MAX_ATTEMPTS):
+                await self._admit_async(tokens, priority, deadline)
+                started = time.perf_counter()
+                try:
+                    response = await create(**self._request_kwargs(request, deadline))
+                except Exception as e:
+                    openai_request_seconds.observe(time.perf_counter() - started, function=function, outcome='error')
+                    if not _is_retryable(e) or attempt == MAX_ATTEMPTS - 1:
+                        raise
+                    delay = self._backoff(e, attempt)
+                    self._check_deadline(deadline, delay)
+                    print(f"⏳ OpenAI {type(e).__name__}, retrying in {delay:.1f}s ({attempt + 1}/{MAX_ATTEMPTS - 1})")
+                    await asyncio.sleep(delay)
+                    continue
+                openai_request_seconds.observe(time.perf_counter() - started, function=function, outcome='ok')
+                record_openai_usage(function, getattr(response, 'usage', None))
+                return response
+
+    def stats(self):
+        with self._cond:
+            now = time.monotonic()
+            self.requests._refill(now)
+            self.tokens._refill(now)
+            waiting = {name: 0 for name in PRIORITIES}
+            names = {rank: name for name, rank in PRIORITIES.items()}
+            for rank, _ in self._waiting:
+                waiting[names[rank]] += 1
+            return {
+                **self._stats,
+                'waiting': waiting,
+                'requests_available': round(self.requests.level, 1),
+                'tokens_available': round(self.tokens.level),
+                'paused_for': round(max(0.0, self._paused_until - now), 1)
+            }
+
+
+scheduler = RequestScheduler()
@@ -1,7 +1,13 @@
+import contextvars
 import os
-import json
 from openai import OpenAI
 from dotenv import load_dotenv
+from services.json_stream import ArrayObjectStream
+from services.metrics import record_openai_usage
+from services.openai_scheduler import scheduler
+from services.page_join import skeleton
+from services.structured import obj, array, string, boolean, number, nullable, response_format, parse_structured
+from services.translation_cache import cached, translation_cache, TranslationCache
 
 load_dotenv()
 
@@ -11,20 +17,47 @@ print(f"🔑 API Key loaded: {api_key[:20] if api_key else 'NOT FOUND'}...")
 if not api_key:
     raise Exception("OPENAI_API_KEY not found in environment variables")
 
-client = OpenAI(api_key=api_key)
+# 재시도는 scheduler가 쿼터를 보면서 직접 처리
+client = OpenAI(api_key=api_key, max_retries=0)
 
+MODEL = "gpt-4o"
+# 프롬프트를 바꾸면 올려서 이전 캐시 결과를 무효화
+PROMPT_VERSION = 2
 
-def extract_text_from_image(base64_image):
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
+# 응답 JSON 스키마 (Structured Outputs). 루트는 객체여야 해서 문장 배열은 {"sentences": [...]}로 감쌈
+SENTENCE_SCHEMA = obj(de=string(), ko=string(), en=string())
+SENTENCES_SCHEMA = obj(sentences=array(SENTENCE_SCHEMA))
+MERGE_SCHEMA = obj(merged_from_previous=string(), clean_german=string(), sentences=array(SENTENCE_SCHEMA))
+PAGE_ANALYSIS_SCHEMA = obj(
+    has_music_score=boolean(),
+    has_illustration=boolean(),
+    content_blocks=array(obj(
+        type={'type': 'string', 'enum': ['text', 'music_score', 'illustration']},
+        content=nullable(string()),
+        description=nullable(string()),
+        crop_percent=nullable(obj(top=number(), bottom=number()))
+    )),
+    full_text=string()
+)
+
+SENTENCES_FORMAT = response_format('sentences', SENTENCES_SCHEMA)
+MERGE_FORMAT = response_format('merged_sentences', MERGE_SCHEMA)
+PAGE_ANALYSIS_FORMAT = response_format('page_analysis', PAGE_ANALYSIS_SCHEMA)
+
+# 잘린 응답을 고치려고 부른 번역이 또 잘렸을 때 끝없이 고치지 않도록
+MAX_REPAIR_DEPTH = 2
+_repair_depth = contextvars.ContextVar('reply_repair_depth', default=0)
+
+
+def _vision_messages(base64_image, mime_type):
+    """페이지 구조 분석(JSON) 프롬프트"""
+    return [
+        {
+            "role": "user",
+            "content": [
                 {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": """이 이미지를 분석해주세요. 반드시 JSON 형식으로만 응답하세요.
+                    "type": "text",
+                    "text": """이 이미지를 분석해주세요. 반드시 JSON 형식으로만 응답하세요.
 
 {
   "has_music_score": true/false,
@@ -58,151 +91,212 @@ crop_percent 정확한 측정 방법:
 - 텍스트는 정확히 추출하되 줄바꿈 하이픈(= 또는 -)도 그대로 유지
 - 악보/그림이 없으면 content_blocks에 text 블록만 포함
 - 반드시 유효한 JSON으로 응답하세요"""
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
-                            }
-                        }
-                    ]
+                },
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:{mime_type};base64,{base64_image}"
+                    }
                 }
-            ],
-            max_tokens=3000
+            ]
+        }
+    ]
+
+
+def _complete(messages, max_tokens, function, fmt=None):
+    request = {'response_format': fmt} if fmt else {}
+    response = scheduler.call(
+        client.chat.completions.create,
+        function=function,
+        model=MODEL,
+        messages=messages,
+        max_tokens=max_tokens,
+        **request
+    )
+    return response.choices[0].message.content
+
+
+def _page_analysis_reply(reply):
+    """페이지 분석 응답 → dict. 잘린 JSON은 살릴 수 있는 만큼 살리고,
+    JSON이 전혀 아니면 이미지를 다시 보내지 않고 응답 자체를 추출한 텍스트로 씀"""
+    try:
+        analysis, _, _ = parse_structured(reply, PAGE_ANALYSIS_SCHEMA)
+    except ValueError:
+        text = (reply or '').strip()
+        if not text:
+            raise Exception("OCR failed: empty reply")
+        print("⚠️ Page analysis was not valid JSON, using the reply as plain text")
+        return {
+            "has_music_score": False,
+            "has_illustration": False,
+            "content_blocks": [{"type": "text", "content": text}],
+            "full_text": text
+        }
+    # 스키마 때문에 채워진 null 값은 빼서 예전과 같은 모양으로
+    blocks = [{key: value for key, value in block.items() if value is not None} for block in analysis['content_blocks']]
+    if not analysis['full_text']:
+        analysis['full_text'] = '\n'.join(
+            block['content'] for block in blocks if block.get('type') == 'text' and block.get('content')
         )
-        result = response.choices[0].message.content.strip()
-        if result.startswith('```json'):
-            result = result[7:-3].strip()
-        elif result.startswith('```'):
-            result = result[3:-3].strip()
-        parsed = json.loads(result)
-        return parsed
+    if not blocks and analysis['full_text']:
+        blocks = [{"type": "text", "content": analysis['full_text']}]
+    analysis['content_blocks'] = blocks
+    return analysis
+
+
+def extract_text_from_image(base64_image, mime_type='image/jpeg'):
+    try:
+        result = _complete(_vision_messages(base64_image, mime_type), 3000, 'extract_text_from_image', PAGE_ANALYSIS_FORMAT)
     except Exception as e:
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": "이 이미지에 있는 독일어 텍스트를 정확히 추출해주세요. 텍스트만 반환하고, 설명은 하지 마세요."
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=2000
-            )
-            text = response.choices[0].message.content
-            return {
-                "has_music_score": False,
-                "has_illustration": False,
-                "content_blocks": [{"type": "text", "content": text}],
-                "full_text": text
-            }
-        except Exception as e2:
-            raise Exception(f"OCR failed: {str(e2)}")
+        raise Exception(f"OCR failed: {str(e)}")
+    return _page_analysis_reply(result)
+
 
+def _korean_messages(german_text):
+    """한국어 전체 번역 프롬프트"""
+    return [
+        {
+            "role": "system",
+            "content": "당신은 전문 독일어-한국어 번역가입니다. 원문의 뉘앙스와 문학적 표현을 살려 자연스러운 한국어로 번역해주세요."
+        },
+        {
+            "role": "user",
+            "content": f"다음 독일어 텍스트를 한국어로 번역해주세요:\n\n{german_text}"
+        }
+    ]
 
+
+@cached(MODEL, PROMPT_VERSION)
 def translate_to_korean(german_text):
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "당신은 전문 독일어-한국어 번역가입니다. 원문의 뉘앙스와 문학적 표현을 살려 자연스러운 한국어로 번역해주세요."
-                },
-                {
-                    "role": "user",
-                    "content": f"다음 독일어 텍스트를 한국어로 번역해주세요:\n\n{german_text}"
-                }
-            ],
-            max_tokens=2000
-        )
-        return response.choices[0].message.content
+        return _complete(_korean_messages(german_text), 2000, 'translate_to_korean')
     except Exception as e:
         raise Exception(f"Korean translation failed: {str(e)}")
 
 
+def _english_messages(german_text):
+    """영어 전체 번역 프롬프트"""
+    return [
+        {
+            "role": "system",
+            "content": "You are a professional German-English translator. Translate naturally while preserving the nuance of the original text."
+        },
+        {
+            "role": "user",
+            "content": f"Translate the following German text to English:\n\n{german_text}"
+        }
+    ]
+
+
+@cached(MODEL, PROMPT_VERSION)
 def translate_to_english(german_text):
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a professional German-English translator. Translate naturally while preserving the nuance of the original text."
-                },
-                {
-                    "role": "user",
-                    "content": f"Translate the following German text to English:\n\n{german_text}"
-                }
-            ],
-            max_tokens=2000
-        )
-        return response.choices[0].message.content
+        return _complete(_english_messages(german_text), 2000, 'translate_to_english')
     except Exception as e:
         raise Exception(f"English translation failed: {str(e)}")
 
 
-def translate_with_sentence_mapping(german_text):
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": """당신은 전문 번역가입니다. 독일어 텍스트를 문장 단위로 분리하고, 각 문장을 한국어와 영어로 번역해주세요.
+def _sentence_mapping_messages(german_text):
+    """문장 단위 번역 프롬프트 (일반/스트리밍 호출 공용)"""
+    return [
+        {
+            "role": "system",
+            "content": """당신은 전문 번역가입니다. 독일어 텍스트를 문장 단위로 분리하고, 각 문장을 한국어와 영어로 번역해주세요.
 
 반드시 아래 JSON 형식으로만 응답하세요. 다른 텍스트는 포함하지 마세요:
-[
-  {
-    "de": "독일어 원문 문장",
-    "ko": "한국어 번역",
-    "en": "영어 번역"
-  }
-]
+{
+  "sentences": [
+    {
+      "de": "독일어 원문 문장",
+      "ko": "한국어 번역",
+      "en": "영어 번역"
+    }
+  ]
+}
 
 규칙:
 - 각 문장을 자연스러운 단위로 분리하세요
 - 한국어는 자연스럽고 문학적으로 번역하세요
 - 영어도 자연스럽게 번역하세요
-- 반드시 유효한 JSON 배열로 응답하세요"""
-                },
-                {
-                    "role": "user",
-                    "content": f"다음 독일어 텍스트를 문장 단위로 번역해주세요:\n\n{german_text}"
-                }
-            ],
-            max_tokens=4000
+- 반드시 유효한 JSON으로 응답하세요"""
+        },
+        {
+            "role": "user",
+            "content": f"다음 독일어 텍스트를 문장 단위로 번역해주세요:\n\n{german_text}"
+        }
+    ]
+
+
+@cached(MODEL, PROMPT_VERSION)
+def translate_with_sentence_mapping(german_text):
+    try:
+        return _sentences_reply(
+            _complete(_sentence_mapping_messages(german_text), 4000, 'translate_with_sentence_mapping', SENTENCES_FORMAT),
+            german_text
         )
-        result = response.choices[0].message.content.strip()
-        if result.startswith('```json'):
-            result = result[7:-3].strip()
-        elif result.startswith('```'):
-            result = result[3:-3].strip()
-        sentences = json.loads(result)
-        return sentences
     except Exception as e:
         raise Exception(f"Sentence mapping translation failed: {str(e)}")
 
 
-def merge_and_translate_pages(previous_german_ending, new_german_text):
+def _context_sentence_messages(before, german_text, after):
+    """페이지 일부만 다시 번역하는 프롬프트. 앞뒤 문장은 문맥으로만 줌"""
+    return [
+        {
+            "role": "system",
+            "content": """당신은 전문 번역가입니다. 이미 번역된 페이지에서 고쳐진 부분만 다시 번역합니다.
+"번역할 부분"만 문장 단위로 분리해서 한국어와 영어로 번역하고, 앞뒤 문맥은 어조와 용어를 맞추는 데만 참고하세요.
+
+반드시 아래 JSON 형식으로만 응답하세요. 다른 텍스트는 포함하지 마세요:
+{
+  "sentences": [
+    {
+      "de": "독일어 원문 문장",
+      "ko": "한국어 번역",
+      "en": "영어 번역"
+    }
+  ]
+}
+
+규칙:
+- 앞뒤 문맥 문장은 결과에 넣지 마세요
+- 한국어는 자연스럽고 문학적으로 번역하세요
+- 영어도 자연스럽게 번역하세요
+- 반드시 유효한 JSON으로 응답하세요"""
+        },
+        {
+            "role": "user",
+            "content": f"""앞 문맥 (번역하지 마세요):
+\"\"\"{before}\"\"\"
+
+뒤 문맥 (번역하지 마세요):
+\"\"\"{after}\"\"\"
+
+번역할 부분:
+
+{german_text}"""
+        }
+    ]
+
+
+@cached(MODEL, PROMPT_VERSION)
+def translate_sentences_in_context(before, german_text, after):
+    """german_text만 문장 단위로 번역 (before/after는 문맥). 응답 길이에 맞춰 max_tokens를 작게 잡음"""
+    max_tokens = min(4000, 300 + len(german_text) * 2)
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": """당신은 19세기 독일어 서적 전문 번역가입니다.
+        return _sentences_reply(_complete(
+            _context_sentence_messages(before, german_text, after), max_tokens, 'translate_sentences_in_context',
+            SENTENCES_FORMAT
+        ), german_text)
+    except Exception as e:
+        raise Exception(f"Sentence translation failed: {str(e)}")
+
+
+def _merge_messages(previous_german_ending, new_german_text):
+    """페이지 병합 + 번역 프롬프트 (일반/스트리밍 호출 공용)"""
+    return [
+        {
+            "role": "system",
+            "content": """당신은 19세기 독일어 서적 전문 번역가입니다.
 
 옛 독일어 책에서는 페이지가 넘어갈 때 단어나 문장이 중간에 끊기는 경우가 많습니다.
 - 단어 끊김: "Ein=" 다음 페이지 "druck" → "Eindruck"
@@ -232,69 +326,186 @@ def merge_and_translate_pages(previous_german_ending, new_german_text):
 - 영어도 자연스럽게 번역하세요
 - 합쳐진 문장도 자연스럽게 번역하세요
 - 반드시 유효한 JSON으로 응답하세요"""
-                },
-                {
-                    "role": "user",
-                    "content": f"""이전 페이지 끝부분:
+        },
+        {
+            "role": "user",
+            "content": f"""이전 페이지 끝부분:
 \"\"\"{previous_german_ending}\"\"\"
 
 새 페이지 전체 텍스트:
 \"\"\"{new_german_text}\"\"\"
 
 끊긴 단어와 문장을 합치고, 문장 단위로 번역해주세요."""
-                }
-            ],
-            max_tokens=4000
+        }
+    ]
+
+
+@cached(MODEL, PROMPT_VERSION)
+def merge_and_translate_pages(previous_german_ending, new_german_text):
+    try:
+        return _merge_reply(
+            _complete(_merge_messages(previous_german_ending, new_german_text), 4000, 'merge_and_translate_pages', MERGE_FORMAT),
+            new_german_text
         )
-        result = response.choices[0].message.content.strip()
-        if result.startswith('```json'):
-            result = result[7:-3].strip()
-        elif result.startswith('```'):
-            result = result[3:-3].strip()
-        parsed = json.loads(result)
-        return parsed
     except Exception as e:
         raise Exception(f"Merge and translate failed: {str(e)}")
 
 
-def check_sentence_continuation(previous_text, new_text):
+def _missing_tail(german_text, sentences):
+    """잘린 응답에서 마지막으로 받은 문장 뒤의 (번역되지 않은) 원문"""
+    text = skeleton(german_text)
+    last = skeleton(sentences[-1]['de'])
+    index = text.rfind(last) if last else -1
+    if index < 0:
+        raise ValueError("Truncated reply does not match the source text")
+    return text[index + len(last):].strip()
+
+
+def _repair_sentences(sentences, german_text, truncated):
+    """번역이 빠진 문장과 잘려서 못 받은 뒷부분만 다시 번역해서 채움 (전체를 다시 요청하지 않음)"""
+    sentences = [s for s in sentences if s['de'].strip()]
+    incomplete = [i for i, s in enumerate(sentences) if not s['ko'] or not s['en']]
+    if not (truncated or incomplete):
+        return sentences
+    if not sentences or _repair_depth.get() >= MAX_REPAIR_DEPTH:
+        raise ValueError("Reply was truncated before any complete sentence")
+    token = _repair_depth.set(_repair_depth.get() + 1)
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "당신은 텍스트 연속성을 판단하는 전문가입니다."
-                },
-                {
-                    "role": "user",
-                    "content": f"""다음 두 텍스트를 분석해주세요:
-
-이전 페이지 끝: "{previous_text}"
-새 페이지 시작: "{new_text}"
-
-이 두 텍스트가 하나의 문장으로 이어지나요?
-JSON 형식으로만 답변해주세요:
-{{
-  "is_continuation": true/false,
-  "merged_text": "이어지는 경우 합친 문장 (한국어)",
-  "confidence": 0.0-1.0
-}}"""
-                }
-            ],
-            max_tokens=500
+        repaired = []
+        for index, sentence in enumerate(sentences):
+            if index not in incomplete:
+                repaired.append(sentence)
+                continue
+            before = sentences[index - 1]['de'] if index > 0 else ''
+            after = sentences[index + 1]['de'] if index + 1 < len(sentences) else ''
+            repaired.extend(translate_sentences_in_context(before, sentence['de'], after))
+        if truncated:
+            tail = _missing_tail(german_text, repaired)
+            if tail:
+                print(f"🩹 Translating the {len(tail)} chars cut off from a truncated reply")
+                context = ' '.join(s['de'] for s in repaired[-2:])
+                repaired.extend(translate_sentences_in_context(context, tail, ''))
+        return repaired
+    finally:
+        _repair_depth.reset(token)
+
+
+def _sentences_reply(reply, german_text):
+    """문장 배열 응답 → [{de, ko, en}]. 펜스/잘림/빠진 필드는 parse_structured와 _repair_sentences가 처리"""
+    result, truncated, _ = parse_structured(reply, SENTENCES_SCHEMA)
+    return _repair_sentences(result['sentences'], german_text, truncated)
+
+
+def _merge_reply(reply, new_german_text):
+    result, truncated, _ = parse_structured(reply, MERGE_SCHEMA)
+    if not result['clean_german']:
+        result['clean_german'] = new_german_text
+    result['sentences'] = _repair_sentences(result['sentences'], result['clean_german'], truncated)
+    return result
+
+
+def _stream_sentences(messages, max_tokens, function, fmt=None):
+    """스트리밍 호출. 문장 객체가 닫힐 때마다 ('sentence', dict)를 내보내고 전체 응답 텍스트를 반환"""
+    request = {'response_format': fmt} if fmt else {}
+    stream = scheduler.call(
+        client.chat.completions.create,
+        function=function,
+        model=MODEL,
+        messages=messages,
+        max_tokens=max_tokens,
+        stream=True,
+        stream_options={'include_usage': True},
+        **request
+    )
+    parser = ArrayObjectStream()
+    for chunk in stream:
+        if not chunk.choices:
+            # 마지막 청크에만 토큰 사용량이 들어 있음
+            record_openai_usage(function, getattr(chunk, 'usage', None))
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            for sentence in parser.feed(delta):
+                yield ('sentence', sentence)
+    return parser.text
+
+
+def _ready_sentence(sentence):
+    """스트리밍 중에 바로 보내도 되는 문장 ({de, ko, en}이 모두 채워진 경우). 아니면 None"""
+    if not isinstance(sentence, dict):
+        return None
+    values = {lang: sentence.get(lang) for lang in ('de', 'ko', 'en')}
+    if all(isinstance(value, str) and value.strip() for value in values.values()):
+        return values
+    return None
+
+
+def _stream_cached(function_name, texts, messages, fmt, parse, to_sentences, bypass_cache):
+    """캐시에 있으면 바로 전부 내보내고, 없으면 스트리밍 후 일반 함수와 같은 키로 캐시에 저장.
+
+    스트리밍 중에는 세 언어가 다 있는 앞쪽 문장만 내보낸다. 번역이 빠진 문장이 나오면 그 뒤는 붙잡아 두었다가
+    _repair_sentences로 고친 최종 목록에서 이어서 내보낸다 (고쳐도 앞쪽 완성 문장은 순서와 내용이 그대로).
+    """
+    key = TranslationCache.make_key(function_name, MODEL, PROMPT_VERSION, *texts)
+    result = None if bypass_cache else translation_cache.get(key, function_name)
+    if result is None:
+        sent = []
+        holding = False
+        stream = _stream_sentences(messages, 4000, function_name, fmt)
+        while True:
+            try:
+                _, sentence = next(stream)
+            except StopIteration as done:
+                full_text = done.value
+                break
+            ready = None if holding else _ready_sentence(sentence)
+            if ready is None:
+                holding = True
+                continue
+            sent.append(ready)
+            yield ('sentence', ready)
+        result = parse(full_text)
+        translation_cache.set(key, function_name, result)
+        final = to_sentences(result)
+        if final[:len(sent)] == sent:
+            for sentence in final[len(sent):]:
+                yield ('sentence', sentence)
+        else:
+            # 있어서는 안 되는 경우. 이미 보낸 문장과 어긋나면 더 보내지 않고 ('done', ...)의 전체 결과에 맡김
+            print(f"⚠️ {function_name}: repaired reply no longer matches the {len(sent)} streamed sentences")
+    else:
+        print(f"⚡ Cache hit: {function_name}")
+        for sentence in to_sentences(result):
+            yield ('sentence', sentence)
+    yield ('done', result)
+
+
+def stream_translate_with_sentence_mapping(german_text, bypass_cache=False):
+    """translate_with_sentence_mapping의 스트리밍 버전.
+    ('sentence', {de, ko, en})를 문장마다, 마지막에 ('done', 문장 목록)을 내보냄"""
+    try:
+        yield from _stream_cached(
+            'translate_with_sentence_mapping', [german_text],
+            _sentence_mapping_messages(german_text),
+            SENTENCES_FORMAT,
+            lambda reply: _sentences_reply(reply, german_text),
+            lambda result: result,
+            bypass_cache
         )
-        result = response.choices[0].message.content.strip()
-        if result.startswith('```json'):
-            result = result[7:-3].strip()
-        elif result.startswith('```'):
-            result = result[3:-3].strip()
-        parsed = json.loads(result)
-        return parsed
     except Exception as e:
-        print(f"Continuation check failed: {str(e)}")
-        return {
-            "is_continuation": False,
-            "merged_text": "",
-            "confidence": 0.0
-        }
\ No newline at end of file
+        raise Exception(f"Sentence mapping translation failed: {str(e)}")
+
+
+def stream_merge_and_translate_pages(previous_german_ending, new_german_text, bypass_cache=False):
+    """merge_and_translate_pages의 스트리밍 버전. 마지막 ('done', ...)에 clean_german 등 전체 결과"""
+    try:
+        yield from _stream_cached(
+            'merge_and_translate_pages', [previous_german_ending, new_german_text],
+            _merge_messages(previous_german_ending, new_german_text),
+            MERGE_FORMAT,
+            lambda reply: _merge_reply(reply, new_german_text),
+            lambda result: result.get('sentences', []),
+            bypass_cache
+        )
+    except Exception as e:
+        raise Exception(f"Merge and translate failed: {str(e)}")
@@ -0,0 +1,237 @@
+import os
+import re
+
+# 이 이상이면 LLM 병합 없이 로컬 결과를 그대로 씀
+JOIN_CONFIDENCE = float(os.getenv('PAGE_JOIN_CONFIDENCE', 0.85))
+# 이전 페이지에서 끌어올 미완성 문장이 이보다 길면 (문장 경계를 못 찾은 것) LLM에 맡김
+MAX_FRAGMENT_CHARS = 600
+
+# 프락투어 이중 하이픈(=, ⸗)과 OCR이 줄 끝에 남기는 ¬는 거의 항상 음절 분리
+FRAKTUR_HYPHENS = '=⸗¬'
+LINE_HYPHENS = FRAKTUR_HYPHENS + '-‐'
+
+# 약어 (마침표가 붙어도 문장 끝이 아님). 한 글자 소문자(u. s. w., z. B.)는 따로 처리
+ABBREVIATIONS = frozenset('''
+    abth abt anm aufl ausg bd bde bzw ca cap dgl dr ebd etc ev evang fol franz fr
+    geb gebr gest gr griech hr hrn hrsg jahrh jh kap kgl königl lat mill nr näml op
+    pag pf prof resp sc sog sr st str thlr tit usw vergl vgl vol ztg
+'''.split())
+
+# 작은 기본 단어장. 책 본문에 나온 단어가 여기에 더해짐 (vocabulary)
+BASE_WORDS = frozenset('''
+    aber alle allein allem allen aller alles als also am an andere anderen auch auf aus
+    bei beim bis da dabei dadurch dafür daher damals damit dann darauf darin darum das
+    daß dass dem den denen denn der deren des dessen die dies diese diesem diesen dieser
+    dieses doch dort du durch ein eine einem einen einer eines er es etwa euch für gegen
+    gewesen hat hatte hätte ich ihm ihn ihnen ihr ihre ihrem ihren ihrer im in indem ist
+    jede jedem jeden jeder jedes jedoch jener jetzt kann kein keine man mehr mein meine
+    mich mir mit muß muss nach nicht nichts noch nun nur ob oder ohne schon sehr sein
+    seine seinem seinen seiner sich sie sind so solche soll sondern über um und uns
+    unter viel vom von vor war waren was weil welche welcher wenn wer werden wie wieder
+    wir wird wo wohl wurde würde zu zum zur zwar zwischen
+    eindruck ausdruck werk werke kunst künstler musik musiker oper opern drama dramen
+    bühne theater orchester sänger gesang dichter dichtung dichtkunst tondichter
+    komponist componist meister leben zeit welt geist natur gedanke gedanken
+    wahrheit wirklichkeit empfindung gefühl ausführung aufführung darstellung
+    bedeutung entwickelung entwicklung erscheinung verhältnis verhältniß
+    gegenwart vergangenheit zukunft geschichte volk deutschen deutsche deutschland
+    allerdings ebenfalls nämlich vielmehr wenigstens zugleich
+'''.split())
+
+# 줄 끝 하이픈 뒤에 오면 음절 분리가 아니라 생략 하이픈 ("Ein- und Ausgang")
+SUSPENDED_HYPHEN_WORDS = frozenset(['und', 'oder', 'bis', 'sowie', 'wie', 'als'])
+
+# 마지막 단어가 이런 말이면 문장이 다음 페이지로 이어짐 (관사, 전치사, 접속사 등)
+OPEN_ENDINGS = frozenset('''
+    aber als am an auf aus bei beim bis da daß dass dem den der des die durch ein eine
+    einem einen einer eines für gegen im in mit nach ob oder ohne seine seinem seinen
+    seiner sondern über um und unter vom von vor weil welche welcher wenn wie zu zum zur
+    zwischen ihre ihrem ihren ihrer jede jedem jeden jeder jedes diese diesem diesen
+    dieser dieses sich so nicht noch
+'''.split())
+
+_WORD = re.compile(r"[^\W\d_]+", re.UNICODE)
+_CLOSERS = '"\'“”»«‹›)]'
+_SENTENCE_END = re.compile(r'([.!?…]+)([' + re.escape(_CLOSERS) + r']*)(?=\s|$)')
+_LINE_HYPHEN = re.compile(r'([^\W\d_]+)([' + re.escape(LINE_HYPHENS) + r'])[ \t]*\n\s*([^\W\d_]+)')
+_TRAILING_HYPHEN = re.compile(r'([^\W\d_]+)([' + re.escape(LINE_HYPHENS) + r'])\s*$')
+_ROMAN = re.compile(r'[IVXLC]{1,5}')
+# 페이지 번호/쪽 머리만 있는 줄 ("23", "— 23 —", "[24]")
+_PAGE_NUMBER_LINE = re.compile(r'^[\s\-—–\[\](]*\d{1,4}[\s\-—–\[\])]*$')
+
+
+def vocabulary(*texts):
+    """기본 단어장 + 주어진 텍스트에 온전한 형태로 나온 단어 (소문자). 하이픈으로 끊긴 조각은 빼고 셈"""
+    words = set(BASE_WORDS)
+    for text in texts:
+        text = _TRAILING_HYPHEN.sub(' ', _LINE_HYPHEN.sub(' ', text or ''))
+        words.update(word.lower() for word in _WORD.findall(text) if len(word) > 1)
+    return words
+
+
+def hyphen_join(head, mark, tail, words):
+    """줄 끝 하이픈으로 끊긴 head + tail을 어떻게 이을지. (이은 텍스트, 확신도) 반환"""
+    if tail.lower() in SUSPENDED_HYPHEN_WORDS:
+        return f'{head}- {tail}', 0.9
+    if tail[:1].isupper():
+        # "Nord=Deutschland" 같은 복합어는 하이픈을 남김
+        return f'{head}-{tail}', 0.9 if mark in FRAKTUR_HYPHENS else 0.85
+    joined = head + tail
+    if joined.lower() in words:
+        return joined, 0.98
+    if mark in FRAKTUR_HYPHENS:
+        return joined, 0.92
+    if head.lower() in words and tail.lower() in words:
+        # "schwarz-weiß"처럼 두 단어 모두 말이 되면 판단 보류
+        return joined, 0.5
+    return joined, 0.88
+
+
+def dehyphenate(text, words=None):
+    """페이지 안에서 줄 끝 하이픈으로 끊긴 단어 잇기. 확신이 없는 곳은 그대로 둠"""
+    words = vocabulary(text) if words is None else words
+
+    def replace(match):
+        head, mark, tail = match.groups()
+        joined, confidence = hyphen_join(head, mark, tail, words)
+        return joined if confidence >= JOIN_CONFIDENCE else match.group(0)
+
+    return _LINE_HYPHEN.sub(replace, text or '')
+
+
+def skeleton(text):
+    """비교용 텍스트. 줄 끝에서 끊긴 단어를 잇고 공백을 하나로"""
+    text = re.sub(r'(\w)[-=¬]\s*\n\s*(\w)', r'\1\2', text or '')
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def _is_boundary(text, match):
+    """_SENTENCE_END 매치가 실제 문장 끝인지 (약어, 서수, 이니셜, 소문자로 이어지는 경우 제외)"""
+    following = text[match.end():].lstrip()
+    if following[:1].islower():
+        return False
+    if match.group(1) != '.':
+        return True
+    token = re.search(r'(\w+)$', text[:match.start()])
+    if token is None:
+        return True
+    token = token.group(1)
+    if token.lower() in ABBREVIATIONS:
+        return False
+    if len(token) == 1 and token.isalpha():
+        # 이니셜(J. S. Bach), z. B., u. s. w.
+        return False
+    if token.isdigit() and len(token) <= 3:
+        # 서수 "am 3. Mai", "der 2. Akt" (네 자리는 연도로 보고 문장 끝 허용)
+        return False
+    if _ROMAN.fullmatch(token):
+        # "Ludwig II. von Bayern"
+        return False
+    return True
+
+
+def sentence_spans(text):
+    """독일어 문장 경계 [(시작, 끝)]. 마지막 문장은 마침표 없이 끝날 수 있음"""
+    spans = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        if match.end() <= start or not _is_boundary(text, match):
+            continue
+        spans.append((start, match.end()))
+        start = match.end()
+    if text[start:].strip():
+        spans.append((start, len(text)))
+    return spans
+
+
+def _strip_page_furniture(previous, new):
+    """앞 페이지 끝의 쪽 번호/다음 쪽 첫 단어(Kustode)와 새 페이지 첫머리의 쪽 번호 줄 떼기"""
+    previous_lines = previous.rstrip().split('\n')
+    while previous_lines and _PAGE_NUMBER_LINE.match(previous_lines[-1]):
+        previous_lines.pop()
+    new_lines = new.lstrip().split('\n')
+    while new_lines and _PAGE_NUMBER_LINE.match(new_lines[0]):
+        new_lines.pop(0)
+    new = '\n'.join(new_lines).lstrip()
+    first_word = _WORD.match(new)
+    if len(previous_lines) > 1 and first_word and previous_lines[-1].strip() == first_word.group(0):
+        previous_lines.pop()
+    return '\n'.join(previous_lines).rstrip(), new
+
+
+def _open_fragment(previous):
+    """앞 페이지의 마지막 (끝나지 않았을 수 있는) 문장. (앞부분, 마지막 문장)"""
+    spans = sentence_spans(previous)
+    if not spans:
+        return previous, ''
+    start = spans[-1][0]
+    return previous[:start], previous[start:].strip()
+
+
+def _continuation(fragment, new):
+    """fragment가 새 페이지로 이어지는지. (이어짐 여부, 확신도, 이유)"""
+    stripped = fragment.rstrip(_CLOSERS + ' ')
+    starts_lower = new[:1].islower()
+    if not stripped:
+        return False, 0.95, 'no_text'
+    if stripped[-1] in '.!?…':
+        closed = bool(sentence_spans(fragment + '\nX')[:-1])
+        if closed and not starts_lower:
+            return False, 0.95, 'sentence_complete'
+        if not closed and starts_lower:
+            # 약어/서수로 끝나고 소문자로 이어짐
+            return True, 0.9, 'abbreviation'
+        return closed is False, 0.6, 'punctuation_ambiguous'
+    if starts_lower:
+        return True, 0.95, 'lowercase_start'
+    if stripped[-1] in ',;':
+        return True, 0.92, 'open_punctuation'
+    if stripped[-1] in ':—–-':
+        return True, 0.85, 'open_punctuation'
+    last_word = _WORD.findall(stripped)
+    if last_word and last_word[-1].lower() in OPEN_ENDINGS:
+        return True, 0.9, 'open_ending'
+    # 마침표 없는 제목 줄일 수도, 명사로 이어지는 문장일 수도 있음
+    return True, 0.55, 'no_punctuation'
+
+
+def join_pages(previous_german, new_german):
+    """이전 페이지 끝과 새 페이지를 로컬 규칙으로 잇기.
+    merge_and_translate_pages와 같은 merged_from_previous/clean_german에 confidence, reason을 더해 반환"""
+    previous, new = _strip_page_furniture(previous_german or '', new_german or '')
+    split = _TRAILING_HYPHEN.search(previous)
+    tail = _WORD.match(new)
+    # 페이지 첫 단어가 끊긴 단어의 뒷부분이면 단어장에 넣지 않음
+    words = vocabulary(previous, new[tail.end():] if split and tail else new)
+    new = dehyphenate(new, words)
+    result = {'merged_from_previous': '', 'clean_german': new, 'confidence': 0.95, 'reason': 'no_previous'}
+    if not previous:
+        return result
+
+    if split and tail:
+        # 단어가 페이지를 넘어가며 끊김: "Ein=" / "druck"
+        head, mark = split.groups()
+        joined, confidence = hyphen_join(head, mark, tail.group(0), words)
+        _, fragment = _open_fragment(previous[:split.start()] + head)
+        fragment = fragment[:-len(head)] if fragment.endswith(head) else fragment
+        merged = (fragment + joined).strip()
+        result.update(
+            merged_from_previous=merged,
+            clean_german=merged + new[tail.end():],
+            confidence=confidence,
+            reason='split_word'
+        )
+    else:
+        _, fragment = _open_fragment(previous)
+        continues, confidence, reason = _continuation(fragment, new)
+        result.update(confidence=confidence, reason=reason)
+        if continues:
+            result.update(
+                merged_from_previous=fragment,
+                clean_german=f"{fragment} {new}"
+            )
+
+    if len(result['merged_from_previous']) > MAX_FRAGMENT_CHARS:
+        result['confidence'] = min(result['confidence'], 0.5)
+        result['reason'] = 'fragment_too_long'
+    return result
@@ -0,0 +1,106 @@
+from models.book import db, Page, POSITION_GAP
+from models.history import record_version
+
+
+def last_page(book_id):
+    return Page.query.filter_by(book_id=book_id).order_by(Page.position.desc()).first()
+
+
+def append_page(book_id, data):
+    """책 끝에 페이지 추가 + 번역 이력 v1 기록 (커밋은 호출하는 쪽에서)"""
+    last = last_page(book_id)
+
+    page = Page(
+        book_id=book_id,
+        position=(last.position + POSITION_GAP) if last else POSITION_GAP,
+        page_type=data.get('page_type', 'text'),
+        german_text=data.get('german_text', ''),
+        korean_text=data.get('korean_text', ''),
+        english_text=data.get('english_text', ''),
+        original_image_url=data.get('original_image_url', ''),
+        content_images=data.get('content_images', '')
+    )
+    page.set_sentences(data.get('sentences'))
+    db.session.add(page)
+
+    if data.get('korean_text'):
+        record_version(page, 'korean_text', data.get('korean_text'))
+    if data.get('english_text'):
+        record_version(page, 'english_text', data.get('english_text'))
+    return page
+
+
+def respace_positions(book_id):
+    """끼워 넣을 자리가 없을 때만 책 전체 정렬 키를 다시 POSITION_GAP 간격으로 (UPDATE 한 번)"""
+    ids = [row[0] for row in db.session.query(Page.id)
+           .filter(Page.book_id == book_id).order_by(Page.position, Page.id)]
+    if ids:
+        _set_positions({page_id: (i + 1) * POSITION_GAP for i, page_id in enumerate(ids)})
+
+
+def _set_positions(positions):
+    """{page_id: position}을 UPDATE 한 번으로 반영"""
+    db.session.execute(
+        db.update(Page)
+        .where(Page.id.in_(list(positions)))
+        .values(position=db.case(positions, value=Page.id)),
+        execution_options={'synchronize_session': 'fetch'}
+    )
+
+
+def _neighbour_position(page, book_id, position, before):
+    """position 바로 앞(before=True) 또는 뒤 페이지의 정렬 키 (page 자신은 제외, 없으면 None)"""
+    query = db.session.query(Page.position).filter(Page.book_id == book_id, Page.id != page.id)
+    if before:
+        query = query.filter(Page.position < position).order_by(Page.position.desc())
+    else:
+        query = query.filter(Page.position > position).order_by(Page.position)
+    return query.limit(1).scalar()
+
+
+def place_page(page, anchor, after=True):
+    """page를 anchor 바로 뒤(after=True) 또는 앞으로 옮김. 보통 page 한 행만 바뀜 (커밋은 호출하는 쪽에서)"""
+    for attempt in range(2):
+        neighbour = _neighbour_position(page, anchor.book_id, anchor.position, before=not after)
+        low, high = (anchor.position, neighbour) if after else (neighbour, anchor.position)
+        if low is None:
+            page.position = high - POSITION_GAP
+            return
+        if high is None:
+            page.position = low + POSITION_GAP
+            return
+        if high - low > 1:
+            page.position = (low + high) // 2
+            return
+        respace_positions(anchor.book_id)
+    raise RuntimeError("No room to place page after respacing")
+
+
+def reorder_pages(book_id, page_ids):
+    """page_ids 순서대로 재배치. 일부만 보내면 그 페이지들이 원래 차지하던 자리 안에서만 순서를 바꿈.
+    바뀐 {page_id: position} 반환 (UPDATE 한 번, 커밋은 호출하는 쪽에서)"""
+    rows = db.session.query(Page.id, Page.position).filter(
+        Page.book_id == book_id, Page.id.in_(page_ids)
+    ).all()
+    if len(rows) != len(page_ids):
+        raise ValueError("page_ids must be distinct pages of this book")
+    slots = sorted(position for _, position in rows)
+    current = dict(rows)
+    positions = {page_id: slot for page_id, slot in zip(page_ids, slots) if current[page_id] != slot}
+    if positions:
+        _set_positions(positions)
+    return positions
+
+
+def apply_translation(page, sentences):
+    """새 번역을 페이지에 반영하고 이력 버전 추가. (한국어 버전, 영어 버전) 반환 (커밋은 호출하는 쪽에서)"""
+    new_korean = '\n'.join([s['ko'] for s in sentences])
+    new_english = '\n'.join([s['en'] for s in sentences])
+
+    page.korean_text = new_korean
+    page.english_text = new_english
+    page.set_sentences(sentences)
+
+    next_ko_ver = record_version(page, 'korean_text', new_korean)
+    next_en_ver = record_version(page, 'english_text', new_english)
+    return next_ko_ver, next_en_ver
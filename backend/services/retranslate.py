@@ -0,0 +1,96 @@
+import os
+from difflib import SequenceMatcher
+
+from services.openai_service import translate_sentences_in_context
+from services.page_join import skeleton, sentence_spans
+
+# 바뀐 글자 수가 페이지의 이 비율을 넘으면 부분 번역 대신 페이지 전체를 다시 번역
+MAX_CHANGED_RATIO = float(os.getenv('INCREMENTAL_RETRANSLATE_MAX_RATIO', 0.6))
+
+
+def _split(text):
+    return [text[start:end].strip() for start, end in sentence_spans(text) if text[start:end].strip()]
+
+
+def plan_segments(german_text, stored):
+    """현재 독일어 텍스트를 저장된 문장 순서대로 맞춰 보기.
+    [('keep', {de, ko, en}) 또는 ('translate', 새 독일어 텍스트)] 반환. 찾지 못한 저장 문장은 빠짐
+
+    양쪽을 같은 문장 분리기(page_join)로 나눠 문장 목록끼리 맞춤 (부분 문자열 검색이면 "Ja." 같은 짧은 문장이
+    고친 앞 문장 안에서 잡힘). 저장 문장의 조각이 모두 그대로, 이어서 남아 있을 때만 유지.
+    """
+    current = _split(skeleton(german_text))
+    units = [(part, k) for k, sentence in enumerate(stored) for part in _split(skeleton(sentence.get('de')))]
+    matched = {}
+    matcher = SequenceMatcher(None, [part for part, _ in units], current, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            for offset in range(i2 - i1):
+                matched[j1 + offset] = units[i1 + offset][1]
+
+    positions = {}
+    for j, k in matched.items():
+        positions.setdefault(k, []).append(j)
+    kept = {
+        k for k, found in positions.items()
+        if len(found) == sum(1 for _, owner in units if owner == k) and max(found) - min(found) == len(found) - 1
+    }
+
+    segments = []
+    gap = []
+    for j, part in enumerate(current):
+        k = matched.get(j)
+        if k not in kept:
+            gap.append(part)
+            continue
+        if j == min(positions[k]):
+            if gap:
+                segments.append(('translate', ' '.join(gap)))
+                gap = []
+            segments.append(('keep', stored[k]))
+    if gap:
+        segments.append(('translate', ' '.join(gap)))
+    return segments
+
+
+def plan_incremental(page):
+    """부분 재번역이 가능하면 segments, 아니면 None (저장된 문장이 없거나, 바뀐 게 없거나, 너무 많이 바뀜)"""
+    stored = [row.to_dict() for row in page.sentence_rows]
+    if not stored:
+        return None
+    segments = plan_segments(page.german_text, stored)
+    changed = sum(len(value) for kind, value in segments if kind == 'translate')
+    total = len(skeleton(page.german_text))
+    if changed == 0 or changed > total * MAX_CHANGED_RATIO:
+        return None
+    return segments
+
+
+def _neighbour_de(segments, index, step):
+    index += step
+    while 0 <= index < len(segments):
+        kind, value = segments[index]
+        if kind == 'keep':
+            return value.get('de', '')
+        index += step
+    return ''
+
+
+def translate_segments(segments, bypass_cache=False):
+    """바뀐 부분만 앞뒤 문장을 문맥으로 번역해서 끼워 넣기. (전체 문장 목록, 새로 번역된 순번 목록) 반환"""
+    sentences = []
+    changed = []
+    for index, (kind, value) in enumerate(segments):
+        if kind == 'keep':
+            sentences.append(value)
+            continue
+        translated = translate_sentences_in_context(
+            _neighbour_de(segments, index, -1), value, _neighbour_de(segments, index, 1),
+            bypass_cache=bypass_cache
+        )
+        if not isinstance(translated, list) or not all(isinstance(s, dict) for s in translated):
+            raise Exception("Sentence translation returned an unexpected shape")
+        for sentence in translated:
+            changed.append(len(sentences))
+            sentences.append({lang: sentence.get(lang, '') for lang in ('de', 'ko', 'en')})
+    return sentences, changed
@@ -0,0 +1,133 @@
+import os
+
+from services.json_stream import repair_json
+
+# json_schema: Structured Outputs (스키마대로만 생성) / json_object: JSON 모드 / off: 프롬프트로만 요청
+STRUCTURED_OUTPUTS = os.getenv('OPENAI_STRUCTURED_OUTPUTS', 'json_schema')
+
+
+def string():
+    return {'type': 'string'}
+
+
+def boolean():
+    return {'type': 'boolean'}
+
+
+def number():
+    return {'type': 'number'}
+
+
+def nullable(schema):
+    return {**schema, 'type': [schema['type'], 'null']}
+
+
+def array(items):
+    return {'type': 'array', 'items': items}
+
+
+def obj(**properties):
+    """strict 모드 규칙대로 모든 속성을 required로, 추가 속성은 금지"""
+    return {
+        'type': 'object',
+        'properties': properties,
+        'required': list(properties),
+        'additionalProperties': False
+    }
+
+
+def response_format(name, schema):
+    """chat.completions.create에 넘길 response_format (끄면 None)"""
+    if STRUCTURED_OUTPUTS == 'json_schema':
+        return {'type': 'json_schema', 'json_schema': {'name': name, 'schema': schema, 'strict': True}}
+    if STRUCTURED_OUTPUTS == 'json_object':
+        return {'type': 'json_object'}
+    return None
+
+
+def _types(schema):
+    kind = schema.get('type')
+    return kind if isinstance(kind, list) else [kind]
+
+
+def _default(schema):
+    kinds = _types(schema)
+    if 'null' in kinds:
+        return None
+    return {'string': '', 'boolean': False, 'number': 0, 'integer': 0}.get(kinds[0])
+
+
+def conform(value, schema, path='$', problems=None):
+    """value를 schema 모양으로 맞추기. 빠진 속성은 기본값, 타입이 어긋난 값은 변환하거나 기본값으로.
+    (맞춘 값, 고친 곳 목록) 반환. 고칠 수 없는 배열 원소는 버림"""
+    problems = [] if problems is None else problems
+    kinds = _types(schema)
+
+    if value is None and 'null' in kinds:
+        return None, problems
+    if 'object' in kinds:
+        properties = schema.get('properties', {})
+        if isinstance(value, list) and len(properties) == 1:
+            # {"sentences": [...]} 대신 배열만 온 경우
+            (key, child), = properties.items()
+            if 'array' in _types(child):
+                problems.append(f'{path}: wrapped bare array in {key}')
+                value = {key: value}
+        if not isinstance(value, dict):
+            problems.append(f'{path}: expected object')
+            value = {}
+        result = {}
+        for key, child in properties.items():
+            if key not in value:
+                if 'null' not in _types(child):
+                    problems.append(f'{path}.{key}: missing')
+                empty = {} if _types(child) == ['object'] else None
+                result[key] = conform(empty, child, f'{path}.{key}', [])[0]
+                continue
+            result[key] = conform(value[key], child, f'{path}.{key}', problems)[0]
+        return result, problems
+    if 'array' in kinds:
+        if isinstance(value, dict):
+            lists = [v for v in value.values() if isinstance(v, list)]
+            if len(lists) == 1:
+                problems.append(f'{path}: unwrapped array from object')
+                value = lists[0]
+        if not isinstance(value, list):
+            problems.append(f'{path}: expected array')
+            return [], problems
+        items = schema.get('items', {})
+        result = []
+        for index, item in enumerate(value):
+            if 'object' in _types(items) and not isinstance(item, dict):
+                problems.append(f'{path}[{index}]: dropped non-object item')
+                continue
+            result.append(conform(item, items, f'{path}[{index}]', problems)[0])
+        return result, problems
+    if 'string' in kinds:
+        if isinstance(value, str):
+            return value, problems
+        problems.append(f'{path}: expected string')
+        return ('' if value is None or isinstance(value, (dict, list)) else str(value)), problems
+    if 'boolean' in kinds:
+        if isinstance(value, bool):
+            return value, problems
+        problems.append(f'{path}: expected boolean')
+        return (value.strip().lower() == 'true' if isinstance(value, str) else bool(value)), problems
+    if 'number' in kinds or 'integer' in kinds:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return value, problems
+        problems.append(f'{path}: expected number')
+        try:
+            return float(value), problems
+        except (TypeError, ValueError):
+            return _default(schema), problems
+    return value, problems
+
+
+def parse_structured(text, schema):
+    """모델 응답 → schema 모양의 값. (값, 잘렸는지, 고친 곳 목록) 반환. JSON을 전혀 못 찾으면 ValueError"""
+    value, truncated = repair_json(text)
+    value, problems = conform(value, schema)
+    if truncated or problems:
+        print(f"🩹 Repaired model reply (truncated={truncated}, {len(problems)} fixes): {problems[:3]}")
+    return value, truncated, problems
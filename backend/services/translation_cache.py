@@ -0,0 +1,169 @@
+import functools
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+CACHE_PATH = os.getenv(
+    'TRANSLATION_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'translation_cache.db')
+)
+# 최대 항목 수 / 유효 기간(초, 0이면 만료 없음)
+MAX_ENTRIES = int(os.getenv('TRANSLATION_CACHE_MAX_ENTRIES', 20000))
+TTL_SECONDS = int(os.getenv('TRANSLATION_CACHE_TTL', 90 * 24 * 3600))
+EVICT_EVERY = 100
+
+
+def normalize_text(text):
+    """같은 입력이 같은 키가 되도록 유니코드/공백 정규화"""
+    text = unicodedata.normalize('NFC', text or '')
+    text = re.sub(r'[ \t\u00a0]+', ' ', text)
+    text = re.sub(r' *\n *', '\n', text)
+    return text.strip()
+
+
+class TranslationCache:
+    """(함수, 모델, 프롬프트 버전, 입력 텍스트) 해시를 키로 쓰는 SQLite 영구 캐시"""
+
+    def __init__(self, path, max_entries=MAX_ENTRIES, ttl_seconds=TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits = {}
+        self._misses = {}
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS translation_cache (
+                    key TEXT PRIMARY KEY,
+                    function TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_translation_cache_last_used "
+                "ON translation_cache (last_used_at)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            # 여러 워커 스레드가 동시에 읽고 쓰므로 WAL
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(function, model, prompt_version, *texts):
+        payload = json.dumps(
+            [function, model, prompt_version] + [normalize_text(t) for t in texts],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _count(self, counter, function):
+        with self._lock:
+            counter[function] = counter.get(function, 0) + 1
+
+    def get(self, key, function):
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value, created_at FROM translation_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (self.ttl_seconds and now - row[1] > self.ttl_seconds):
+            self._count(self._misses, function)
+            return None
+        with conn:
+            conn.execute("UPDATE translation_cache SET last_used_at = ? WHERE key = ?", (now, key))
+        self._count(self._hits, function)
+        return json.loads(row[0])
+
+    def set(self, key, function, value):
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO translation_cache (key, function, value, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, function, json.dumps(value, ensure_ascii=False), now, now)
+            )
+        with self._lock:
+            self._writes += 1
+            should_evict = self._writes % EVICT_EVERY == 0
+        if should_evict:
+            self.evict()
+
+    def evict(self):
+        """만료 항목 삭제 후 최대 개수를 넘으면 가장 오래 안 쓴 항목부터 삭제"""
+        conn = self._connect()
+        with conn:
+            if self.ttl_seconds:
+                conn.execute(
+                    "DELETE FROM translation_cache WHERE created_at < ?",
+                    (time.time() - self.ttl_seconds,)
+                )
+            conn.execute("""
+                DELETE FROM translation_cache WHERE key IN (
+                    SELECT key FROM translation_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM translation_cache")
+
+    def stats(self):
+        entries = self._connect().execute("SELECT COUNT(*) FROM translation_cache").fetchone()[0]
+        with self._lock:
+            hits = dict(self._hits)
+            misses = dict(self._misses)
+        total_hits = sum(hits.values())
+        total_misses = sum(misses.values())
+        lookups = total_hits + total_misses
+        return {
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': total_hits,
+            'misses': total_misses,
+            'hit_rate': (total_hits / lookups) if lookups else 0.0,
+            'by_function': {
+                fn: {'hits': hits.get(fn, 0), 'misses': misses.get(fn, 0)}
+                for fn in sorted(set(hits) | set(misses))
+            }
+        }
+
+
+translation_cache = TranslationCache(CACHE_PATH)
+
+
+def cached(model, prompt_version):
+    """텍스트 인자를 키로 결과를 캐시. bypass_cache=True면 새로 호출하고 캐시를 갱신"""
+    def decorator(fn):
+        function_name = fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*texts, bypass_cache=False):
+            key = TranslationCache.make_key(function_name, model, prompt_version, *texts)
+            if not bypass_cache:
+                hit = translation_cache.get(key, function_name)
+                if hit is not None:
+                    print(f"⚡ Cache hit: {function_name}")
+                    return hit
+            result = fn(*texts)
+            translation_cache.set(key, function_name, result)
+            return result
+        return wrapper
+    return decorator
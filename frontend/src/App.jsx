@@ -10,6 +10,8 @@ function App() {
   const [currentPage, setCurrentPage] = useState(0)
   const [isUploading, setIsUploading] = useState(false)
   const [isProcessing, setIsProcessing] = useState(false)
+  const [processingStage, setProcessingStage] = useState('')
+  const [streamedSentences, setStreamedSentences] = useState([])
   const [isCreatingBook, setIsCreatingBook] = useState(false)
   const [newBookTitle, setNewBookTitle] = useState('')
   const [newBookAuthor, setNewBookAuthor] = useState('')
@@ -74,8 +76,80 @@ function App() {
     }
   }
 
+  const jobOutcome = (job) => {
+    if (job.status === 'succeeded') return job.result
+    if (job.status === 'failed') return { success: false, error: job.error }
+    if (job.status === 'cancelled') return { success: false, error: '작업이 취소되었습니다' }
+    return null
+  }
+
+  const showStage = (stages) => {
+    const running = stages.find(s => s.status === 'running')
+    setProcessingStage(running ? running.name : '')
+  }
+
+  // SSE가 안 될 때 쓰는 상태 조회
+  const pollJob = async (jobId) => {
+    while (true) {
+      const res = await fetch(`${API_URL}/jobs/${jobId}`)
+      const { job } = await res.json()
+      showStage(job.stages)
+      const outcome = jobOutcome(job)
+      if (outcome) return outcome
+      await new Promise(resolve => setTimeout(resolve, 1500))
+    }
+  }
+
+  // 백그라운드 작업 진행을 SSE로 받기 (번역된 문장은 나오는 대로 미리 보여줌)
+  const waitForJob = (jobId) => new Promise((resolve) => {
+    setStreamedSentences([])
+    const source = new EventSource(`${API_URL}/jobs/${jobId}/events`)
+    source.addEventListener('stages', (e) => showStage(JSON.parse(e.data)))
+    source.addEventListener('sentence', (e) => {
+      const sentence = JSON.parse(e.data)
+      setStreamedSentences(prev => [...prev, sentence])
+    })
+    source.addEventListener('done', (e) => {
+      source.close()
+      resolve(jobOutcome(JSON.parse(e.data)))
+    })
+    source.onerror = () => {
+      source.close()
+      resolve(pollJob(jobId))
+    }
+  })
+
+  // 여러 장을 고르면 일괄 처리 작업으로 한 번에 등록
+  const handleBulkIngest = async (files) => {
+    setIsProcessing(true)
+    const formData = new FormData()
+    files.forEach(f => formData.append('images', f))
+    try {
+      const res = await fetch(`${API_URL}/books/${currentBook.id}/ingest`, {
+        method: 'POST',
+        body: formData
+      })
+      const queued = await res.json()
+      if (!queued.success) {
+        alert('처리 실패: ' + queued.error)
+        return
+      }
+      const data = await waitForJob(queued.job_id)
+      if (!data.success) alert('처리 실패: ' + data.error)
+      await openBook(currentBook)
+      setIsUploading(false)
+    } catch (err) {
+      alert('오류 발생: ' + err.message)
+    } finally {
+      setIsProcessing(false)
+      setProcessingStage('')
+    }
+  }
+
   const handleFileSelect = async (e) => {
-    const file = e.target.files[0]
+    const files = Array.from(e.target.files)
+    if (files.length > 1 && currentBook) return handleBulkIngest(files)
+    const file = files[0]
     if (!file || !currentBook) return
 
     setIsProcessing(true)
@@ -93,7 +167,13 @@ function App() {
         method: 'POST',
         body: formData
       })
-      const data = await res.json()
+      const queued = await res.json()
+      if (!queued.success) {
+        alert('처리 실패: ' + queued.error)
+        return
+      }
+
+      const data = await waitForJob(queued.job_id)
 
       if (data.success) {
         const newPageData = {
@@ -113,6 +193,8 @@ function App() {
       alert('오류 발생: ' + err.message)
     } finally {
       setIsProcessing(false)
+      setProcessingStage('')
+      setStreamedSentences([])
     }
   }
 
@@ -160,9 +242,13 @@ function App() {
       })
       const data = await res.json()
       if (data.success) {
-        setPages(data.pages)
-        if (direction === 'up') setCurrentPage(Math.max(0, currentPage - 1))
-        if (direction === 'down') setCurrentPage(Math.min(data.pages.length - 1, currentPage + 1))
+        // 서버는 옮겨진 페이지만 돌려주므로 목록에서 그 페이지만 새 자리로 옮김
+        const moved = data.pages[0]
+        const page = pages.find(p => p.id === pageId)
+        const rest = pages.filter(p => p.id !== pageId)
+        const index = Math.min(rest.length, moved.page_number - 1)
+        setPages([...rest.slice(0, index), page, ...rest.slice(index)])
+        setCurrentPage(index)
       }
     } catch (err) {
       alert('이동 실패: ' + err.message)
@@ -231,7 +317,7 @@ function App() {
   }
 
   const handleRetranslate = async (pageId) => {
-    if (!confirm('재번역하시겠어요? (한국어+영어 모두 새로 번역됩니다)')) return
+    if (!confirm('재번역하시겠어요? (고친 문장만 다시 번역하고, 고친 곳이 없으면 페이지 전체를 새로 번역합니다)')) return
     try {
       const res = await fetch(`${API_URL}/pages/${pageId}/retranslate`, {
         method: 'POST',
@@ -242,7 +328,8 @@ function App() {
       if (data.success) {
         const updatedPages = pages.map(p => p.id === pageId ? data.page : p)
         setPages(updatedPages)
-        alert(`v${data.new_version}으로 재번역 완료!`)
+        const scope = data.mode === 'incremental' ? `문장 ${data.retranslated.length}개` : '페이지 전체'
+        alert(`v${data.new_version}으로 재번역 완료! (${scope})`)
       }
     } catch (err) {
       alert('재번역 실패: ' + err.message)
@@ -304,11 +391,16 @@ function App() {
           <h2>📸 새 페이지 추가</h2>
           <p>독일어 책 이미지를 선택해주세요</p>
           <label htmlFor="file-upload" className="file-label">이미지 선택</label>
-          <input id="file-upload" type="file" accept="image/*" onChange={handleFileSelect} style={{ display: 'none' }} />
+          <input id="file-upload" type="file" accept="image/*" multiple onChange={handleFileSelect} style={{ display: 'none' }} />
           {isProcessing && (
             <div className="processing">
               <div className="spinner"></div>
-              <p>OCR + 번역 처리 중...</p>
+              <p>OCR + 번역 처리 중...{processingStage && ` (${processingStage})`}</p>
+              {streamedSentences.length > 0 && (
+                <div className="korean-text">
+                  {streamedSentences.map((s, idx) => <p key={idx}>{s.ko}</p>)}
+                </div>
+              )}
             </div>
           )}
           <button onClick={() => setIsUploading(false)} className="cancel-btn" disabled={isProcessing}>취소</button>
@@ -340,6 +432,11 @@ function App() {
         <div className="book-title-bar">
           <button onClick={() => setCurrentBook(null)} className="back-btn">← 책 목록</button>
           <h2>{currentBook.title}</h2>
+          <div className="export-links">
+            <a href={`${API_URL}/books/${currentBook.id}/export?format=epub`} className="control-btn">EPUB</a>
+            <a href={`${API_URL}/books/${currentBook.id}/export?format=html`} className="control-btn">HTML</a>
+            <a href={`${API_URL}/books/${currentBook.id}/export?format=jsonl`} className="control-btn">JSONL</a>
+          </div>
         </div>
 
         <div className="page-nav">
@@ -403,7 +500,7 @@ function App() {
                   <div className="crop-preview">
                     {block.image_file && (
                       <img
-                        src={`${API_URL.replace('/api', '')}/api/uploads/${block.image_file}`}
+                        src={`${API_URL.replace('/api', '')}/api/uploads/${block.image_file}?w=800&format=auto`}
                         alt="현재 크롭"
                         className="crop-preview-img"
                       />
@@ -427,7 +524,7 @@ function App() {
                           <p>원본에서 선택 영역:</p>
                           <div className="crop-overlay-wrap">
                             <img
-                              src={`${API_URL.replace('/api', '')}/api/uploads/${page.original_image_url}`}
+                              src={`${API_URL.replace('/api', '')}/api/uploads/${page.original_image_url}?w=800&format=auto`}
                               alt="원본"
                               className="crop-original-img"
                             />
@@ -16,14 +16,27 @@ function BookReader() {
     fetchBook()
   }, [bookId])
 
+  // 리더에 필요한 필드만, 페이지 묶음 단위로 불러오기
+  const READER_FIELDS = 'id,page_number,page_type,korean_text,sentences,content_images'
+  const PAGE_BATCH = 20
+
   const fetchBook = async () => {
     try {
       const bookRes = await fetch(`${API_URL}/books/${bookId}`)
       const bookData = await bookRes.json()
-      const pagesRes = await fetch(`${API_URL}/books/${bookId}/pages`)
-      const pagesData = await pagesRes.json()
       if (bookData.success) setBook(bookData.book)
-      if (pagesData.success) setPages(pagesData.pages)
+
+      let cursor = null
+      do {
+        const after = cursor !== null ? `&after=${cursor}` : ''
+        const pagesRes = await fetch(`${API_URL}/books/${bookId}/pages?limit=${PAGE_BATCH}&fields=${READER_FIELDS}${after}`)
+        const pagesData = await pagesRes.json()
+        if (!pagesData.success) break
+        const first = cursor === null
+        setPages(prev => first ? pagesData.pages : [...prev, ...pagesData.pages])
+        setIsLoading(false)
+        cursor = pagesData.next_cursor
+      } while (cursor !== null)
     } catch (err) {
       console.error('Failed to load book:', err)
     } finally {
@@ -126,7 +139,7 @@ function BookReader() {
             <div className="score-container">
               {block.image_file && (
                 <img
-                  src={`${API_URL.replace('/api', '')}/api/uploads/${block.image_file}`}
+                  src={`${API_URL.replace('/api', '')}/api/uploads/${block.image_file}?w=800&format=auto`}
                   alt="악보"
                   className="score-image"
                 />
@@ -142,7 +155,7 @@ function BookReader() {
             <div className="illustration-container">
               {block.image_file && (
                 <img
-                  src={`${API_URL.replace('/api', '')}/api/uploads/${block.image_file}`}
+                  src={`${API_URL.replace('/api', '')}/api/uploads/${block.image_file}?w=800&format=auto`}
                   alt="삽화"
                   className="illustration-image"
                 />